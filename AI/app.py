@@ -1,9 +1,13 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from services.book_ai_service import BookAIService
-from services.recommendation_service import RecommendationService
+from services.recommendation_service import RecommendationService, COLLABORATIVE_STRATEGIES, FUSION_METHODS, HYBRID_MODES
 from services.user_preference_service import UserPreferenceService
+from services.catalog_sync import CatalogSyncEngine
+from services.user_activity import UserActivityWatcher
+from config.settings import Config
 import os
+import json
 import time
 from collections import defaultdict
 from dotenv import load_dotenv
@@ -14,10 +18,23 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app)
 
-# Inisialisasi services
-book_ai_service = BookAIService()
+# Inisialisasi services (semua berbagi satu snapshot katalog per proses)
 recommendation_service = RecommendationService()
 user_preference_service = UserPreferenceService()
+book_ai_service = BookAIService(recommendation_service, user_preference_service)
+
+# Sinkronisasi inkremental katalog & ratings di background
+catalog_sync_engine = None
+if Config.CATALOG_SYNC_ENABLED:
+    catalog_sync_engine = CatalogSyncEngine(recommendation_service.catalog_store)
+    catalog_sync_engine.start()
+
+# Invalidasi konteks chat per user saat borrowings/interaksi/rating berubah
+user_activity_watcher = None
+if Config.USER_ACTIVITY_WATCH_ENABLED and Config.CHAT_CONTEXT_CACHE_ENABLED:
+    user_activity_watcher = UserActivityWatcher(recommendation_service.db)
+    user_activity_watcher.add_listener(book_ai_service.invalidate_user_context)
+    user_activity_watcher.start()
 
 # Rate limiting
 request_counts = defaultdict(list)
@@ -71,6 +88,35 @@ def chat():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/ai/chat/stream', methods=['POST'])
+def chat_stream():
+    """Endpoint chat dengan AI yang mengirim token lewat Server-Sent Events"""
+    try:
+        data = request.get_json()
+        message = data.get('message')
+        user_id = data.get('user_id', 'anonymous')
+        book_id = data.get('book_id')
+        
+        # Rate limiting
+        if not check_rate_limit(user_id):
+            return jsonify({'error': 'Rate limit exceeded. Please try again later.'}), 429
+        
+        if not message:
+            return jsonify({'error': 'Message is required'}), 400
+        
+        def events():
+            for event, payload in book_ai_service.chat_stream(message, user_id, book_id):
+                yield f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+        
+        # Tanpa buffering proxy (nginx) agar token pertama langsung sampai ke client
+        return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/ai/chat/clear', methods=['POST'])
 def clear_chat():
     """Endpoint untuk membersihkan riwayat chat"""
@@ -111,12 +157,15 @@ def collaborative_recommendations():
         data = request.get_json()
         user_id = data.get('user_id')
         n_recommendations = data.get('n_recommendations', 5)
+        strategy = data.get('strategy')
         
         if not user_id:
             return jsonify({'error': 'User ID is required'}), 400
+        if strategy and strategy not in COLLABORATIVE_STRATEGIES:
+            return jsonify({'error': f"Unknown strategy, expected one of {list(COLLABORATIVE_STRATEGIES)}"}), 400
         
         recommendations = recommendation_service.get_collaborative_recommendations(
-            user_id, n_recommendations
+            user_id, n_recommendations, strategy=strategy
         )
         return jsonify({'recommendations': recommendations})
     
@@ -153,6 +202,13 @@ def hybrid_recommendations():
         book_id = data.get('book_id')
         user_preferences = data.get('user_preferences')
         n_recommendations = data.get('n_recommendations', 5)
+        mode = data.get('mode', 'separate')
+        fusion = data.get('fusion')
+        
+        if mode not in HYBRID_MODES:
+            return jsonify({'error': f"Unknown mode, expected one of {list(HYBRID_MODES)}"}), 400
+        if fusion is not None and fusion not in FUSION_METHODS:
+            return jsonify({'error': f"Unknown fusion, expected one of {list(FUSION_METHODS)}"}), 400
         
         # Log request
         ai_logger.logger.info(f"🚀 HYBRID ENDPOINT CALLED")
@@ -161,25 +217,72 @@ def hybrid_recommendations():
         ai_logger.logger.info(f"   User Preferences: {user_preferences[:100] + '...' if user_preferences and len(user_preferences) > 100 else user_preferences or 'None'}")
         ai_logger.logger.info(f"   N Recommendations: {n_recommendations}")
         
-        recommendations = recommendation_service.get_hybrid_recommendations(
-            user_id, book_id, user_preferences, n_recommendations
+        recommendations, metadata = recommendation_service.get_hybrid_recommendations(
+            user_id, book_id, user_preferences, n_recommendations, with_metadata=True, mode=mode, fusion=fusion
         )
         
         # Log response summary
         total_recs = sum(len(recs) for recs in recommendations.values())
         ai_logger.logger.info(f"📤 HYBRID RESPONSE SENT")
         ai_logger.logger.info(f"   Total Recommendations: {total_recs}")
+        if mode == 'fused':
+            ai_logger.logger.info(f"   Fused: {len(recommendations['fused'])}")
+            ai_logger.logger.info(f"   Total Time: {metadata['total_seconds']}s")
+            return jsonify({'recommendations': recommendations['fused'], 'metadata': metadata})
         ai_logger.logger.info(f"   Content-Based: {len(recommendations['content_based'])}")
         ai_logger.logger.info(f"   Collaborative: {len(recommendations['collaborative'])}")
         ai_logger.logger.info(f"   AI-Enhanced: {len(recommendations['ai_enhanced'])}")
+        ai_logger.logger.info(f"   Total Time: {metadata['total_seconds']}s")
         
-        return jsonify({'recommendations': recommendations})
+        return jsonify({'recommendations': recommendations, 'metadata': metadata})
     
     except Exception as e:
         from utils.logger import ai_logger
         ai_logger.log_error("HybridEndpoint", str(e))
         return jsonify({'error': str(e)}), 500
 
+# Model Endpoints
+@app.route('/models/status', methods=['GET'])
+def model_status():
+    """Endpoint untuk status snapshot model aktif"""
+    try:
+        status = recommendation_service.catalog_store.status()
+        status['sync'] = catalog_sync_engine.status() if catalog_sync_engine else {'running': False}
+        return jsonify({'status': status})
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Endpoint untuk counter cache, buffer tulis dan provider LLM"""
+    try:
+        return jsonify({'metrics': {
+            'recommendation_cache': recommendation_service.result_cache.stats(),
+            'keyword_cache': recommendation_service.keyword_cache.stats(),
+            'chat_context_cache': book_ai_service.context_cache.stats(),
+            'conversations': book_ai_service.conversation_store.stats(),
+            'llm': book_ai_service.llm.status(),
+            'user_activity': user_activity_watcher.status() if user_activity_watcher else {'running': False},
+            'rating_writes': user_preference_service.rating_writer.status()
+        }})
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/models/refresh', methods=['POST'])
+def refresh_models():
+    """Endpoint untuk memicu rebuild snapshot model di background"""
+    try:
+        started = recommendation_service.catalog_store.refresh_async()
+        return jsonify({
+            'message': 'Model refresh started' if started else 'Model refresh already running, queued',
+            'status': recommendation_service.catalog_store.status()
+        }), 202
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # User Preference Endpoints
 @app.route('/user/preferences', methods=['GET'])
 def get_user_preferences():
@@ -196,6 +299,25 @@ def get_user_preferences():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/user/ratings', methods=['POST'])
+def add_user_rating():
+    """Endpoint untuk mencatat rating baru tanpa rebuild model"""
+    try:
+        data = request.get_json()
+        user_id = data.get('user_id')
+        book_id = data.get('book_id')
+        
+        if not user_id or not book_id:
+            return jsonify({'error': 'User ID and Book ID are required'}), 400
+        if not isinstance(data.get('rating', 0), (int, float)):
+            return jsonify({'error': 'Rating must be a number'}), 400
+        
+        user_preference_service.update_user_preferences(user_id, data)
+        return jsonify({'message': 'Rating recorded'}), 202
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/user/similar-users', methods=['GET'])
 def get_similar_users():
     """Endpoint untuk mendapatkan pengguna yang serupa"""
@@ -17,6 +17,20 @@ class Config:
     OPENAI_MAX_TOKENS = int(os.getenv('OPENAI_MAX_TOKENS', '500'))
     OPENAI_TEMPERATURE = float(os.getenv('OPENAI_TEMPERATURE', '0.7'))
     
+    # LLM provider (openai | stub) dengan retry, circuit breaker dan pool koneksi
+    LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'openai')
+    LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '30'))  # seconds per attempt
+    LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '2'))
+    LLM_RETRY_BACKOFF = float(os.getenv('LLM_RETRY_BACKOFF', '0.5'))  # seconds, exponential base (full jitter)
+    LLM_POOL_SIZE = int(os.getenv('LLM_POOL_SIZE', '20'))
+    LLM_BREAKER_FAILURES = int(os.getenv('LLM_BREAKER_FAILURES', '5'))
+    LLM_BREAKER_RESET = float(os.getenv('LLM_BREAKER_RESET', '30'))  # seconds
+    LLM_STUB_LATENCY_MS = float(os.getenv('LLM_STUB_LATENCY_MS', '400'))  # median sebelum token pertama
+    LLM_STUB_LATENCY_SIGMA = float(os.getenv('LLM_STUB_LATENCY_SIGMA', '0.5'))  # lognormal
+    LLM_STUB_TOKENS_PER_SECOND = float(os.getenv('LLM_STUB_TOKENS_PER_SECOND', '30'))  # median
+    LLM_STUB_TOKEN_RATE_SIGMA = float(os.getenv('LLM_STUB_TOKEN_RATE_SIGMA', '0.2'))  # lognormal
+    LLM_STUB_SEED = int(os.getenv('LLM_STUB_SEED')) if os.getenv('LLM_STUB_SEED') else None
+    
     # Flask
     FLASK_DEBUG = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
     AI_SERVICE_PORT = int(os.getenv('AI_SERVICE_PORT', '5001'))
@@ -27,6 +41,115 @@ class Config:
     TFIDF_NGRAM_RANGE = (1, 2)
     DEFAULT_RECOMMENDATIONS_COUNT = int(os.getenv('DEFAULT_RECOMMENDATIONS_COUNT', '5'))
     
+    # Catalog loading
+    CATALOG_BATCH_SIZE = int(os.getenv('CATALOG_BATCH_SIZE', '1000'))
+    
+    # Model artifacts (warm start)
+    MODEL_ARTIFACTS_ENABLED = os.getenv('MODEL_ARTIFACTS_ENABLED', 'True').lower() == 'true'
+    MODEL_ARTIFACT_DIR = os.getenv('MODEL_ARTIFACT_DIR', 'model_artifacts')
+    
+    # Content-based neighbor table (top-K precomputed)
+    CONTENT_NEIGHBORS_ENABLED = os.getenv('CONTENT_NEIGHBORS_ENABLED', 'True').lower() == 'true'
+    CONTENT_NEIGHBORS_K = int(os.getenv('CONTENT_NEIGHBORS_K', '50'))
+    CONTENT_NEIGHBORS_BLOCK_MB = float(os.getenv('CONTENT_NEIGHBORS_BLOCK_MB', '64'))
+    
+    # Approximate nearest neighbour (exact | lsh | ivf)
+    ANN_ENGINE = os.getenv('ANN_ENGINE', 'exact')
+    ANN_MIN_BOOKS = int(os.getenv('ANN_MIN_BOOKS', '50000'))
+    ANN_LSH_TABLES = int(os.getenv('ANN_LSH_TABLES', '16'))
+    ANN_LSH_BITS = int(os.getenv('ANN_LSH_BITS', '12'))
+    ANN_IVF_PROBE = int(os.getenv('ANN_IVF_PROBE', '8'))
+    ANN_LSA_COMPONENTS = int(os.getenv('ANN_LSA_COMPONENTS', '128'))
+    
+    # Collaborative filtering (user_user | item_item | als)
+    COLLABORATIVE_STRATEGY = os.getenv('COLLABORATIVE_STRATEGY', 'user_user')
+    ITEM_CF_NEIGHBORS = int(os.getenv('ITEM_CF_NEIGHBORS', '50'))
+    ITEM_CF_MIN_CO_RATINGS = int(os.getenv('ITEM_CF_MIN_CO_RATINGS', '2'))
+    
+    # Implicit feedback (user_interactions, borrowings)
+    IMPLICIT_FEEDBACK_ENABLED = os.getenv('IMPLICIT_FEEDBACK_ENABLED', 'True').lower() == 'true'
+    IMPLICIT_EVENT_WEIGHTS = {
+        event.split(':')[0].strip().lower(): float(event.split(':')[1])
+        for event in os.getenv(
+            'IMPLICIT_EVENT_WEIGHTS',
+            'view:1,click:1.5,read:3,bookmark:3,read_later:2,like:4,share:3,review:4,rating:2,borrow:5'
+        ).split(',') if ':' in event
+    }
+    IMPLICIT_DEFAULT_WEIGHT = float(os.getenv('IMPLICIT_DEFAULT_WEIGHT', '1'))
+    IMPLICIT_HALF_LIFE_DAYS = float(os.getenv('IMPLICIT_HALF_LIFE_DAYS', '90'))
+    IMPLICIT_DURATION_SCALE = float(os.getenv('IMPLICIT_DURATION_SCALE', '300'))  # seconds
+    IMPLICIT_PSEUDO_RATING = float(os.getenv('IMPLICIT_PSEUDO_RATING', '3.5'))
+    
+    # Matrix factorization (ALS)
+    ALS_ENABLED = os.getenv('ALS_ENABLED', 'True').lower() == 'true'
+    ALS_FACTORS = int(os.getenv('ALS_FACTORS', '32'))
+    ALS_ITERATIONS = int(os.getenv('ALS_ITERATIONS', '10'))
+    ALS_REGULARIZATION = float(os.getenv('ALS_REGULARIZATION', '0.1'))
+    ALS_WORKERS = int(os.getenv('ALS_WORKERS', '0'))  # 0 = semua core
+    ALS_INTERACTION_WEIGHT = float(os.getenv('ALS_INTERACTION_WEIGHT', '0.25'))
+    
+    # Incremental rating updates
+    RATING_WRITE_BATCH_SIZE = int(os.getenv('RATING_WRITE_BATCH_SIZE', '100'))
+    RATING_WRITE_FLUSH_INTERVAL = float(os.getenv('RATING_WRITE_FLUSH_INTERVAL', '2'))  # seconds
+    USER_PROFILE_CACHE_SIZE = int(os.getenv('USER_PROFILE_CACHE_SIZE', '10000'))
+    
+    # Local query expansion (keywords, genres, TF-IDF co-occurrence)
+    QUERY_EXPANSION_ENABLED = os.getenv('QUERY_EXPANSION_ENABLED', 'True').lower() == 'true'
+    QUERY_EXPANSION_NEIGHBORS = int(os.getenv('QUERY_EXPANSION_NEIGHBORS', '5'))
+    QUERY_EXPANSION_PHRASE_TERMS = int(os.getenv('QUERY_EXPANSION_PHRASE_TERMS', '20'))
+    QUERY_EXPANSION_COOC_WEIGHT = float(os.getenv('QUERY_EXPANSION_COOC_WEIGHT', '0.3'))
+    QUERY_EXPANSION_PHRASE_WEIGHT = float(os.getenv('QUERY_EXPANSION_PHRASE_WEIGHT', '1.0'))
+    AI_KEYWORD_LLM_ENABLED = os.getenv('AI_KEYWORD_LLM_ENABLED', 'True').lower() == 'true'
+    AI_KEYWORD_LLM_BUDGET = float(os.getenv('AI_KEYWORD_LLM_BUDGET', '1.0'))  # seconds
+    
+    # Hybrid recommendation (strategi paralel dengan deadline)
+    HYBRID_WORKERS = int(os.getenv('HYBRID_WORKERS', '8'))
+    HYBRID_DEADLINE = float(os.getenv('HYBRID_DEADLINE', '3.0'))  # seconds
+    HYBRID_CONTENT_TIMEOUT = float(os.getenv('HYBRID_CONTENT_TIMEOUT', '1.0'))  # seconds
+    HYBRID_COLLABORATIVE_TIMEOUT = float(os.getenv('HYBRID_COLLABORATIVE_TIMEOUT', '2.0'))  # seconds
+    HYBRID_AI_TIMEOUT = float(os.getenv('HYBRID_AI_TIMEOUT', '2.5'))  # seconds
+    HYBRID_FUSION_METHOD = os.getenv('HYBRID_FUSION_METHOD', 'weighted')  # weighted | rrf
+    HYBRID_FUSION_CANDIDATES = int(os.getenv('HYBRID_FUSION_CANDIDATES', '3'))  # kandidat = n x nilai ini
+    HYBRID_WEIGHT_CONTENT = float(os.getenv('HYBRID_WEIGHT_CONTENT', '1.0'))
+    HYBRID_WEIGHT_COLLABORATIVE = float(os.getenv('HYBRID_WEIGHT_COLLABORATIVE', '1.0'))
+    HYBRID_WEIGHT_AI = float(os.getenv('HYBRID_WEIGHT_AI', '1.0'))
+    
+    # Keyword extraction cache (OpenAI)
+    KEYWORD_CACHE_ENABLED = os.getenv('KEYWORD_CACHE_ENABLED', 'True').lower() == 'true'
+    KEYWORD_CACHE_SIZE = int(os.getenv('KEYWORD_CACHE_SIZE', '5000'))
+    KEYWORD_CACHE_PATH = os.getenv('KEYWORD_CACHE_PATH', os.path.join(MODEL_ARTIFACT_DIR, 'keyword_cache.jsonl'))
+    
+    # Batch precompute (precomputed_recommendations)
+    PRECOMPUTE_SERVE_ENABLED = os.getenv('PRECOMPUTE_SERVE_ENABLED', 'True').lower() == 'true'
+    PRECOMPUTE_COLLECTION = os.getenv('PRECOMPUTE_COLLECTION', 'precomputed_recommendations')
+    PRECOMPUTE_TOP_N = int(os.getenv('PRECOMPUTE_TOP_N', '20'))
+    PRECOMPUTE_WORKERS = int(os.getenv('PRECOMPUTE_WORKERS', '0'))  # 0 = semua core
+    PRECOMPUTE_SHARD_SIZE = int(os.getenv('PRECOMPUTE_SHARD_SIZE', '500'))
+    PRECOMPUTE_ACTIVE_DAYS = float(os.getenv('PRECOMPUTE_ACTIVE_DAYS', '90'))  # 0 = semua user
+    PRECOMPUTE_MAX_AGE_HOURS = float(os.getenv('PRECOMPUTE_MAX_AGE_HOURS', '36'))
+    
+    # Incremental catalog sync
+    CATALOG_SYNC_ENABLED = os.getenv('CATALOG_SYNC_ENABLED', 'True').lower() == 'true'
+    CATALOG_SYNC_INTERVAL = float(os.getenv('CATALOG_SYNC_INTERVAL', '60'))  # seconds
+    CATALOG_FULL_REBUILD_INTERVAL = float(os.getenv('CATALOG_FULL_REBUILD_INTERVAL', '86400'))  # 1 day
+    CATALOG_FULL_REBUILD_CHANGE_RATIO = float(os.getenv('CATALOG_FULL_REBUILD_CHANGE_RATIO', '0.2'))
+    
+    # Chat context cache (invalidasi per user saat aktivitas berubah)
+    CHAT_CONTEXT_CACHE_ENABLED = os.getenv('CHAT_CONTEXT_CACHE_ENABLED', 'True').lower() == 'true'
+    CHAT_CONTEXT_CACHE_SIZE = int(os.getenv('CHAT_CONTEXT_CACHE_SIZE', '5000'))
+    CHAT_CONTEXT_TTL = float(os.getenv('CHAT_CONTEXT_TTL', '900'))  # seconds
+    USER_ACTIVITY_WATCH_ENABLED = os.getenv('USER_ACTIVITY_WATCH_ENABLED', 'True').lower() == 'true'
+    USER_ACTIVITY_POLL_INTERVAL = float(os.getenv('USER_ACTIVITY_POLL_INTERVAL', '5'))  # seconds
+    
+    # Conversation history store (memory | sqlite)
+    CONVERSATION_STORE = os.getenv('CONVERSATION_STORE', 'memory')
+    CONVERSATION_MAX_MESSAGES = int(os.getenv('CONVERSATION_MAX_MESSAGES', '10'))
+    CONVERSATION_MAX_USERS = int(os.getenv('CONVERSATION_MAX_USERS', '10000'))
+    CONVERSATION_MAX_BYTES = int(os.getenv('CONVERSATION_MAX_BYTES', str(64 * 1024 * 1024)))
+    CONVERSATION_TTL = float(os.getenv('CONVERSATION_TTL', '3600'))  # seconds idle
+    CONVERSATION_DB_PATH = os.getenv('CONVERSATION_DB_PATH', os.path.join(MODEL_ARTIFACT_DIR, 'conversations.sqlite3'))
+    CONVERSATION_SWEEP_INTERVAL = float(os.getenv('CONVERSATION_SWEEP_INTERVAL', '60'))  # seconds
+    
     # Logging
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FILE_ENABLED = os.getenv('LOG_FILE_ENABLED', 'True').lower() == 'true'
@@ -38,6 +161,8 @@ class Config:
     # Cache
     CACHE_ENABLED = os.getenv('CACHE_ENABLED', 'True').lower() == 'true'
     CACHE_TTL = int(os.getenv('CACHE_TTL', '3600'))  # 1 hour
+    RESULT_CACHE_MAX_ENTRIES = int(os.getenv('RESULT_CACHE_MAX_ENTRIES', '10000'))
+    RESULT_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
     
     @classmethod
     def validate(cls):
@@ -0,0 +1,246 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from scipy import sparse
+from typing import Any, Dict, List, Optional, Tuple
+from config.settings import Config
+from .implicit_feedback import implicit_cells, implicit_confidence
+from .user_item_matrix import UserItemMatrix, _clean_cells, _csr_keep_last
+
+class AlsModel:
+    """Faktorisasi matrix rating (ALS) : rating(u, i) ~ global_mean + user_factors[u] . item_factors[i]"""
+
+    def __init__(self, user_factors: np.ndarray, item_factors: np.ndarray, user_ids: np.ndarray,
+                 book_ids: np.ndarray, global_mean: float, regularization: float,
+                 rating_counts: Optional[np.ndarray] = None,
+                 training_report: Optional[List[Dict[str, float]]] = None,
+                 rating_checksums: Optional[np.ndarray] = None):
+        """Inisialisasi AlsModel
+
+        rating_counts = jumlah rating per user saat training, rating_checksums = rating_checksum
+        baris user saat training (dibandingkan saat serving untuk mendeteksi rating yang berubah).
+        """
+        self.user_factors = user_factors
+        self.item_factors = item_factors
+        self.user_ids = user_ids
+        self.book_ids = book_ids
+        self.global_mean = global_mean
+        self.regularization = regularization
+        self.rating_counts = rating_counts if rating_counts is not None else np.zeros(len(user_ids), dtype=np.int32)
+        self.training_report = training_report or []
+        self.rating_checksums = (rating_checksums if rating_checksums is not None
+                                 else np.zeros(len(user_ids), dtype=np.uint64))
+        self._user_rows: Dict[str, int] = {user_id: row for row, user_id in enumerate(user_ids)}
+        self._book_index = pd.Index(book_ids)
+        # Cache satu slot: posisi baris item untuk axis buku UserItemMatrix terakhir
+        self._aligned: Tuple[Any, Optional[np.ndarray]] = (None, None)
+
+    @property
+    def factors(self) -> int:
+        return self.item_factors.shape[1]
+
+    def user_row(self, user_id: Any) -> Optional[int]:
+        """Baris faktor user, atau None jika user belum ada saat training"""
+        return self._user_rows.get(str(user_id)) if user_id is not None else None
+
+    def item_positions(self, book_ids: np.ndarray) -> np.ndarray:
+        """Baris faktor item untuk setiap book_id (-1 jika buku belum ada saat training)"""
+        cached_ids, positions = self._aligned
+        if cached_ids is not book_ids:
+            positions = self._book_index.get_indexer(pd.Index(book_ids).astype(str))
+            self._aligned = (book_ids, positions)
+        return positions
+
+    def fold_in(self, item_rows: np.ndarray, ratings: np.ndarray) -> np.ndarray:
+        """Vektor faktor user baru dari ratingnya dengan satu solve least-squares (item factors tetap)"""
+        factors = self.item_factors[item_rows]
+        gram = factors.T @ factors + self.regularization * max(len(item_rows), 1) * np.eye(self.factors)
+        return np.linalg.solve(gram, factors.T @ (np.asarray(ratings, dtype=np.float64) - self.global_mean))
+
+    def predict(self, user_vector: np.ndarray) -> np.ndarray:
+        """Prediksi rating semua item untuk satu vektor user (satu perkalian matrix-vektor)"""
+        return self.item_factors @ user_vector + self.global_mean
+
+def _cell_hashes(book_ids: Any, ratings: Any) -> np.ndarray:
+    """Hash 64-bit setiap pasangan (book_id, rating)"""
+    keys = (pd.Series(np.asarray(book_ids, dtype=object)).astype(str) + '\x00'
+            + pd.Series(np.asarray(ratings, dtype=np.float64)).astype(str))
+    return pd.util.hash_array(keys.to_numpy(dtype=object))
+
+def rating_checksum(book_ids: Any, ratings: Any) -> int:
+    """Checksum rating satu user yang tidak bergantung urutan (jumlah hash sel modulo 2^64)"""
+    return int(_cell_hashes(book_ids, ratings).sum(dtype=np.uint64))
+
+def als_training_matrices(ratings_df: pd.DataFrame, implicit: Optional[UserItemMatrix] = None,
+                          pseudo_rating: Optional[float] = None,
+                          interaction_weight: Optional[float] = None):
+    """Matrix nilai dan bobot untuk training ALS beserta axis user/buku
+
+    Rating eksplisit berbobot 1; pasangan implicit yang belum dirating dipakai sebagai observasi
+    lemah bernilai pseudo_rating dengan bobot interaction_weight x konfidensi sinyalnya.
+    """
+    pseudo_rating = Config.IMPLICIT_PSEUDO_RATING if pseudo_rating is None else pseudo_rating
+    interaction_weight = Config.ALS_INTERACTION_WEIGHT if interaction_weight is None else interaction_weight
+
+    ratings = _clean_cells(ratings_df)
+    ratings['weight'] = 1.0
+    frames = []
+    if interaction_weight > 0 and implicit is not None and not implicit.empty:
+        interactions = implicit_cells(implicit)
+        interactions['rating_value'] = float(pseudo_rating)
+        interactions['weight'] = interaction_weight * implicit_confidence(interactions.pop('strength').to_numpy())
+        frames.append(interactions)
+    # Implicit lebih dulu sehingga rating eksplisit (entri terakhir) menimpa pasangan yang sama
+    frames.append(ratings)
+    cells = pd.concat(frames, ignore_index=True)
+    if cells.empty:
+        return None
+
+    user_codes, user_ids = pd.factorize(cells['user_id'])
+    book_codes, book_ids = pd.factorize(cells['book_id'])
+    shape = (len(user_ids), len(book_ids))
+    # Posisi sel (1-based) yang dipertahankan; nilai dan bobot diambil dari posisi yang sama
+    positions = _csr_keep_last(user_codes, book_codes, np.arange(1, len(cells) + 1, dtype=np.float64), shape)
+    keep = positions.data.astype(np.int64) - 1
+    values, weights = positions.copy(), positions.copy()
+    values.data = cells['rating_value'].to_numpy(dtype=np.float64)[keep]
+    weights.data = cells['weight'].to_numpy(dtype=np.float64)[keep]
+    # Jumlah rating unik per user; dipakai serving untuk mendeteksi rating baru setelah training
+    unique_ratings = ratings.drop_duplicates(['user_id', 'book_id'])
+    rating_counts = np.bincount(
+        pd.Index(user_ids).get_indexer(unique_ratings['user_id']), minlength=len(user_ids)
+    )
+    # Checksum baris user seperti di UserItemMatrix (rating terbaru per buku, rating 0 bukan sel)
+    latest = ratings.drop_duplicates(['user_id', 'book_id'], keep='last')
+    latest = latest[latest['rating_value'].astype(np.float64) != 0]
+    rating_checksums = np.zeros(len(user_ids), dtype=np.uint64)
+    np.add.at(rating_checksums, pd.Index(user_ids).get_indexer(latest['user_id']),
+              _cell_hashes(latest['book_id'], latest['rating_value']))
+    return (
+        values, weights, np.asarray(user_ids, dtype=object), np.asarray(book_ids, dtype=object),
+        rating_counts.astype(np.int32), rating_checksums
+    )
+
+def _row_batches(matrix: sparse.csr_matrix, n_factors: int, block_memory_mb: float) -> List[np.ndarray]:
+    """Kelompok baris berpanjangan serupa sehingga tensor padded satu batch (b x L x f) muat di anggaran
+
+    Baris diurutkan menurut jumlah observasi agar padding ke panjang maksimum batch tetap kecil.
+    """
+    counts = np.diff(matrix.indptr)
+    rows = np.argsort(counts, kind='stable')
+    rows = rows[counts[rows] > 0]
+    budget = max(1, int(block_memory_mb * 1024 * 1024 // (n_factors * 8)))
+
+    batches, start = [], 0
+    while start < len(rows):
+        end = min(start + max(1, budget // counts[rows[start]]), len(rows))
+        # Panjang padded = baris terpanjang batch (terakhir); perkecil sampai muat
+        while end - start > 1 and (end - start) * counts[rows[end - 1]] > budget:
+            end = start + max(1, budget // counts[rows[end - 1]])
+        batches.append(rows[start:end])
+        start = end
+    return batches
+
+def _solve_batch(values: sparse.csr_matrix, weights: sparse.csr_matrix, fixed: np.ndarray,
+                 regularization: float, rows: np.ndarray) -> np.ndarray:
+    """Solve least-squares berbobot untuk sekumpulan baris sekaligus (matmul + np.linalg.solve batch)"""
+    n_factors = fixed.shape[1]
+    starts = values.indptr[rows]
+    counts = values.indptr[rows + 1] - starts
+    length = int(counts.max())
+    offsets = np.arange(length)
+    present = offsets[None, :] < counts[:, None]
+    positions = np.where(present, starts[:, None] + offsets[None, :], 0)
+
+    # Slot padding berbobot 0 sehingga tidak memengaruhi gram maupun rhs
+    entry_weights = weights.data[positions] * present
+    factors = fixed[values.indices[positions]]
+    weighted_t = (factors * entry_weights[:, :, None]).transpose(0, 2, 1)
+
+    gram = weighted_t @ factors
+    rhs = (weighted_t @ values.data[positions][:, :, None])[:, :, 0]
+    # ALS-WR: regularisasi sebanding dengan total bobot observasi setiap baris
+    penalty = regularization * entry_weights.sum(axis=1)
+    gram += penalty[:, None, None] * np.eye(n_factors)
+    return np.linalg.solve(gram, rhs[:, :, None])[:, :, 0]
+
+def _solve_side(values: sparse.csr_matrix, weights: sparse.csr_matrix, fixed: np.ndarray,
+                regularization: float, executor: ThreadPoolExecutor, block_memory_mb: float) -> np.ndarray:
+    """Hitung ulang seluruh faktor satu sisi; batch-batch diproses paralel oleh executor
+
+    Baris tanpa observasi tetap bernilai nol.
+    """
+    result = np.zeros((values.shape[0], fixed.shape[1]))
+    futures = [
+        (rows, executor.submit(_solve_batch, values, weights, fixed, regularization, rows))
+        for rows in _row_batches(values, fixed.shape[1], block_memory_mb)
+    ]
+    for rows, future in futures:
+        result[rows] = future.result()
+    return result
+
+def _rmse(values: sparse.csr_matrix, user_factors: np.ndarray, item_factors: np.ndarray) -> float:
+    """RMSE pada entri training (nilai sudah dikurangi global mean)"""
+    coo = values.tocoo()
+    predictions = np.einsum('ij,ij->i', user_factors[coo.row], item_factors[coo.col])
+    return float(np.sqrt(np.mean((coo.data - predictions) ** 2))) if coo.nnz else 0.0
+
+def train_als(values: sparse.csr_matrix, weights: sparse.csr_matrix, user_ids: np.ndarray, book_ids: np.ndarray,
+              rating_counts: Optional[np.ndarray] = None, rating_checksums: Optional[np.ndarray] = None,
+              factors: Optional[int] = None,
+              iterations: Optional[int] = None, regularization: Optional[float] = None,
+              workers: Optional[int] = None, block_memory_mb: Optional[float] = None,
+              random_state: int = 42) -> AlsModel:
+    """Training ALS berbobot: bergantian solve faktor user dan item sampai iterations
+
+    Setiap setengah iterasi dipecah menjadi batch baris yang di-solve sekaligus; batch dibagi ke
+    workers thread (default semua core), BLAS/LAPACK melepas GIL sehingga batch berjalan paralel.
+    """
+    from utils.logger import ai_logger
+
+    factors = factors or Config.ALS_FACTORS
+    iterations = iterations or Config.ALS_ITERATIONS
+    regularization = Config.ALS_REGULARIZATION if regularization is None else regularization
+    workers = workers or Config.ALS_WORKERS or os.cpu_count() or 1
+    block_memory_mb = block_memory_mb or Config.CONTENT_NEIGHBORS_BLOCK_MB
+
+    global_mean = float(np.average(values.data, weights=weights.data)) if values.nnz else 0.0
+    centered = values.copy()
+    centered.data = centered.data - global_mean
+    centered_t, weights_t = centered.T.tocsr(), weights.T.tocsr()
+
+    rng = np.random.default_rng(random_state)
+    user_factors = np.zeros((values.shape[0], factors))
+    item_factors = rng.normal(scale=0.1, size=(values.shape[1], factors))
+
+    report = []
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for iteration in range(1, iterations + 1):
+            iteration_start = time.time()
+            user_factors = _solve_side(centered, weights, item_factors, regularization, executor, block_memory_mb)
+            item_factors = _solve_side(centered_t, weights_t, user_factors, regularization, executor, block_memory_mb)
+            seconds = time.time() - iteration_start
+            rmse = _rmse(centered, user_factors, item_factors)
+            report.append({'iteration': iteration, 'seconds': seconds, 'rmse': rmse})
+            ai_logger.logger.info(f"ALS iteration {iteration}/{iterations}: {seconds:.2f}s, train RMSE {rmse:.4f}")
+
+    ai_logger.log_performance(
+        "AlsModel", f"train {values.shape[0]}x{values.shape[1]} f={factors} ({workers} workers)",
+        time.time() - start_time
+    )
+    return AlsModel(
+        user_factors.astype(np.float32), item_factors.astype(np.float32), user_ids, book_ids,
+        global_mean, regularization, rating_counts, report, rating_checksums
+    )
+
+def build_als_model(ratings_df: pd.DataFrame, implicit: Optional[UserItemMatrix] = None,
+                    **params) -> Optional[AlsModel]:
+    """Training ALS dari ratings dan sinyal implicit snapshot; None jika tidak ada data"""
+    matrices = als_training_matrices(ratings_df, implicit)
+    if matrices is None:
+        return None
+    values, weights, user_ids, book_ids, rating_counts, rating_checksums = matrices
+    return train_als(values, weights, user_ids, book_ids, rating_counts, rating_checksums, **params)
@@ -0,0 +1,196 @@
+import time
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+from typing import Any, Dict, Optional, Tuple
+from config.settings import Config
+
+def _top_k(scores: np.ndarray, candidates: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Ambil k kandidat dengan skor tertinggi, terurut menurun; sisa slot diisi -1/-inf"""
+    indices = np.full(k, -1, dtype=np.int64)
+    top_scores = np.full(k, -np.inf, dtype=np.float32)
+    n = min(k, len(candidates))
+    if n == 0:
+        return indices, top_scores
+    top = np.argpartition(-scores, n - 1)[:n] if n < len(scores) else np.arange(len(scores))
+    top = top[np.argsort(-scores[top], kind='stable')]
+    indices[:n] = candidates[top]
+    top_scores[:n] = scores[top]
+    return indices, top_scores
+
+class AnnIndex:
+    """Index nearest-neighbour cosine atas baris TF-IDF; subclass menentukan cara memilih kandidat
+
+    Semua engine me-rerank kandidat dengan cosine exact, sehingga skor yang dikembalikan
+    sebanding dengan jalur exact; yang dikorbankan hanya recall.
+    """
+
+    name = 'exact'
+
+    def __init__(self, tfidf_matrix: Any):
+        """Inisialisasi index dari TF-IDF matrix (baris dinormalisasi L2)"""
+        self.matrix = normalize(tfidf_matrix.tocsr().astype(np.float32))
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    def params(self) -> Dict[str, Any]:
+        """Parameter tuning engine untuk monitoring/benchmark"""
+        return {}
+
+    def _candidates(self, vector: sparse.csr_matrix) -> Optional[np.ndarray]:
+        """Baris kandidat untuk satu query; None berarti seluruh katalog"""
+        return None
+
+    def query(self, vectors: Any, k: int, exclude: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k tetangga untuk setiap baris query
+
+        exclude berisi satu indeks baris per query yang tidak boleh muncul (misalnya buku
+        itu sendiri), atau -1. Hasil berukuran (n_query, k), diisi -1/-inf bila kandidat kurang.
+        """
+        vectors = normalize(sparse.csr_matrix(vectors, dtype=np.float32))
+        n_query = vectors.shape[0]
+        indices = np.full((n_query, k), -1, dtype=np.int64)
+        scores = np.full((n_query, k), -np.inf, dtype=np.float32)
+
+        for row in range(n_query):
+            vector = vectors[row]
+            candidates = self._candidates(vector)
+            if candidates is None:
+                candidates = np.arange(len(self))
+                row_scores = (self.matrix @ vector.T).toarray().ravel()
+            else:
+                row_scores = (self.matrix[candidates] @ vector.T).toarray().ravel()
+            if exclude is not None and exclude[row] >= 0:
+                keep = candidates != exclude[row]
+                candidates, row_scores = candidates[keep], row_scores[keep]
+            indices[row], scores[row] = _top_k(row_scores, candidates, k)
+
+        return indices, scores
+
+class RandomProjectionLSH(AnnIndex):
+    """LSH random hyperplane: n_tables tabel hash, masing-masing n_bits bit signature
+
+    Lebih banyak tabel menaikkan recall, lebih banyak bit memperkecil bucket (lebih cepat).
+    multi_probe juga memeriksa bucket dengan jarak Hamming 1.
+    """
+
+    name = 'lsh'
+
+    def __init__(self, tfidf_matrix: Any, n_tables: Optional[int] = None, n_bits: Optional[int] = None,
+                 multi_probe: bool = True, random_state: int = 42):
+        """Inisialisasi RandomProjectionLSH dan hash seluruh katalog"""
+        super().__init__(tfidf_matrix)
+        self.n_tables = n_tables or Config.ANN_LSH_TABLES
+        self.n_bits = min(n_bits or Config.ANN_LSH_BITS, 62)
+        self.multi_probe = multi_probe
+
+        rng = np.random.default_rng(random_state)
+        self.hyperplanes = rng.standard_normal(
+            (self.matrix.shape[1], self.n_tables * self.n_bits)
+        ).astype(np.float32)
+        self._weights = np.left_shift(np.int64(1), np.arange(self.n_bits, dtype=np.int64))
+
+        # Tabel berbasis array: kode terurut + posisi awal setiap bucket
+        codes = self._codes(self.matrix)
+        self._orders, self._keys, self._starts = [], [], []
+        for table in range(self.n_tables):
+            order = np.argsort(codes[:, table], kind='stable')
+            keys, starts = np.unique(codes[order, table], return_index=True)
+            self._orders.append(order)
+            self._keys.append(keys)
+            self._starts.append(np.append(starts, len(order)))
+
+    def params(self) -> Dict[str, Any]:
+        return {'n_tables': self.n_tables, 'n_bits': self.n_bits, 'multi_probe': self.multi_probe}
+
+    def _codes(self, vectors) -> np.ndarray:
+        """Signature per tabel (n, n_tables) sebagai int64"""
+        bits = np.asarray(vectors @ self.hyperplanes) > 0
+        bits = bits.reshape(vectors.shape[0], self.n_tables, self.n_bits)
+        return bits.astype(np.int64) @ self._weights
+
+    def _candidates(self, vector: sparse.csr_matrix) -> Optional[np.ndarray]:
+        codes = self._codes(vector)[0]
+        found = []
+        for table, code in enumerate(codes):
+            probes = [code]
+            if self.multi_probe:
+                probes.extend(code ^ self._weights)
+            keys = self._keys[table]
+            positions = np.searchsorted(keys, probes)
+            for probe, position in zip(probes, positions):
+                if position < len(keys) and keys[position] == probe:
+                    start, end = self._starts[table][position], self._starts[table][position + 1]
+                    found.append(self._orders[table][start:end])
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
+
+class IvfLsaIndex(AnnIndex):
+    """Inverted file di ruang LSA: TF-IDF direduksi dengan TruncatedSVD lalu dikelompokkan k-means
+
+    Query hanya memeriksa n_probe cluster terdekat; n_probe lebih besar menaikkan recall.
+    """
+
+    name = 'ivf'
+
+    def __init__(self, tfidf_matrix: Any, n_lists: Optional[int] = None, n_probe: Optional[int] = None,
+                 n_components: Optional[int] = None, random_state: int = 42):
+        """Inisialisasi IvfLsaIndex: reduksi LSA lalu bangun cluster"""
+        from sklearn.cluster import MiniBatchKMeans
+        from sklearn.decomposition import TruncatedSVD
+
+        super().__init__(tfidf_matrix)
+        n_books, n_features = self.matrix.shape
+        self.n_components = max(1, min(n_components or Config.ANN_LSA_COMPONENTS, n_features - 1, n_books - 1))
+        self.n_lists = max(1, min(n_lists or int(np.sqrt(n_books)), n_books))
+        self.n_probe = min(n_probe or Config.ANN_IVF_PROBE, self.n_lists)
+
+        self.svd = TruncatedSVD(n_components=self.n_components, random_state=random_state)
+        reduced = normalize(self.svd.fit_transform(self.matrix)).astype(np.float32)
+        kmeans = MiniBatchKMeans(
+            n_clusters=self.n_lists, random_state=random_state, n_init=3,
+            batch_size=max(1024, self.n_lists * 4)
+        )
+        labels = kmeans.fit_predict(reduced)
+        self.centroids = normalize(kmeans.cluster_centers_).astype(np.float32)
+
+        order = np.argsort(labels, kind='stable')
+        self._order = order
+        self._starts = np.searchsorted(labels[order], np.arange(self.n_lists + 1))
+
+    def params(self) -> Dict[str, Any]:
+        return {'n_lists': self.n_lists, 'n_probe': self.n_probe, 'n_components': self.n_components}
+
+    def _candidates(self, vector: sparse.csr_matrix) -> Optional[np.ndarray]:
+        reduced = normalize(self.svd.transform(vector)).astype(np.float32)[0]
+        centroid_scores = self.centroids @ reduced
+        n_probe = self.n_probe
+        lists = np.argpartition(-centroid_scores, n_probe - 1)[:n_probe] if n_probe < self.n_lists else range(self.n_lists)
+        return np.concatenate([self._order[self._starts[i]:self._starts[i + 1]] for i in lists])
+
+ANN_ENGINES = {
+    AnnIndex.name: AnnIndex,
+    RandomProjectionLSH.name: RandomProjectionLSH,
+    IvfLsaIndex.name: IvfLsaIndex
+}
+
+def build_ann_index(tfidf_matrix: Any, engine: Optional[str] = None, **params) -> Optional[AnnIndex]:
+    """Bangun index ANN sesuai engine; None untuk engine exact atau katalog kecil
+
+    Di bawah ANN_MIN_BOOKS jalur exact sudah cukup cepat sehingga index tidak dibangun.
+    """
+    from utils.logger import ai_logger
+
+    engine = engine or Config.ANN_ENGINE
+    if tfidf_matrix is None or engine == AnnIndex.name or tfidf_matrix.shape[0] < Config.ANN_MIN_BOOKS:
+        return None
+    if engine not in ANN_ENGINES:
+        ai_logger.logger.warning(f"Unknown ANN engine '{engine}', using exact search")
+        return None
+
+    start_time = time.time()
+    index = ANN_ENGINES[engine](tfidf_matrix, **params)
+    ai_logger.log_performance("AnnIndex", f"build {engine} {index.params()}", time.time() - start_time)
+    return index
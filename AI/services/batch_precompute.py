@@ -0,0 +1,190 @@
+import multiprocessing
+import os
+import time
+import uuid
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from pymongo import ReplaceOne
+from typing import Any, Dict, List, Optional, Tuple
+from config.settings import Config
+from .catalog_snapshot import CatalogSnapshot
+from .recommendation_service import RecommendationService, fuse_recommendations, hybrid_fusion_weights
+
+# Service milik proses worker; diwarisi lewat fork atau dibangun initializer pada platform spawn
+_worker_service: Optional[RecommendationService] = None
+
+def _init_worker():
+    """Initializer worker: bangun RecommendationService sendiri jika tidak diwarisi dari parent"""
+    global _worker_service
+    if _worker_service is None:
+        _worker_service = RecommendationService()
+
+def active_users(snapshot: CatalogSnapshot, active_days: Optional[float] = None) -> List[str]:
+    """User yang memberi rating dalam active_days hari terakhir (0 = semua user di matrix)"""
+    active_days = Config.PRECOMPUTE_ACTIVE_DAYS if active_days is None else active_days
+    user_ids = snapshot.user_item_matrix.user_ids
+    ratings_df = snapshot.ratings_df
+    if not active_days or ratings_df.empty or 'rating_date' not in ratings_df.columns:
+        return [str(user_id) for user_id in user_ids]
+
+    rated_at = ratings_df['rating_date']
+    if 'timestamp' in ratings_df.columns:
+        rated_at = rated_at.fillna(ratings_df['timestamp'])
+    cutoff = pd.Timestamp.now() - pd.Timedelta(days=active_days)
+    recent = set(ratings_df.loc[rated_at.to_numpy() >= cutoff.to_datetime64(), 'user_id'].astype(str))
+    return [str(user_id) for user_id in user_ids if str(user_id) in recent]
+
+def precompute_user(service: RecommendationService, snapshot: CatalogSnapshot, user_id: str,
+                    n: int, strategy: str) -> Dict[str, Any]:
+    """Daftar content, collaborative dan fused untuk satu user (tanpa cache/tabel precompute)
+
+    Skor internal ikut disimpan; dibuang saat dilayani ke user. Daftar fused memakai
+    fuse_recommendations dengan metode dan bobot yang sama seperti hybrid mode fused live.
+    """
+    collaborative = []
+    try:
+        collaborative = service._collaborative_recommendations(user_id, n, strategy, snapshot)
+    except Exception as e:
+        from utils.logger import ai_logger
+        ai_logger.log_error("RecommendationPrecompute", f"collaborative {user_id}: {str(e)}")
+
+    # Content-based dari buku dengan rating tertinggi user, tanpa buku yang sudah dibaca
+    content = []
+    user_item_matrix = snapshot.user_item_matrix
+    _, read_cols, read_ratings = service.catalog_store.rating_overlay.merged_ratings(user_item_matrix, user_id)
+    if len(read_cols):
+        read_books = set(str(book_id) for book_id in user_item_matrix.book_ids[read_cols])
+        seed_book = user_item_matrix.book_ids[read_cols[int(np.argmax(read_ratings))]]
+        candidates = service.get_content_based_recommendations(seed_book, n + len(read_books), with_scores=True)
+        content = [book for book in candidates if str(book.get('book_id')) not in read_books][:n]
+
+    return {
+        '_id': str(user_id),
+        'user_id': str(user_id),
+        'strategy': strategy,
+        'n': n,
+        'collaborative': collaborative,
+        'content_based': content,
+        'fusion': Config.HYBRID_FUSION_METHOD,
+        'fused': fuse_recommendations(
+            {'content_based': content, 'collaborative': collaborative}, n,
+            Config.HYBRID_FUSION_METHOD, hybrid_fusion_weights()
+        )
+    }
+
+def _compute_shard(task: Tuple[int, List[str], int, str]) -> Tuple[int, List[Dict[str, Any]], float]:
+    """Hitung satu shard user di proses worker; hasil dikirim balik ke parent untuk ditulis"""
+    shard_index, user_ids, n, strategy = task
+    start_time = time.time()
+    service = _worker_service
+    snapshot = service.snapshot
+    documents = [precompute_user(service, snapshot, user_id, n, strategy) for user_id in user_ids]
+    return shard_index, documents, time.time() - start_time
+
+class RecommendationPrecomputeJob:
+    """Job batch (mis. nightly) yang menghitung rekomendasi semua user aktif ke koleksi precomputed
+
+    User dibagi menjadi shard yang diproses paralel oleh process pool; setiap shard ditulis dengan
+    satu bulk_write oleh proses parent (koneksi MongoDB tidak dibagi ke worker). Pada run penuh,
+    dokumen dari run sebelumnya untuk user yang tidak lagi aktif dihapus setelah run selesai; run
+    dengan daftar user_ids hanya mengganti dokumen user tersebut.
+    """
+
+    def __init__(self, service: Optional[RecommendationService] = None, workers: Optional[int] = None,
+                 shard_size: Optional[int] = None, top_n: Optional[int] = None, strategy: Optional[str] = None):
+        """Inisialisasi RecommendationPrecomputeJob"""
+        self.service = service or RecommendationService()
+        self.workers = workers or Config.PRECOMPUTE_WORKERS or os.cpu_count() or 1
+        self.shard_size = shard_size or Config.PRECOMPUTE_SHARD_SIZE
+        self.top_n = top_n or Config.PRECOMPUTE_TOP_N
+        self.strategy = strategy or Config.COLLABORATIVE_STRATEGY
+        self.collection = self.service.db[Config.PRECOMPUTE_COLLECTION]
+
+    def run(self, user_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Jalankan job; kembalikan ringkasan throughput dan waktu per shard"""
+        global _worker_service
+        from utils.logger import ai_logger
+
+        start_time = time.time()
+        snapshot = self.service.snapshot
+        # Hanya run penuh (semua user aktif) yang boleh membuang dokumen user lain
+        full_run = user_ids is None
+        user_ids = active_users(snapshot) if full_run else [str(user_id) for user_id in user_ids]
+        shards = [user_ids[i:i + self.shard_size] for i in range(0, len(user_ids), self.shard_size)]
+        tasks = [(index, shard, self.top_n, self.strategy) for index, shard in enumerate(shards)]
+        run_id = uuid.uuid4().hex
+        ai_logger.logger.info(
+            f"Precompute run {run_id}: {len(user_ids)} users in {len(shards)} shards, {self.workers} workers"
+        )
+
+        _worker_service = self.service
+        shard_timings = []
+        written = 0
+        if self.workers > 1 and len(shards) > 1:
+            # fork: worker mewarisi snapshot parent (copy-on-write) tanpa load ulang dari database
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+            with context.Pool(processes=min(self.workers, len(shards)), initializer=_init_worker) as pool:
+                for result in pool.imap_unordered(_compute_shard, tasks):
+                    written += self._write_shard(result, snapshot, run_id, shard_timings)
+        else:
+            for task in tasks:
+                written += self._write_shard(_compute_shard(task), snapshot, run_id, shard_timings)
+
+        removed = self.collection.delete_many({'run_id': {'$ne': run_id}}).deleted_count if full_run and user_ids else 0
+        seconds = time.time() - start_time
+        summary = {
+            'run_id': run_id,
+            'users': len(user_ids),
+            'written': written,
+            'removed_stale': removed,
+            'shards': len(shards),
+            'workers': self.workers,
+            'seconds': round(seconds, 3),
+            'users_per_second': round(len(user_ids) / seconds, 2) if seconds > 0 else None,
+            'shard_seconds': {
+                'p50': round(float(np.percentile([shard['seconds'] for shard in shard_timings], 50)), 3) if shard_timings else None,
+                'max': round(max(shard['seconds'] for shard in shard_timings), 3) if shard_timings else None
+            },
+            'shard_timings': sorted(shard_timings, key=lambda shard: shard['shard'])
+        }
+        ai_logger.log_performance(
+            "RecommendationPrecompute",
+            f"{len(user_ids)} users ({summary['users_per_second']} users/s, {len(shards)} shards)",
+            seconds
+        )
+        return summary
+
+    def _write_shard(self, result: Tuple[int, List[Dict[str, Any]], float], snapshot: CatalogSnapshot,
+                     run_id: str, shard_timings: List[Dict[str, Any]]) -> int:
+        """Tulis hasil satu shard dengan satu bulk_write (upsert per user)"""
+        from utils.logger import ai_logger
+
+        shard_index, documents, compute_seconds = result
+        if not documents:
+            return 0
+        write_start = time.time()
+        generated_at = datetime.now()
+        operations = [
+            ReplaceOne(
+                {'_id': document['_id']},
+                {**document, 'run_id': run_id, 'generated_at': generated_at, 'fingerprint': snapshot.fingerprint},
+                upsert=True
+            )
+            for document in documents
+        ]
+        self.collection.bulk_write(operations, ordered=False)
+        write_seconds = time.time() - write_start
+        shard_timings.append({
+            'shard': shard_index,
+            'users': len(documents),
+            'compute_seconds': round(compute_seconds, 3),
+            'write_seconds': round(write_seconds, 3),
+            'seconds': round(compute_seconds + write_seconds, 3)
+        })
+        ai_logger.logger.info(
+            f"Precompute shard {shard_index}: {len(documents)} users, compute {compute_seconds:.2f}s, "
+            f"write {write_seconds:.2f}s ({len(documents) / max(compute_seconds, 1e-9):.1f} users/s)"
+        )
+        return len(documents)
@@ -1,55 +1,125 @@
-import openai
-from pymongo import MongoClient
-import os
 from dotenv import load_dotenv
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from .recommendation_service import RecommendationService
 from .user_preference_service import UserPreferenceService
-from collections import deque
+from .result_cache import ResultCache
+from .conversation_store import build_conversation_store
+from .llm_provider import LLMProvider
+from config.settings import Config
 from datetime import datetime, timedelta
 from bson import ObjectId
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+import threading
+import time
 
 # Load environment variables
 load_dotenv()
 
+# Jumlah dokumen terbaru per sumber histori (borrowings, interaksi, rating)
+HISTORY_LIMIT = 20
+
+# Field buku yang dipakai teks histori (coverImage dan field besar lain tidak diambil)
+HISTORY_BOOK_FIELDS = ['title', 'author', 'genre']
+
+# Pesan chat yang mengandung salah satu frasa ini meminta rekomendasi secara eksplisit
+RECOMMENDATION_KEYWORDS = [
+    'berikan saya rekomendasi', 'rekomendasi', 'sarankan', 'saran', 
+    'rekomendasikan', 'bagaimana dengan', 'apa yang bagus', 'buku apa yang bagus',
+    'tolong berikan', 'bisa berikan', 'mohon rekomendasi'
+]
+
+# Pembuka respons saat book_id yang disebut tidak ada di koleksi
+BOOK_NOT_FOUND_PREFIX = (
+    "Maaf, buku yang Anda sebutkan belum ada di koleksi kami. Namun, berikut beberapa rekomendasi yang mungkin sesuai dengan preferensi Anda.\n\n"
+)
+
+# Emoji per genre pada daftar rekomendasi chat
+GENRE_EMOJI = {
+    "Fantasi": "🧙‍♂️",
+    "Fiksi Ilmiah": "🚀",
+    "Petualangan": "🌍",
+    "Misteri": "🕵️",
+    "Romansa": "💖",
+    "Sejarah": "🏺",
+    "Biografi": "👤",
+    "Self-Help": "🌱",
+    "Teknologi": "💻",
+    "Filsafat": "🧠",
+}
+
+# Label aktivitas per tipe user_interactions
+INTERACTION_LABELS = {
+    "bookmark": "🔖 Bookmark",
+    "read": "📖 Membaca",
+    "review": "⭐ Review",
+    "rating": "⭐ Rating",
+    "like": "❤️ Suka",
+    "share": "📤 Bagikan",
+    "read_later": "⏳ Read Later"  # Tambahan
+}
+
 class BookAIService:
     """Service class untuk menangani interaksi AI dengan buku"""
     
-    def __init__(self):
+    def __init__(self, recommendation_service: Optional[RecommendationService] = None,
+                 user_preference_service: Optional[UserPreferenceService] = None,
+                 llm_provider: Optional[LLMProvider] = None):
         """Inisialisasi BookAI Service"""
-        self._setup_openai()
         self._setup_database()
-        self._setup_services()
-        self._conversation_histories = {}  # Dictionary untuk menyimpan riwayat per user (deque)
+        self._setup_services(recommendation_service, user_preference_service)
+        self._setup_llm(llm_provider)
+        # Riwayat per user dengan eviction LRU/TTL dan batas memori (atau SQLite bersama antar worker)
+        self.conversation_store = build_conversation_store()
+        # Query sumber histori pembacaan dijalankan paralel
+        self._history_executor = ThreadPoolExecutor(max_workers=6, thread_name_prefix='reading-history')
+        # Rekomendasi chat streaming dihitung paralel dengan generasi token
+        self._recommendation_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='chat-recommendations')
+        # Konteks user yang sudah dirender, per user; dibuang saat aktivitas user berubah
+        self.context_cache = ResultCache(
+            'chat_context', max_entries=Config.CHAT_CONTEXT_CACHE_SIZE, ttl=Config.CHAT_CONTEXT_TTL,
+            enabled=Config.CHAT_CONTEXT_CACHE_ENABLED
+        )
+        # Nomor urut invalidasi terakhir per user (LRU, sebanyak kapasitas cache konteks); nomor user
+        # yang dibuang naik ke floor sehingga penyusunan konteks yang sedang berjalan tetap mendeteksinya
+        self._context_lock = threading.Lock()
+        self._context_sequence = 0
+        self._context_invalidations: OrderedDict = OrderedDict()
+        self._context_invalidation_floor = 0
+        self.recommendation_service.catalog_store.rating_overlay.add_listener(self.invalidate_user_context)
     
-    def _setup_openai(self):
-        """Setup konfigurasi OpenAI"""
-        openai.api_key = os.getenv('OPENAI_API_KEY')
-        if not openai.api_key:
-            raise ValueError("OPENAI_API_KEY tidak ditemukan di environment variables")
+    def _setup_llm(self, llm_provider: Optional[LLMProvider] = None):
+        """Setup provider LLM; default memakai provider RecommendationService (pool dan breaker yang sama)"""
+        self.llm = llm_provider or self.recommendation_service.llm
+        if not self.llm.available():
+            raise ValueError(f"LLM provider '{self.llm.name}' tidak tersedia, periksa konfigurasinya (mis. OPENAI_API_KEY)")
     
     def _setup_database(self):
         """Setup koneksi database"""
-        mongodb_uri = os.getenv('MONGODB_URI')
-        if not mongodb_uri:
-            raise ValueError("MONGODB_URI tidak ditemukan di environment variables")
+        from utils.database import get_database
         
-        self.client = MongoClient(mongodb_uri)
-        self.db = self.client['smartlibrary']
+        self.db = get_database()
         self.books_collection = self.db['books']
     
-    def _setup_services(self):
+    def _setup_services(self, recommendation_service: Optional[RecommendationService] = None,
+                        user_preference_service: Optional[UserPreferenceService] = None):
         """Setup service dependencies"""
-        # Pastikan dependency sudah sesuai hasil refactor
-        self.recommendation_service = RecommendationService()
-        self.user_preference_service = UserPreferenceService()
+        # Gunakan service yang sudah ada agar snapshot katalog tidak dimuat ulang
+        self.recommendation_service = recommendation_service or RecommendationService()
+        self.user_preference_service = user_preference_service or UserPreferenceService()
     
     def _get_book_context(self, book_id: str) -> str:
         """Mendapatkan konteks buku dari database"""
         if not book_id:
             return ""
         try:
-            book = self.books_collection.find_one({'_id': book_id})
+            # Lookup O(1) di snapshot bersama; fallback ke database untuk buku yang belum tersinkron
+            snapshot = self.recommendation_service.snapshot
+            book_idx = snapshot.book_index.get(book_id)
+            if book_idx is not None:
+                book = snapshot.books_df.iloc[book_idx].to_dict()
+            else:
+                book = self.books_collection.find_one({'_id': book_id})
             if book:
                 return f"""
                 Judul: {book.get('title', 'N/A')}
@@ -66,9 +136,24 @@ class BookAIService:
     
     def _get_user_context(self, user_id: str) -> str:
         """Mendapatkan konteks preferensi pengguna dan histori pembacaan"""
+        return self._get_user_context_entry(user_id)['context']
+    
+    def _get_user_context_entry(self, user_id: str) -> Dict[str, Any]:
+        """Konteks user yang dirender beserta preferensinya, dari cache jika masih berlaku
+        
+        Entri diinvalidasi lewat invalidate_user_context saat borrowings, interaksi atau rating
+        user berubah; percakapan multi-turn hanya menyusun konteks sekali.
+        """
         if not user_id:
-            return ""
+            return {'context': "", 'preferences': {}}
         
+        cache_key = ('user_context', str(user_id))
+        entry = self.context_cache.get(cache_key)
+        if entry is not None:
+            return entry
+        
+        # Generasi dicatat sebelum menyusun konteks; jika user berubah selama penyusunan, hasil tidak di-cache
+        generation = self._context_generation(str(user_id))
         try:
             # Dapatkan preferensi user
             preferences = self.user_preference_service.analyze_user_preferences(user_id)
@@ -85,14 +170,39 @@ class BookAIService:
             if reading_history:
                 context += f"\nHistori Pembacaan Terbaru:\n{reading_history}"
             
-            return context
+            entry = {'context': context, 'preferences': preferences}
+            if reading_history and generation == self._context_generation(str(user_id)):
+                self.context_cache.put(cache_key, entry, user_id=user_id)
+            return entry
         except Exception as e:
             print(f"Error mendapatkan konteks user: {str(e)}")
         
-        return ""
+        return {'context': "", 'preferences': {}}
+    
+    def _context_generation(self, user_key: str) -> int:
+        """Nomor urut invalidasi terakhir user (floor jika user sudah dibuang dari LRU)"""
+        with self._context_lock:
+            return self._context_invalidations.get(user_key, self._context_invalidation_floor)
+    
+    def invalidate_user_context(self, user_id: Any):
+        """Buang konteks chat user (dipanggil saat borrowings, interaksi atau rating user berubah)"""
+        user_key = str(user_id)
+        with self._context_lock:
+            self._context_sequence += 1
+            self._context_invalidations[user_key] = self._context_sequence
+            self._context_invalidations.move_to_end(user_key)
+            while len(self._context_invalidations) > self.context_cache.max_entries:
+                _, sequence = self._context_invalidations.popitem(last=False)
+                self._context_invalidation_floor = max(self._context_invalidation_floor, sequence)
+        self.context_cache.invalidate_user(user_key)
     
     def _get_user_reading_history(self, user_id: str) -> str:
-        """Mendapatkan histori pembacaan user terbaru"""
+        """Mendapatkan histori pembacaan user terbaru
+        
+        Tiga query sumber (borrowings, user_interactions, ratings) dijalankan paralel, lalu detail
+        semua buku diambil sekaligus: dari snapshot katalog, sisanya dengan satu query $in.
+        Waktu setiap tahap dicatat agar penyusunan konteks chat bisa diukur.
+        """
         if not user_id or user_id == "anonymous":
             return "Belum ada aktivitas membaca yang tercatat."
         try:
@@ -100,52 +210,54 @@ class BookAIService:
             
             # Ambil data dari collection borrowings dan user_interactions
             db = self.db
+            start_time = time.time()
+            user_filter = self._user_id_filter(user_id)
             
             # Ambil buku yang dipinjam dalam 90 hari terakhir (bukan 30)
             ninety_days_ago = datetime.now() - timedelta(days=90)
-            recent_borrowings = list(db.borrowings.find({
-                "$or": [
-                    {"user_id": user_id},
-                    {"user_id": ObjectId(user_id)}
-                ],
-                "borrow_date": {"$gte": ninety_days_ago}
-            }).sort("borrow_date", -1).limit(20))
-            from utils.logger import ai_logger
-            ai_logger.logger.info(f"DEBUG: Borrowings: {recent_borrowings}")
+            borrowings_future = self._history_executor.submit(
+                lambda: list(db.borrowings.find({**user_filter, "borrow_date": {"$gte": ninety_days_ago}})
+                             .sort("borrow_date", -1).limit(HISTORY_LIMIT))
+            )
             # Ambil interaksi user terbaru (bookmark, read, review, rating)
-            recent_interactions = list(db.user_interactions.find({
-                "$or": [
-                    {"user_id": user_id},
-                    {"user_id": ObjectId(user_id)}
-                ]
-            }).sort("timestamp", -1).limit(20))
-            ai_logger.logger.info(f"DEBUG: Interactions: {recent_interactions}")
+            interactions_future = self._history_executor.submit(
+                lambda: list(db.user_interactions.find(user_filter).sort("timestamp", -1).limit(HISTORY_LIMIT))
+            )
             # Ambil rating user
-            recent_ratings = list(db.ratings.find({
-                "$or": [
-                    {"user_id": user_id},
-                    {"user_id": ObjectId(user_id)}
-                ]
-            }).sort("timestamp", -1).limit(20))
-            ai_logger.logger.info(f"DEBUG: Ratings: {recent_ratings}")
+            ratings_future = self._history_executor.submit(
+                lambda: list(db.ratings.find(user_filter).sort("timestamp", -1).limit(HISTORY_LIMIT))
+            )
+            recent_borrowings = borrowings_future.result()
+            recent_interactions = interactions_future.result()
+            recent_ratings = ratings_future.result()
+            sources_time = time.time() - start_time
+            
+            # Detail buku untuk semua sumber sekaligus
+            books_start = time.time()
+            book_ids = (
+                [borrowing.get("books_id") or borrowing.get("book_id") for borrowing in recent_borrowings] +
+                [interaction.get("book_id") for interaction in recent_interactions] +
+                [rating.get("book_id") or rating.get("books_id") for rating in recent_ratings]
+            )
+            books = self._get_history_books(book_ids)
+            books_time = time.time() - books_start
             
+            format_start = time.time()
             history_text = ""
             
             if recent_borrowings:
                 history_text += "📚 Buku yang dipinjam akhir-akhir ini:\n"
                 for borrowing in recent_borrowings:
                     book_id = borrowing.get("books_id") or borrowing.get("book_id")
-                    if book_id:
-                        book = db.books.find_one({"_id": book_id})
-                        if book:
-                            title = book.get("title", "N/A")
-                            author = book.get("author", "N/A")
-                            genre = book.get("genre", "N/A")
-                            borrow_date = borrowing.get("borrow_date", "")
-                            return_date = borrowing.get("return_date")
-                            
-                            status = "📖 Sedang dibaca" if not return_date else "✅ Selesai dibaca"
-                            history_text += f"- {title} oleh {author} ({genre}) {status}\n"
+                    book = books.get(str(book_id)) if book_id else None
+                    if book:
+                        title = book.get("title", "N/A")
+                        author = book.get("author", "N/A")
+                        genre = book.get("genre", "N/A")
+                        return_date = borrowing.get("return_date")
+                        
+                        status = "📖 Sedang dibaca" if not return_date else "✅ Selesai dibaca"
+                        history_text += f"- {title} oleh {author} ({genre}) {status}\n"
                 
                 ai_logger.logger.info(f"Found {len(recent_borrowings)} recent borrowings for user {user_id}")
             
@@ -154,25 +266,14 @@ class BookAIService:
                 for interaction in recent_interactions:
                     interaction_type = interaction.get("type", "")
                     book_id = interaction.get("book_id")
-                    if book_id:
-                        book = db.books.find_one({"_id": book_id})
-                        if book:
-                            title = book.get("title", "N/A")
-                            progress = interaction.get("progress", 0)
-                            # Map interaction type ke emoji dan deskripsi
-                            type_mapping = {
-                                "bookmark": "🔖 Bookmark",
-                                "read": "📖 Membaca",
-                                "review": "⭐ Review",
-                                "rating": "⭐ Rating",
-                                "like": "❤️ Suka",
-                                "share": "📤 Bagikan",
-                                "read_later": "⏳ Read Later"  # Tambahan
-                            }
-                            activity_desc = type_mapping.get(interaction_type, interaction_type)
-                            if progress > 0:
-                                activity_desc += f" ({progress}%)"
-                            history_text += f"- {activity_desc}: {title}\n"
+                    book = books.get(str(book_id)) if book_id else None
+                    if book:
+                        title = book.get("title", "N/A")
+                        progress = interaction.get("progress", 0)
+                        activity_desc = INTERACTION_LABELS.get(interaction_type, interaction_type)
+                        if progress > 0:
+                            activity_desc += f" ({progress}%)"
+                        history_text += f"- {activity_desc}: {title}\n"
                 
                 ai_logger.logger.info(f"Found {len(recent_interactions)} recent interactions for user {user_id}")
             
@@ -181,12 +282,11 @@ class BookAIService:
                 for rating in recent_ratings:
                     book_id = rating.get("book_id") or rating.get("books_id")
                     rating_value = rating.get("rating_value", 0)
-                    if book_id:
-                        book = db.books.find_one({"_id": book_id})
-                        if book:
-                            title = book.get("title", "N/A")
-                            stars = "⭐" * int(rating_value)
-                            history_text += f"- {title}: {stars} ({rating_value}/5)\n"
+                    book = books.get(str(book_id)) if book_id else None
+                    if book:
+                        title = book.get("title", "N/A")
+                        stars = "⭐" * int(rating_value)
+                        history_text += f"- {title}: {stars} ({rating_value}/5)\n"
                 
                 ai_logger.logger.info(f"Found {len(recent_ratings)} recent ratings for user {user_id}")
             
@@ -194,6 +294,12 @@ class BookAIService:
                 history_text = "Belum ada aktivitas membaca yang tercatat."
                 ai_logger.logger.info(f"No reading history found for user {user_id}")
             
+            ai_logger.log_performance(
+                "ReadingHistory",
+                f"user {user_id}: sources {sources_time:.3f}s, books {books_time:.3f}s ({len(books)} books), "
+                f"format {time.time() - format_start:.3f}s",
+                time.time() - start_time
+            )
             return history_text
             
         except Exception as e:
@@ -201,22 +307,40 @@ class BookAIService:
             ai_logger.logger.error(f"Error getting reading history for user {user_id}: {str(e)}")
             return ""
     
+    def _user_id_filter(self, user_id: str) -> Dict[str, Any]:
+        """Filter user_id yang cocok untuk id string maupun ObjectId"""
+        if ObjectId.is_valid(user_id):
+            return {"$or": [{"user_id": user_id}, {"user_id": ObjectId(user_id)}]}
+        return {"user_id": user_id}
+    
+    def _get_history_books(self, book_ids: List[Any]) -> Dict[str, Dict[str, Any]]:
+        """Detail buku histori per str(book_id): snapshot katalog dulu, sisanya satu query $in"""
+        snapshot = self.recommendation_service.snapshot
+        books: Dict[str, Dict[str, Any]] = {}
+        missing = []
+        for book_id in book_ids:
+            if not book_id or str(book_id) in books:
+                continue
+            book_idx = snapshot.book_index.get(book_id)
+            if book_idx is not None:
+                books[str(book_id)] = snapshot.books_df.iloc[book_idx].to_dict()
+            else:
+                missing.append(book_id)
+        
+        # Buku yang belum tersinkron ke snapshot: satu round trip, tanpa field besar (coverImage)
+        if missing:
+            projection = {field: 1 for field in HISTORY_BOOK_FIELDS}
+            for book in self.books_collection.find({"_id": {"$in": list(dict.fromkeys(missing))}}, projection):
+                books[str(book["_id"])] = book
+        return books
+    
     def _get_conversation_history(self, user_id: str) -> List[Dict[str, str]]:
         """Mendapatkan riwayat percakapan untuk user tertentu"""
-        return list(self._conversation_histories.get(user_id, deque()))
+        return self.conversation_store.get(user_id)
     
     def _add_to_conversation_history(self, user_id: str, role: str, content: str):
-        """Menambahkan pesan ke riwayat percakapan (max 10 pesan)"""
-        if user_id not in self._conversation_histories:
-            self._conversation_histories[user_id] = deque(maxlen=10)
-        self._conversation_histories[user_id].append({
-            "role": role,
-            "content": content
-        })
-        
-        # Batasi riwayat percakapan (maksimal 10 pesan)
-        # if len(self._conversation_histories[user_id]) > 10:
-        #     self._conversation_histories[user_id] = self._conversation_histories[user_id][-10:]
+        """Menambahkan pesan ke riwayat percakapan (max CONVERSATION_MAX_MESSAGES pesan)"""
+        self.conversation_store.append(user_id, role, content)
     
     def _create_system_prompt(self, book_context: str, user_context: str) -> str:
         """Membuat sistem prompt untuk OpenAI"""
@@ -287,11 +411,10 @@ Saya melihat Anda sangat menyukai fiksi ilmiah dengan rating tinggi untuk buku t
 - Jangan mengabaikan data rating dan aktivitas user
 """
     
-    def _get_ai_response(self, messages: List[Dict[str, str]]) -> str:
-        """Mendapatkan respons dari OpenAI"""
-        try:
-            # Tambahkan negative prompt untuk mencegah respons yang tidak diinginkan
-            negative_prompt = """JANGAN:
+    def _completion_request(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Parameter completion provider LLM (termasuk negative prompt) untuk jalur biasa maupun streaming"""
+        # Tambahkan negative prompt untuk mencegah respons yang tidak diinginkan
+        negative_prompt = """JANGAN:
 - Berikan spoiler untuk buku yang belum dibaca
 - Gunakan bahasa yang terlalu formal atau kaku
 - Berikan rekomendasi yang tidak sesuai dengan preferensi pengguna
@@ -302,22 +425,24 @@ Saya melihat Anda sangat menyukai fiksi ilmiah dengan rating tinggi untuk buku t
 - Berikan rekomendasi yang terlalu generik tanpa penjelasan
 - Gunakan emoji yang tidak relevan atau berlebihan
 - Berikan respons yang tidak dalam bahasa Indonesia"""
-            
-            # Tambahkan negative prompt ke messages
-            messages_with_negative = messages + [
-                {"role": "system", "content": negative_prompt}
-            ]
-            
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=messages_with_negative,
-                temperature=0.7,
-                max_tokens=800,
-                presence_penalty=0.1,  # Mendorong variasi dalam respons
-                frequency_penalty=0.1   # Mengurangi repetisi
-            )
-            
-            ai_response = response.choices[0].message.content
+        
+        # Tambahkan negative prompt ke messages
+        messages_with_negative = messages + [
+            {"role": "system", "content": negative_prompt}
+        ]
+        
+        return {
+            'messages': messages_with_negative,
+            'temperature': 0.7,
+            'max_tokens': 800,
+            'presence_penalty': 0.1,  # Mendorong variasi dalam respons
+            'frequency_penalty': 0.1   # Mengurangi repetisi
+        }
+    
+    def _get_ai_response(self, messages: List[Dict[str, str]]) -> str:
+        """Mendapatkan respons dari provider LLM"""
+        try:
+            ai_response = self.llm.complete(**self._completion_request(messages))
             
             # Post-processing untuk memastikan respons sesuai standar
             ai_response = self._post_process_response(ai_response)
@@ -426,139 +551,25 @@ Saya melihat Anda sangat menyukai fiksi ilmiah dengan rating tinggi untuk buku t
     def chat(self, message: str, user_id: Optional[str] = None, book_id: Optional[str] = None) -> str:
         """Berinteraksi dengan AI untuk rekomendasi buku"""
         try:
-            from utils.logger import ai_logger
-            ai_logger.logger.info(f"DEBUG: user_id diterima di chat: {user_id}")
-            # Validasi input
-            if not message or not message.strip():
-                return "Pesan tidak boleh kosong"
-            if not user_id or user_id == "anonymous":
-                return "Anda harus login untuk mendapatkan rekomendasi yang personal."
-            
-            # Sanitasi input
-            message = self._sanitize_input(message)
-            user_id = self._sanitize_id(user_id)
-            book_id = self._sanitize_id(book_id)
-            
-            # Tambahkan pesan user ke riwayat
-            self._add_to_conversation_history(user_id or "anonymous", "user", message)
-            
-            # Siapkan konteks
-            book_context = self._get_book_context(book_id)
-            user_context = self._get_user_context(user_id)
-            
-            # Deteksi jika buku tidak ditemukan
-            book_not_found = False
-            if book_id and (not book_context or "belum ada di koleksi kami" in book_context):
-                book_not_found = True
-            
-            # Buat sistem prompt
-            system_prompt = self._create_system_prompt(book_context, user_context)
-            
-            # Siapkan pesan untuk OpenAI
-            conversation_history = self._get_conversation_history(user_id or "anonymous")
-            messages = [
-                {"role": "system", "content": system_prompt},
-                *conversation_history
-            ]
+            prepared = self._prepare_chat(message, user_id, book_id)
+            if isinstance(prepared, str):
+                return prepared
+            message, user_id, book_id = prepared['message'], prepared['user_id'], prepared['book_id']
             
             # Dapatkan respons dari AI
-            ai_response = self._get_ai_response(messages)
+            ai_response = self._get_ai_response(prepared['messages'])
             
             # Tambahkan respons ke riwayat
             self._add_to_conversation_history(user_id or "anonymous", "assistant", ai_response)
             
             # Jika buku tidak ditemukan, tambahkan penjelasan di awal respons
             final_response = ai_response
-            if book_not_found:
-                final_response = (
-                    "Maaf, buku yang Anda sebutkan belum ada di koleksi kami. Namun, berikut beberapa rekomendasi yang mungkin sesuai dengan preferensi Anda.\n\n"
-                    + ai_response
-                )
-            
-            # Deteksi apakah user meminta rekomendasi secara eksplisit
-            recommendation_keywords = [
-                'berikan saya rekomendasi', 'rekomendasi', 'sarankan', 'saran', 
-                'rekomendasikan', 'bagaimana dengan', 'apa yang bagus', 'buku apa yang bagus',
-                'tolong berikan', 'bisa berikan', 'mohon rekomendasi'
-            ]
-            
-            user_wants_recommendations = any(
-                keyword in message.lower() for keyword in recommendation_keywords
-            )
+            if prepared['book_not_found']:
+                final_response = BOOK_NOT_FOUND_PREFIX + ai_response
             
             # Hanya tambahkan rekomendasi jika user meminta secara eksplisit
-            if user_wants_recommendations:
-                # Coba content-based terlebih dahulu jika ada book_id
-                recs = []
-                if book_id and not book_not_found:
-                    try:
-                        recs = self.recommendation_service.get_content_based_recommendations(book_id, 3)
-                        if recs:
-                            from utils.logger import ai_logger
-                            ai_logger.logger.info(f"Content-based recommendations generated: {len(recs)}")
-                    except Exception as e:
-                        from utils.logger import ai_logger
-                        ai_logger.logger.warning(f"Content-based failed: {str(e)}")
-                if not recs and user_id:
-                    try:
-                        recs = self.recommendation_service.get_collaborative_recommendations(user_id, 3)
-                        if recs:
-                            from utils.logger import ai_logger
-                            ai_logger.logger.info(f"Collaborative recommendations generated: {len(recs)}")
-                    except Exception as e:
-                        from utils.logger import ai_logger
-                        ai_logger.logger.warning(f"Collaborative failed: {str(e)}")
-                if not recs:
-                    try:
-                        recs = self.recommendation_service.get_ai_enhanced_recommendations(message, 3)
-                        if recs:
-                            from utils.logger import ai_logger
-                            ai_logger.logger.info(f"AI-enhanced recommendations generated: {len(recs)}")
-                    except Exception as e:
-                        from utils.logger import ai_logger
-                        ai_logger.logger.warning(f"AI-enhanced failed: {str(e)}")
-                # Hilangkan duplikasi buku berdasarkan book_id
-                seen_ids = set()
-                unique_recs = []
-                for rec in recs:
-                    rec_id = rec.get('book_id') or rec.get('_id')
-                    if rec_id and rec_id not in seen_ids:
-                        unique_recs.append(rec)
-                        seen_ids.add(rec_id)
-                # Format rekomendasi profesional & hemat token
-                if unique_recs:
-                    # Ambil maksimal 3 buku
-                    unique_recs = unique_recs[:3]
-                    genre_user = None
-                    try:
-                        preferences = self.user_preference_service.analyze_user_preferences(user_id) if user_id else {}
-                        genre_user = preferences.get('preferred_genres', [None])[0]
-                    except:
-                        genre_user = None
-                    genre_text = f" pada genre {genre_user}" if genre_user else ""
-                    final_response += f"\n\nBerikut rekomendasi buku terbaik{genre_text} untuk Anda:\n"
-                    emoji_map = {
-                        "Fantasi": "🧙‍♂️",
-                        "Fiksi Ilmiah": "🚀",
-                        "Petualangan": "🌍",
-                        "Misteri": "🕵️",
-                        "Romansa": "💖",
-                        "Sejarah": "🏺",
-                        "Biografi": "👤",
-                        "Self-Help": "🌱",
-                        "Teknologi": "💻",
-                        "Filsafat": "🧠",
-                    }
-                    for i, rec in enumerate(unique_recs, 1):
-                        title = rec.get('title', 'N/A')
-                        author = rec.get('author', 'N/A')
-                        genre = rec.get('genre', 'N/A')
-                        emoji = emoji_map.get(genre, "📚")
-                        highlight = self._get_genre_description(genre)
-                        final_response += f"{i}. {emoji} {title} — {author} [{genre}]\n   {highlight}\n"
-                    final_response += "\nIngin info detail atau genre lain? Tanyakan saja."
-                else:
-                    final_response += "\n\nMaaf, belum ada data bacaan yang cukup untuk memberikan rekomendasi yang personal. Silakan baca dan beri rating beberapa buku terlebih dahulu."
+            if prepared['wants_recommendations']:
+                final_response += self._get_recommendation_text(prepared)
             
             # Log interaksi untuk monitoring
             self._log_chat_interaction(user_id, message, final_response)
@@ -570,6 +581,183 @@ Saya melihat Anda sangat menyukai fiksi ilmiah dengan rating tinggi untuk buku t
             self._log_chat_interaction(user_id, message, error_msg, is_error=True)
             return error_msg
     
+    def chat_stream(self, message: str, user_id: Optional[str] = None,
+                    book_id: Optional[str] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Versi streaming chat: yield (event, data) segera setelah token dari provider LLM tiba
+        
+        Event: 'token' (potongan teks), 'recommendations' (blok rekomendasi, dihitung paralel
+        dengan generasi), 'done' (respons final setelah post-processing) atau 'error'.
+        Post-processing tidak bisa menarik token yang sudah terkirim, jadi teks final dikirim
+        ulang di event 'done' dan disimpan ke riwayat.
+        """
+        from utils.logger import ai_logger
+        
+        start_time = time.time()
+        try:
+            prepared = self._prepare_chat(message, user_id, book_id)
+            if isinstance(prepared, str):
+                yield 'done', {'response': prepared}
+                return
+            message, user_id = prepared['message'], prepared['user_id']
+            
+            # Rekomendasi berjalan paralel dengan generasi dan dikirim sebagai event terakhir
+            recommendations_future = None
+            if prepared['wants_recommendations']:
+                recommendations_future = self._recommendation_executor.submit(self._get_recommendation_text, prepared)
+            
+            prefix = BOOK_NOT_FOUND_PREFIX if prepared['book_not_found'] else ""
+            if prefix:
+                yield 'token', {'text': prefix}
+            
+            chunks = []
+            first_token_time = None
+            try:
+                for text in self.llm.stream(**self._completion_request(prepared['messages'])):
+                    if first_token_time is None:
+                        first_token_time = time.time() - start_time
+                    chunks.append(text)
+                    yield 'token', {'text': text}
+                ai_response = self._post_process_response(''.join(chunks))
+            except Exception as e:
+                ai_response = f"Maaf, terjadi kesalahan dalam memproses permintaan: {str(e)}"
+            
+            # Sisa teks tambahan post-processing (mis. ajakan bertanya) dikirim sebagai token terakhir
+            streamed = ''.join(chunks)
+            if ai_response.startswith(streamed) and len(ai_response) > len(streamed):
+                yield 'token', {'text': ai_response[len(streamed):]}
+            self._add_to_conversation_history(user_id or "anonymous", "assistant", ai_response)
+            
+            final_response = prefix + ai_response
+            if recommendations_future is not None:
+                recommendation_text = recommendations_future.result()
+                final_response += recommendation_text
+                yield 'recommendations', {'text': recommendation_text}
+            
+            self._log_chat_interaction(user_id, message, final_response)
+            ai_logger.logger.info(
+                f"Chat stream - first token {first_token_time if first_token_time is not None else 0:.3f}s, "
+                f"total {time.time() - start_time:.3f}s"
+            )
+            yield 'done', {'response': final_response}
+            
+        except Exception as e:
+            error_msg = f"Maaf, terjadi kesalahan: {str(e)}"
+            self._log_chat_interaction(user_id, message, error_msg, is_error=True)
+            yield 'error', {'error': error_msg}
+    
+    def _prepare_chat(self, message: str, user_id: Optional[str], book_id: Optional[str]):
+        """Validasi, sanitasi dan penyusunan prompt; string berarti respons langsung tanpa AI"""
+        from utils.logger import ai_logger
+        ai_logger.logger.info(f"DEBUG: user_id diterima di chat: {user_id}")
+        # Validasi input
+        if not message or not message.strip():
+            return "Pesan tidak boleh kosong"
+        if not user_id or user_id == "anonymous":
+            return "Anda harus login untuk mendapatkan rekomendasi yang personal."
+        
+        # Sanitasi input
+        message = self._sanitize_input(message)
+        user_id = self._sanitize_id(user_id)
+        book_id = self._sanitize_id(book_id)
+        
+        # Tambahkan pesan user ke riwayat
+        self._add_to_conversation_history(user_id or "anonymous", "user", message)
+        
+        # Siapkan konteks
+        # Konteks user (preferensi + histori) dimemo sekali per request dan di-cache lintas request
+        book_context = self._get_book_context(book_id)
+        user_context_entry = self._get_user_context_entry(user_id)
+        user_context = user_context_entry['context']
+        
+        # Deteksi jika buku tidak ditemukan
+        book_not_found = False
+        if book_id and (not book_context or "belum ada di koleksi kami" in book_context):
+            book_not_found = True
+        
+        # Buat sistem prompt
+        system_prompt = self._create_system_prompt(book_context, user_context)
+        
+        # Siapkan pesan untuk LLM
+        conversation_history = self._get_conversation_history(user_id or "anonymous")
+        messages = [
+            {"role": "system", "content": system_prompt},
+            *conversation_history
+        ]
+        
+        # Deteksi apakah user meminta rekomendasi secara eksplisit
+        user_wants_recommendations = any(
+            keyword in message.lower() for keyword in RECOMMENDATION_KEYWORDS
+        )
+        
+        return {
+            'message': message,
+            'user_id': user_id,
+            'book_id': book_id,
+            'messages': messages,
+            'book_not_found': book_not_found,
+            'preferences': user_context_entry['preferences'],
+            'wants_recommendations': user_wants_recommendations
+        }
+    
+    def _get_recommendation_text(self, prepared: Dict[str, Any]) -> str:
+        """Blok teks rekomendasi yang ditambahkan ke respons chat"""
+        from utils.logger import ai_logger
+        
+        message, user_id, book_id = prepared['message'], prepared['user_id'], prepared['book_id']
+        # Coba content-based terlebih dahulu jika ada book_id
+        recs = []
+        if book_id and not prepared['book_not_found']:
+            try:
+                recs = self.recommendation_service.get_content_based_recommendations(book_id, 3)
+                if recs:
+                    ai_logger.logger.info(f"Content-based recommendations generated: {len(recs)}")
+            except Exception as e:
+                ai_logger.logger.warning(f"Content-based failed: {str(e)}")
+        if not recs and user_id:
+            try:
+                recs = self.recommendation_service.get_collaborative_recommendations(user_id, 3)
+                if recs:
+                    ai_logger.logger.info(f"Collaborative recommendations generated: {len(recs)}")
+            except Exception as e:
+                ai_logger.logger.warning(f"Collaborative failed: {str(e)}")
+        if not recs:
+            try:
+                recs = self.recommendation_service.get_ai_enhanced_recommendations(message, 3)
+                if recs:
+                    ai_logger.logger.info(f"AI-enhanced recommendations generated: {len(recs)}")
+            except Exception as e:
+                ai_logger.logger.warning(f"AI-enhanced failed: {str(e)}")
+        # Hilangkan duplikasi buku berdasarkan book_id
+        seen_ids = set()
+        unique_recs = []
+        for rec in recs:
+            rec_id = rec.get('book_id') or rec.get('_id')
+            if rec_id and rec_id not in seen_ids:
+                unique_recs.append(rec)
+                seen_ids.add(rec_id)
+        # Format rekomendasi profesional & hemat token
+        if not unique_recs:
+            return "\n\nMaaf, belum ada data bacaan yang cukup untuk memberikan rekomendasi yang personal. Silakan baca dan beri rating beberapa buku terlebih dahulu."
+        
+        # Ambil maksimal 3 buku
+        unique_recs = unique_recs[:3]
+        genre_user = None
+        try:
+            genre_user = prepared['preferences'].get('preferred_genres', [None])[0]
+        except:
+            genre_user = None
+        genre_text = f" pada genre {genre_user}" if genre_user else ""
+        text = f"\n\nBerikut rekomendasi buku terbaik{genre_text} untuk Anda:\n"
+        for i, rec in enumerate(unique_recs, 1):
+            title = rec.get('title', 'N/A')
+            author = rec.get('author', 'N/A')
+            genre = rec.get('genre', 'N/A')
+            emoji = GENRE_EMOJI.get(genre, "📚")
+            highlight = self._get_genre_description(genre)
+            text += f"{i}. {emoji} {title} — {author} [{genre}]\n   {highlight}\n"
+        text += "\nIngin info detail atau genre lain? Tanyakan saja."
+        return text
+    
     def _log_chat_interaction(self, user_id: Optional[str], message: str, response: str, is_error: bool = False):
         """Log interaksi chat untuk monitoring"""
         try:
@@ -589,8 +777,7 @@ Saya melihat Anda sangat menyukai fiksi ilmiah dengan rating tinggi untuk buku t
     
     def clear_conversation_history(self, user_id: str):
         """Membersihkan riwayat percakapan untuk user tertentu"""
-        if user_id in self._conversation_histories:
-            del self._conversation_histories[user_id]
+        self.conversation_store.clear(user_id)
     
     def get_conversation_history(self, user_id: str) -> List[Dict[str, str]]:
         """Mendapatkan riwayat percakapan untuk user tertentu"""
@@ -629,8 +816,3 @@ Saya melihat Anda sangat menyukai fiksi ilmiah dengan rating tinggi untuk buku t
     def _sanitize_book_id(self, book_id: Optional[str]) -> Optional[str]:
         """Sanitasi book ID (deprecated, gunakan _sanitize_id)"""
         return self._sanitize_id(book_id)
-    
-    def __del__(self):
-        """Cleanup saat object dihapus"""
-        if hasattr(self, 'client'):
-            self.client.close() 
\ No newline at end of file
@@ -0,0 +1,61 @@
+import re
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Iterable, Optional
+
+_OBJECT_ID_PATTERN = re.compile(r'^[0-9a-fA-F]{24}$')
+
+def normalize_book_id(book_id: Any) -> Optional[str]:
+    """Normalisasi id buku menjadi string kunci index
+
+    Menerima ObjectId, string hex ObjectId (huruf besar/kecil) dan id bebas
+    seperti `book-1`; id dari CatalogLoader selalu berupa string.
+    """
+    if book_id is None:
+        return None
+    key = str(book_id).strip()
+    if not key:
+        return None
+    if _OBJECT_ID_PATTERN.match(key):
+        return key.lower()
+    return key
+
+class BookIndex:
+    """Index id buku -> posisi baris books_df (dan baris TF-IDF), dibangun sekali per snapshot"""
+
+    def __init__(self, book_ids: Iterable[Any]):
+        """Inisialisasi BookIndex dari kolom _id sesuai urutan baris"""
+        self.ids = np.asarray([normalize_book_id(book_id) for book_id in book_ids], dtype=object)
+        self._positions: Dict[str, int] = {}
+        for position, key in enumerate(self.ids):
+            # Id duplikat: pertahankan baris pertama seperti pencarian lama
+            if key is not None and key not in self._positions:
+                self._positions[key] = position
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, book_id: Any) -> bool:
+        return self.get(book_id) is not None
+
+    def get(self, book_id: Any) -> Optional[int]:
+        """Posisi baris untuk satu id buku, atau None jika tidak ada"""
+        key = normalize_book_id(book_id)
+        if key is None:
+            return None
+        return self._positions.get(key)
+
+    def positions(self, book_ids: Iterable[Any]) -> np.ndarray:
+        """Posisi baris untuk banyak id sekaligus; -1 untuk id yang tidak ada"""
+        lookup = self._positions.get
+        return np.fromiter(
+            (lookup(normalize_book_id(book_id), -1) for book_id in book_ids),
+            dtype=np.int64
+        )
+
+    @classmethod
+    def from_books(cls, books_df: pd.DataFrame) -> 'BookIndex':
+        """Bangun index dari books_df; kosong jika tidak ada kolom _id"""
+        if books_df.empty or '_id' not in books_df.columns:
+            return cls([])
+        return cls(books_df['_id'].tolist())
@@ -0,0 +1,180 @@
+import time
+import pandas as pd
+from bson import encode as bson_encode
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from config.settings import Config
+
+# Field yang dibutuhkan setiap konsumen per koleksi beserta tipe kolomnya.
+# coverImage sengaja tidak pernah diproyeksikan: isinya base64 berukuran kilobyte.
+CONSUMER_PROJECTIONS: Dict[str, Dict[str, Dict[str, str]]] = {
+    'recommendation': {
+        'books': {
+            '_id': 'id',
+            'title': 'str',
+            'author': 'str',
+            'genre': 'str',
+            'description': 'str',
+            'createdAt': 'datetime',
+            'updatedAt': 'datetime'
+        },
+        'ratings': {
+            '_id': 'id',
+            'user_id': 'id',
+            'book_id': 'id',
+            'rating_value': 'float',
+            'rating_date': 'datetime'
+        }
+    },
+    'user_preference': {
+        'books': {
+            '_id': 'id',
+            'title': 'str',
+            'author': 'str',
+            'genre': 'str',
+            'description': 'str'
+        },
+        'ratings': {
+            '_id': 'id',
+            'user_id': 'id',
+            'book_id': 'id',
+            'rating_value': 'float',
+            'rating': 'float',
+            'rating_date': 'datetime',
+            'timestamp': 'datetime'
+        },
+        'reading_history': {
+            '_id': 'id',
+            'user_id': 'id',
+            'book_id': 'id',
+            'reading_start': 'datetime',
+            'reading_end': 'datetime',
+            'total_duration_seconds': 'float',
+            'pages_read': 'float',
+            'completion_percentage': 'float'
+        },
+        'user_interactions': {
+            '_id': 'id',
+            'user_id': 'id',
+            'book_id': 'id',
+            'interaction_type': 'str',
+            'timestamp': 'datetime',
+            'duration': 'float'
+        }
+    }
+}
+
+def merge_projections(*consumers: str) -> Dict[str, Dict[str, str]]:
+    """Menggabungkan proyeksi beberapa konsumen menjadi satu proyeksi per koleksi"""
+    merged: Dict[str, Dict[str, str]] = {}
+    for consumer in consumers:
+        for collection_name, fields in CONSUMER_PROJECTIONS[consumer].items():
+            merged.setdefault(collection_name, {}).update(fields)
+    return merged
+
+class LoadReport:
+    """Statistik load satu koleksi"""
+
+    def __init__(self, collection: str, documents: int, bytes_transferred: int, seconds: float):
+        self.collection = collection
+        self.documents = documents
+        self.bytes_transferred = bytes_transferred
+        self.seconds = seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'collection': self.collection,
+            'documents': self.documents,
+            'bytes_transferred': self.bytes_transferred,
+            'seconds': round(self.seconds, 4)
+        }
+
+def _to_column(values: List[Any], column_type: str) -> pd.Series:
+    """Konversi list nilai mentah menjadi kolom pandas bertipe"""
+    if column_type == 'id':
+        return pd.Series([str(v) if v is not None else None for v in values], dtype=object)
+    if column_type == 'str':
+        return pd.Series([v if v is None or isinstance(v, str) else str(v) for v in values], dtype=object)
+    if column_type == 'float':
+        return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').astype('float64')
+    if column_type == 'datetime':
+        return pd.to_datetime(pd.Series(values, dtype=object), errors='coerce')
+    if column_type == 'bool':
+        return pd.Series(values, dtype=object).astype('boolean')
+    return pd.Series(values, dtype=object)
+
+class CatalogLoader:
+    """Loader koleksi MongoDB dengan proyeksi field, cursor batch dan kolom bertipe"""
+
+    def __init__(self, db, batch_size: Optional[int] = None):
+        """Inisialisasi CatalogLoader"""
+        self.db = db
+        self.batch_size = batch_size or Config.CATALOG_BATCH_SIZE
+        self.reports: Dict[str, LoadReport] = {}
+
+    def _raw_collection(self, collection_name: str):
+        """Koleksi yang mengembalikan RawBSONDocument agar ukuran byte bisa diukur tanpa encode ulang"""
+        collection = self.db[collection_name]
+        try:
+            return collection.with_options(codec_options=CodecOptions(document_class=RawBSONDocument))
+        except Exception:
+            return collection
+
+    def _iter_documents(self, collection_name: str, fields: Iterable[str],
+                        query: Optional[Dict[str, Any]] = None) -> Iterable[Tuple[Any, int]]:
+        """Iterasi dokumen hasil proyeksi beserta ukuran BSON-nya"""
+        projection = {field: 1 for field in fields}
+        cursor = self._raw_collection(collection_name).find(query or {}, projection, batch_size=self.batch_size)
+        for document in cursor:
+            raw = getattr(document, 'raw', None)
+            yield document, len(raw) if raw is not None else len(bson_encode(document))
+
+    def stream(self, collection_name: str, fields: Iterable[str],
+               query: Optional[Dict[str, Any]] = None) -> Iterator[Any]:
+        """Iterasi dokumen hasil proyeksi satu per satu tanpa menampung seluruh koleksi
+
+        Statistik load dicatat setelah cursor habis.
+        """
+        from utils.logger import ai_logger
+
+        start_time = time.time()
+        documents = 0
+        bytes_transferred = 0
+
+        for document, size in self._iter_documents(collection_name, fields, query):
+            documents += 1
+            bytes_transferred += size
+            yield document
+
+        report = LoadReport(collection_name, documents, bytes_transferred, time.time() - start_time)
+        self.reports[collection_name] = report
+        # Poll inkremental yang kosong cukup di level debug
+        log = ai_logger.logger.info if documents or not query else ai_logger.logger.debug
+        log(
+            f"Loaded {documents} {collection_name} "
+            f"({bytes_transferred / 1024:.1f} KB in {report.seconds:.3f}s)"
+        )
+
+    def load(self, collection_name: str, fields: Dict[str, str],
+             query: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Load satu koleksi menjadi DataFrame dengan kolom sesuai proyeksi"""
+        columns: Dict[str, List[Any]] = {field: [] for field in fields}
+        for document in self.stream(collection_name, fields.keys(), query):
+            for field, values in columns.items():
+                values.append(document.get(field))
+
+        return pd.DataFrame({
+            field: _to_column(values, fields[field]) for field, values in columns.items()
+        })
+
+    def load_all(self, projections: Dict[str, Dict[str, str]]) -> Dict[str, pd.DataFrame]:
+        """Load semua koleksi pada proyeksi gabungan"""
+        return {
+            collection_name: self.load(collection_name, fields)
+            for collection_name, fields in projections.items()
+        }
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """Statistik load per koleksi"""
+        return {name: report.to_dict() for name, report in self.reports.items()}
@@ -0,0 +1,531 @@
+import threading
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from typing import Any, Callable, Dict, Optional
+from config.settings import Config
+from .book_index import BookIndex
+from .catalog_loader import CatalogLoader, merge_projections
+from .model_artifact_store import ModelArtifacts, ModelArtifactStore, catalog_fingerprint
+from .als_model import AlsModel, build_als_model
+from .ann_index import AnnIndex, build_ann_index
+from .implicit_feedback import build_implicit_feedback, with_implicit_feedback
+from .item_similarity import ItemSimilarity, build_item_similarity, update_item_similarity
+from .neighbor_table import NeighborTable, build_neighbor_table, update_neighbor_table
+from .query_expansion import QueryExpander, build_query_expander
+from .rating_updates import RatingOverlay
+from .user_item_matrix import UserItemMatrix
+
+# Konsumen snapshot; proyeksi field setiap koleksi adalah gabungan kebutuhan mereka
+SNAPSHOT_CONSUMERS = ('recommendation', 'user_preference')
+
+class CatalogSnapshot:
+    """Snapshot katalog dan model yang immutable, dibagi oleh semua service dalam satu proses"""
+
+    def __init__(self, version: int, books_df: pd.DataFrame, ratings_df: pd.DataFrame,
+                 reading_history_df: pd.DataFrame, user_interactions_df: pd.DataFrame,
+                 tfidf_vectorizer: Optional[TfidfVectorizer], tfidf_matrix: Any,
+                 user_item_matrix: UserItemMatrix, built_at: Optional[float] = None,
+                 load_stats: Optional[Dict[str, Dict[str, Any]]] = None,
+                 fingerprint: Optional[str] = None,
+                 content_neighbors: Optional[NeighborTable] = None,
+                 content_ann: Optional[AnnIndex] = None,
+                 item_similarity: Optional[ItemSimilarity] = None,
+                 als_model: Optional[AlsModel] = None,
+                 implicit_feedback: Optional[UserItemMatrix] = None,
+                 query_expander: Optional[QueryExpander] = None):
+        """Inisialisasi snapshot; atribut tidak dapat diubah setelah dibuat"""
+        fields = {
+            'version': version,
+            'books_df': books_df,
+            'ratings_df': ratings_df,
+            'reading_history_df': reading_history_df,
+            'user_interactions_df': user_interactions_df,
+            'tfidf_vectorizer': tfidf_vectorizer,
+            'tfidf_matrix': tfidf_matrix,
+            'user_item_matrix': user_item_matrix,
+            'built_at': built_at if built_at is not None else time.time(),
+            'load_stats': load_stats or {},
+            'fingerprint': fingerprint,
+            'content_neighbors': content_neighbors,
+            'content_ann': content_ann,
+            'item_similarity': item_similarity,
+            'als_model': als_model,
+            'implicit_feedback': implicit_feedback,
+            'query_expander': query_expander
+        }
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+        # Index id buku -> baris, dibagi oleh semua lookup selama umur snapshot
+        object.__setattr__(self, 'book_index', BookIndex.from_books(books_df))
+
+        # Kunci buffer TF-IDF, user-item, item similarity dan implicit agar tidak termodifikasi oleh konsumen
+        for matrix in (tfidf_matrix, user_item_matrix.matrix,
+                       item_similarity.matrix if item_similarity is not None else None,
+                       implicit_feedback.matrix if implicit_feedback is not None else None):
+            if matrix is None:
+                continue
+            for array in (matrix.data, matrix.indices, matrix.indptr):
+                array.setflags(write=False)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CatalogSnapshot bersifat immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("CatalogSnapshot bersifat immutable")
+
+    def evolve(self, version: int, **changes) -> 'CatalogSnapshot':
+        """Membuat snapshot baru dengan sebagian field diganti; snapshot ini tidak berubah"""
+        fields = {
+            'books_df': self.books_df,
+            'ratings_df': self.ratings_df,
+            'reading_history_df': self.reading_history_df,
+            'user_interactions_df': self.user_interactions_df,
+            'tfidf_vectorizer': self.tfidf_vectorizer,
+            'tfidf_matrix': self.tfidf_matrix,
+            'user_item_matrix': self.user_item_matrix,
+            'load_stats': self.load_stats,
+            'fingerprint': self.fingerprint,
+            'content_neighbors': self.content_neighbors,
+            'content_ann': self.content_ann,
+            'item_similarity': self.item_similarity,
+            'als_model': self.als_model,
+            'implicit_feedback': self.implicit_feedback,
+            'query_expander': self.query_expander
+        }
+        fields.update(changes)
+        return CatalogSnapshot(version=version, **fields)
+
+    def user_rating_rows(self, user_id: Any) -> np.ndarray:
+        """Posisi baris ratings_df milik user; index per user dibangun sekali per snapshot"""
+        index = self.__dict__.get('_ratings_by_user')
+        if index is None:
+            ratings_df = self.ratings_df
+            index = (ratings_df.groupby(ratings_df['user_id'].astype(str), sort=False).indices
+                     if not ratings_df.empty and 'user_id' in ratings_df.columns else {})
+            object.__setattr__(self, '_ratings_by_user', index)
+        return index.get(str(user_id), np.empty(0, dtype=np.int64))
+
+    @property
+    def is_empty(self) -> bool:
+        """Apakah snapshot tidak memiliki data buku"""
+        return self.books_df.empty
+
+    def summary(self) -> Dict[str, Any]:
+        """Ringkasan ukuran snapshot untuk logging/monitoring"""
+        return {
+            'version': self.version,
+            'fingerprint': self.fingerprint,
+            'built_at': self.built_at,
+            'books': len(self.books_df),
+            'ratings': len(self.ratings_df),
+            'reading_history': len(self.reading_history_df),
+            'user_interactions': len(self.user_interactions_df),
+            'tfidf_shape': self.tfidf_matrix.shape if self.tfidf_matrix is not None else None,
+            'user_item_shape': self.user_item_matrix.shape,
+            'user_item_nnz': self.user_item_matrix.nnz,
+            'content_neighbors_k': self.content_neighbors.k if self.content_neighbors is not None else None,
+            'content_ann': {'engine': self.content_ann.name, **self.content_ann.params()} if self.content_ann is not None else None,
+            'item_similarity_nnz': self.item_similarity.nnz if self.item_similarity is not None else None,
+            'implicit_nnz': self.implicit_feedback.nnz if self.implicit_feedback is not None else None,
+            'als': {
+                'factors': self.als_model.factors,
+                'users': len(self.als_model.user_ids),
+                'books': len(self.als_model.book_ids)
+            } if self.als_model is not None else None,
+            'query_expansion_phrases': len(self.query_expander.phrases) if self.query_expander is not None else None,
+            'load_stats': self.load_stats
+        }
+
+    @classmethod
+    def empty(cls, version: int = 0) -> 'CatalogSnapshot':
+        """Snapshot kosong sebagai fallback ketika load gagal"""
+        return cls(
+            version=version,
+            books_df=pd.DataFrame(),
+            ratings_df=pd.DataFrame(),
+            reading_history_df=pd.DataFrame(),
+            user_interactions_df=pd.DataFrame(),
+            tfidf_vectorizer=None,
+            tfidf_matrix=None,
+            user_item_matrix=UserItemMatrix.create_empty()
+        )
+
+def _create_tfidf_vectorizer() -> TfidfVectorizer:
+    """Membuat TF-IDF vectorizer dengan konfigurasi standar"""
+    return TfidfVectorizer(
+        stop_words='english',
+        max_features=5000,
+        ngram_range=(1, 2)
+    )
+
+def prepare_content_column(books_df: pd.DataFrame):
+    """Gabungkan semua informasi buku menjadi kolom konten"""
+    books_df['content'] = (
+        books_df['title'].fillna('') + ' ' +
+        books_df['description'].fillna('') + ' ' +
+        books_df['author'].fillna('') + ' ' +
+        books_df['genre'].fillna('')
+    )
+
+def _prepare_content_data(books_df: pd.DataFrame):
+    """Mempersiapkan TF-IDF matrix untuk content-based filtering"""
+    from utils.logger import ai_logger
+
+    try:
+        # Buat TF-IDF matrix
+        tfidf_vectorizer = _create_tfidf_vectorizer()
+        tfidf_matrix = tfidf_vectorizer.fit_transform(books_df['content'])
+        ai_logger.logger.info(f"Created TF-IDF matrix: {tfidf_matrix.shape}")
+        return tfidf_vectorizer, tfidf_matrix
+
+    except Exception as e:
+        ai_logger.logger.error(f"Failed to prepare content data: {str(e)}")
+        return None, None
+
+def create_user_item_matrix(ratings_df: pd.DataFrame) -> UserItemMatrix:
+    """Membuat user-item matrix sparse untuk collaborative filtering"""
+    from utils.logger import ai_logger
+
+    if ratings_df.empty:
+        ai_logger.logger.warning("No ratings data available for collaborative filtering")
+        return UserItemMatrix.create_empty()
+
+    try:
+        user_item_matrix = UserItemMatrix.from_ratings(ratings_df)
+        ai_logger.logger.info(
+            f"Created user-item matrix: {user_item_matrix.shape} ({user_item_matrix.nnz} ratings)"
+        )
+        return user_item_matrix
+    except Exception as e:
+        ai_logger.logger.warning(f"Failed to create user-item matrix: {str(e)}")
+        return UserItemMatrix.create_empty()
+
+def build_content_ann(tfidf_matrix) -> Optional[AnnIndex]:
+    """Bangun index ANN konten sesuai Config.ANN_ENGINE (None = jalur exact)"""
+    from utils.logger import ai_logger
+
+    try:
+        return build_ann_index(tfidf_matrix)
+    except Exception as e:
+        ai_logger.log_error("AnnIndex", str(e))
+        return None
+
+def build_content_neighbors(tfidf_matrix, content_ann: Optional[AnnIndex] = None) -> Optional[NeighborTable]:
+    """Hitung tabel top-K tetangga konten jika diaktifkan"""
+    from utils.logger import ai_logger
+
+    if not Config.CONTENT_NEIGHBORS_ENABLED or tfidf_matrix is None:
+        return None
+    try:
+        return build_neighbor_table(tfidf_matrix, ann_index=content_ann)
+    except Exception as e:
+        ai_logger.log_error("NeighborTable", str(e))
+        return None
+
+def update_content_neighbors(content_neighbors: Optional[NeighborTable], tfidf_matrix,
+                             changed_rows: np.ndarray) -> Optional[NeighborTable]:
+    """Perbarui tabel tetangga konten hanya pada baris yang terdampak buku yang berubah"""
+    from utils.logger import ai_logger
+
+    if not Config.CONTENT_NEIGHBORS_ENABLED or tfidf_matrix is None:
+        return None
+    try:
+        return update_neighbor_table(content_neighbors, tfidf_matrix, changed_rows)
+    except Exception as e:
+        ai_logger.log_error("NeighborTable", str(e))
+        return None
+
+def build_item_cf(user_item_matrix: UserItemMatrix,
+                  implicit: Optional[UserItemMatrix] = None) -> Optional[ItemSimilarity]:
+    """Hitung similarity item-item untuk strategi collaborative item_item
+
+    Co-engagement dari sinyal implicit ikut dihitung; kolom tetap sejajar dengan user_item_matrix.
+    """
+    from utils.logger import ai_logger
+
+    try:
+        return build_item_similarity(with_implicit_feedback(user_item_matrix, implicit))
+    except Exception as e:
+        ai_logger.log_error("ItemSimilarity", str(e))
+        return None
+
+def update_item_cf(item_similarity: Optional[ItemSimilarity], user_item_matrix: UserItemMatrix,
+                   implicit: Optional[UserItemMatrix], changed_cols: np.ndarray) -> Optional[ItemSimilarity]:
+    """Perbarui similarity item-item hanya untuk kolom buku yang ratingnya berubah"""
+    from utils.logger import ai_logger
+
+    try:
+        return update_item_similarity(item_similarity, with_implicit_feedback(user_item_matrix, implicit), changed_cols)
+    except Exception as e:
+        ai_logger.log_error("ItemSimilarity", str(e))
+        return None
+
+def build_als(ratings_df: pd.DataFrame, implicit: Optional[UserItemMatrix] = None) -> Optional[AlsModel]:
+    """Training faktorisasi ALS untuk strategi collaborative als jika diaktifkan"""
+    from utils.logger import ai_logger
+
+    if not Config.ALS_ENABLED:
+        return None
+    try:
+        return build_als_model(ratings_df, implicit)
+    except Exception as e:
+        ai_logger.log_error("AlsModel", str(e))
+        return None
+
+def _fit_models(books_df: pd.DataFrame, ratings_df: pd.DataFrame, implicit: Optional[UserItemMatrix] = None):
+    """Fit TF-IDF, index ANN, tabel tetangga, user-item matrix, item similarity dan ALS dari awal
+
+    Mengembalikan (ModelArtifacts, index ANN); index ANN tidak ikut dipersist.
+    """
+    from utils.logger import ai_logger
+
+    tfidf_vectorizer, tfidf_matrix = None, None
+    if not books_df.empty:
+        tfidf_vectorizer, tfidf_matrix = _prepare_content_data(books_df)
+    else:
+        ai_logger.logger.warning("No books data found in database")
+
+    content_ann = build_content_ann(tfidf_matrix)
+    user_item_matrix = create_user_item_matrix(ratings_df)
+    artifacts = ModelArtifacts(
+        tfidf_vectorizer,
+        tfidf_matrix,
+        books_df['_id'].tolist() if '_id' in books_df.columns else [],
+        user_item_matrix,
+        content_neighbors=build_content_neighbors(tfidf_matrix, content_ann),
+        item_similarity=build_item_cf(user_item_matrix, implicit),
+        als_model=build_als(ratings_df, implicit)
+    )
+    return artifacts, content_ann
+
+def build_snapshot(db, version: int, artifact_store: Optional[ModelArtifactStore] = None,
+                   refit: bool = False) -> CatalogSnapshot:
+    """Load semua koleksi dari MongoDB dan bangun snapshot baru"""
+    from utils.logger import ai_logger
+
+    start_time = time.time()
+
+    loader = CatalogLoader(db)
+    frames = loader.load_all(merge_projections(*SNAPSHOT_CONSUMERS))
+    books_df = frames['books']
+    ratings_df = frames['ratings']
+    reading_history_df = frames['reading_history']
+    user_interactions_df = frames['user_interactions']
+
+    if not books_df.empty:
+        prepare_content_column(books_df)
+
+    # Sinyal implicit di-stream langsung dari koleksi (agregat, bukan dokumen mentah)
+    implicit_feedback = build_implicit_feedback(db, loader)
+    fingerprint = catalog_fingerprint(books_df, ratings_df, implicit_feedback)
+    content_ann = None
+    if artifact_store is not None:
+        def fit_models():
+            nonlocal content_ann
+            artifacts, content_ann = _fit_models(books_df, ratings_df, implicit_feedback)
+            return artifacts
+
+        # Warm start: pakai artefak tersimpan jika fingerprint katalog tidak berubah
+        artifacts = artifact_store.load_or_build(
+            fingerprint,
+            books_df['_id'].tolist() if '_id' in books_df.columns else [],
+            fit_models,
+            refit=refit
+        )
+        if content_ann is None:
+            # Index ANN tidak dipersist; bangun ulang dari TF-IDF yang di-load
+            content_ann = build_content_ann(artifacts.tfidf_matrix)
+    else:
+        artifacts, content_ann = _fit_models(books_df, ratings_df, implicit_feedback)
+
+    # Ekspansi query lokal tidak dipersist: bergantung pada koleksi keyword/genre dan vocabulary aktif
+    query_expander = build_query_expander(
+        db, artifacts.tfidf_vectorizer, artifacts.tfidf_matrix, BookIndex.from_books(books_df), books_df, loader
+    )
+
+    snapshot = CatalogSnapshot(
+        version=version,
+        books_df=books_df,
+        ratings_df=ratings_df,
+        reading_history_df=reading_history_df,
+        user_interactions_df=user_interactions_df,
+        tfidf_vectorizer=artifacts.tfidf_vectorizer,
+        tfidf_matrix=artifacts.tfidf_matrix,
+        user_item_matrix=artifacts.user_item_matrix,
+        load_stats=loader.report(),
+        fingerprint=fingerprint,
+        content_neighbors=artifacts.content_neighbors,
+        content_ann=content_ann,
+        item_similarity=artifacts.item_similarity,
+        als_model=artifacts.als_model,
+        implicit_feedback=implicit_feedback,
+        query_expander=query_expander
+    )
+    ai_logger.log_performance("CatalogSnapshot", f"build v{version}", time.time() - start_time)
+    return snapshot
+
+class CatalogStore:
+    """Pemegang snapshot katalog aktif (double-buffered); satu instance dibagi oleh semua service
+
+    Snapshot baru selalu dibangun di luar jalur request lalu dipasang dengan satu
+    assignment referensi, sehingga pembaca tidak pernah melihat snapshot setengah jadi.
+    """
+
+    def __init__(self, db=None, artifact_store: Optional[ModelArtifactStore] = None):
+        """Inisialisasi CatalogStore"""
+        self._db = db
+        if artifact_store is None and Config.MODEL_ARTIFACTS_ENABLED:
+            artifact_store = ModelArtifactStore()
+        self.artifact_store = artifact_store
+        # Rating baru yang belum termuat snapshot; dibaca bersama snapshot aktif
+        self.rating_overlay = RatingOverlay()
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._version = 0
+        self._build_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._building = False
+        self._refresh_pending = False
+        self._last_build_seconds: Optional[float] = None
+        self._last_swap_at: Optional[float] = None
+        self._last_error: Optional[str] = None
+
+    @property
+    def db(self):
+        """Database yang digunakan untuk membangun snapshot"""
+        if self._db is None:
+            from utils.database import get_database
+            self._db = get_database()
+        return self._db
+
+    @property
+    def snapshot(self) -> CatalogSnapshot:
+        """Snapshot aktif; dibangun sekali saat pertama kali diakses"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._build_lock:
+                if self._snapshot is None:
+                    self._build_and_swap()
+                snapshot = self._snapshot
+        return snapshot
+
+    def refresh(self, refit: bool = False) -> CatalogSnapshot:
+        """Bangun ulang snapshot secara blocking lalu tukar snapshot aktif
+
+        refit=True mengabaikan artefak tersimpan dan selalu fit ulang model.
+        """
+        with self._build_lock:
+            self._build_and_swap(refit)
+            return self._snapshot
+
+    def refresh_async(self) -> bool:
+        """Mulai rebuild di background; request yang sedang berjalan tetap memakai snapshot lama
+
+        Jika rebuild lain sedang berjalan, permintaan digabung menjadi satu rebuild lanjutan
+        dan fungsi mengembalikan False.
+        """
+        with self._state_lock:
+            if self._building:
+                self._refresh_pending = True
+                return False
+            self._building = True
+
+        thread = threading.Thread(target=self._background_refresh, name='catalog-refresh', daemon=True)
+        thread.start()
+        return True
+
+    def _background_refresh(self):
+        """Loop rebuild background sampai tidak ada permintaan refresh tertunda"""
+        while True:
+            try:
+                with self._build_lock:
+                    self._build_and_swap()
+            finally:
+                with self._state_lock:
+                    if not self._refresh_pending:
+                        self._building = False
+                        return
+                    self._refresh_pending = False
+
+    def apply_update(self, update_fn: Callable[[CatalogSnapshot, int], Optional[CatalogSnapshot]]) -> Optional[CatalogSnapshot]:
+        """Bangun snapshot turunan dari snapshot aktif lalu pasang secara atomik
+
+        update_fn menerima (snapshot_aktif, versi_baru) dan mengembalikan snapshot baru,
+        atau None jika tidak ada perubahan.
+        """
+        self.snapshot  # Pastikan snapshot awal sudah dibangun
+        with self._build_lock:
+            start_time = time.time()
+            snapshot = update_fn(self._snapshot, self._version + 1)
+            if snapshot is None:
+                return None
+            self._swap(snapshot, time.time() - start_time)
+            return snapshot
+
+    def _build_and_swap(self, refit: bool = False):
+        """Membangun snapshot versi berikutnya lalu memasangnya secara atomik"""
+        from utils.logger import ai_logger
+
+        version = self._version + 1
+        start_time = time.time()
+        try:
+            snapshot = build_snapshot(self.db, version, self.artifact_store, refit)
+            self._last_error = None
+        except Exception as e:
+            ai_logger.log_error("CatalogSnapshot", str(e))
+            self._last_error = str(e)
+            if self._snapshot is not None:
+                # Pertahankan snapshot lama daripada memasang snapshot kosong
+                return
+            snapshot = CatalogSnapshot.empty(version)
+
+        self._swap(snapshot, time.time() - start_time)
+
+    def _swap(self, snapshot: CatalogSnapshot, build_seconds: float):
+        """Memasang snapshot baru; dipanggil dengan _build_lock dipegang"""
+        from utils.logger import ai_logger
+
+        self._version = snapshot.version
+        self._last_build_seconds = build_seconds
+        # Swap atomik: satu assignment referensi
+        self._snapshot = snapshot
+        self._last_swap_at = time.time()
+        compacted = self.rating_overlay.compact(snapshot)
+        ai_logger.logger.info(
+            f"Catalog snapshot v{snapshot.version} swapped in after {build_seconds:.2f}s "
+            f"({compacted} overlay ratings compacted, {len(self.rating_overlay)} pending)"
+        )
+
+    def status(self) -> Dict[str, Any]:
+        """Status model aktif untuk endpoint monitoring"""
+        snapshot = self._snapshot
+
+        def _iso(timestamp: Optional[float]) -> Optional[str]:
+            return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+        return {
+            'version': snapshot.version if snapshot else None,
+            'fingerprint': snapshot.fingerprint if snapshot else None,
+            'built_at': _iso(snapshot.built_at) if snapshot else None,
+            'build_duration_seconds': round(self._last_build_seconds, 4) if self._last_build_seconds is not None else None,
+            'last_swap_at': _iso(self._last_swap_at),
+            'building': self._building,
+            'refresh_pending': self._refresh_pending,
+            'last_error': self._last_error,
+            'pending_overlay_ratings': len(self.rating_overlay),
+            'snapshot': snapshot.summary() if snapshot else None
+        }
+
+_default_store: Optional[CatalogStore] = None
+_default_store_lock = threading.Lock()
+
+def get_catalog_store() -> CatalogStore:
+    """Mendapatkan CatalogStore bersama untuk proses ini"""
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = CatalogStore()
+    return _default_store
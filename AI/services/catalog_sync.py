@@ -0,0 +1,345 @@
+import json
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from scipy import sparse
+from typing import Any, Dict, Optional
+from config.settings import Config
+from .catalog_loader import CatalogLoader, merge_projections
+from .catalog_snapshot import (
+    CatalogSnapshot, CatalogStore, SNAPSHOT_CONSUMERS, prepare_content_column, create_user_item_matrix,
+    update_content_neighbors, update_item_cf
+)
+from .model_artifact_store import ModelArtifacts, catalog_fingerprint
+
+# Field timestamp yang dipakai sebagai watermark per koleksi
+WATERMARK_FIELDS = {
+    'books': ('updatedAt', 'createdAt'),
+    'ratings': ('rating_date', 'timestamp')
+}
+
+# Field yang dibandingkan per _id untuk memutuskan apakah dokumen >= watermark benar-benar berubah
+CHANGE_FIELDS = {
+    'books': WATERMARK_FIELDS['books'],
+    'ratings': WATERMARK_FIELDS['ratings'] + ('user_id', 'book_id', 'rating_value')
+}
+
+def _max_timestamp(df: pd.DataFrame, fields) -> Optional[pd.Timestamp]:
+    """Timestamp terbesar pada kolom-kolom watermark"""
+    values = [df[field].max() for field in fields if field in df.columns and not df.empty]
+    values = [value for value in values if pd.notna(value)]
+    return max(values) if values else None
+
+def _unchanged_rows(current_df: pd.DataFrame, changes: pd.DataFrame, fields) -> np.ndarray:
+    """True untuk dokumen delta yang _id-nya ada di snapshot dengan nilai fields yang sama"""
+    if current_df.empty or '_id' not in current_df.columns:
+        return np.zeros(len(changes), dtype=bool)
+    current = current_df.drop_duplicates('_id', keep='last').set_index('_id')
+    unchanged = np.array(changes['_id'].isin(current.index), dtype=bool)
+    missing = np.full(len(changes), None, dtype=object)
+    for field in fields:
+        previous = current[field].reindex(changes['_id']).to_numpy() if field in current.columns else missing
+        incoming = changes[field].to_numpy() if field in changes.columns else missing
+        unchanged &= (pd.isna(previous) & pd.isna(incoming)) | (previous == incoming)
+    return unchanged
+
+def _apply_book_changes(snapshot: CatalogSnapshot, changed_books: pd.DataFrame):
+    """Ganti/tambah baris buku dan baris TF-IDF; juga mengembalikan posisi baris yang diganti"""
+    books_df = snapshot.books_df
+    changed = changed_books.drop_duplicates('_id', keep='last').reset_index(drop=True)
+    prepare_content_column(changed)
+    changed = changed.reindex(columns=books_df.columns)
+
+    positions = pd.Index(books_df['_id']).get_indexer(changed['_id'])
+    replaced = positions >= 0
+    n_books = len(books_df)
+
+    # Urutan baris hasil: baris lama yang diganti menunjuk ke baris delta, buku baru ditambahkan di akhir
+    order = np.arange(n_books + int((~replaced).sum()))
+    order[positions[replaced]] = n_books + np.flatnonzero(replaced)
+    order[n_books:] = n_books + np.flatnonzero(~replaced)
+
+    stacked_books = pd.concat([books_df, changed], ignore_index=True)
+    new_books_df = stacked_books.iloc[order].reset_index(drop=True)
+
+    # Transform dengan vocabulary yang sudah ada, tanpa refit
+    changed_rows = snapshot.tfidf_vectorizer.transform(changed['content'])
+    stacked = sparse.vstack([snapshot.tfidf_matrix, changed_rows], format='csr')
+    new_tfidf_matrix = stacked[order]
+
+    return new_books_df, new_tfidf_matrix, positions[replaced]
+
+def _cell_keys(ratings_df: pd.DataFrame) -> pd.Series:
+    """Kunci koordinat sel user-item setiap baris rating"""
+    return ratings_df['user_id'].astype(str) + '\x00' + ratings_df['book_id'].astype(str)
+
+def _apply_rating_changes(snapshot: CatalogSnapshot, changed_ratings: pd.DataFrame):
+    """Ganti/tambah ratings dan perbarui hanya sel user-item yang terdampak
+
+    Juga mengembalikan kolom buku (axis matrix baru) yang nilainya bisa berubah.
+    """
+    ratings_df = snapshot.ratings_df
+    changed = changed_ratings.drop_duplicates('_id', keep='last')
+    replaced = ratings_df['_id'].isin(changed['_id']).to_numpy()
+    new_ratings_df = pd.concat(
+        [ratings_df[~replaced], changed.reindex(columns=ratings_df.columns)],
+        ignore_index=True
+    )
+
+    user_item_matrix = snapshot.user_item_matrix
+    if user_item_matrix.empty:
+        user_item_matrix = create_user_item_matrix(new_ratings_df)
+        return new_ratings_df, user_item_matrix, np.arange(user_item_matrix.shape[1])
+
+    # Rating yang diedit bisa pindah koordinat (user_id/book_id berubah). Koordinat lama yang tidak
+    # lagi didukung baris mana pun dibuang; semua koordinat terdampak dihitung ulang dari baris yang
+    # tersisa (rating terbaru menang) sehingga hasilnya sama dengan membangun matrix dari awal
+    previous = ratings_df[replaced]
+    previous_keys = _cell_keys(previous)
+    new_keys = _cell_keys(new_ratings_df)
+    affected = set(previous_keys) | set(_cell_keys(changed))
+    cells = new_ratings_df[new_keys.isin(affected).to_numpy()]
+    removed = previous[~previous_keys.isin(set(new_keys)).to_numpy()]
+
+    # Hanya sel yang terdampak yang diganti; matrix lama tetap dipakai snapshot sebelumnya
+    user_item_matrix = user_item_matrix.with_updates(cells, removed=removed)
+    touched = pd.Index(user_item_matrix.book_ids).get_indexer(pd.concat([cells['book_id'], removed['book_id']]))
+    return new_ratings_df, user_item_matrix, np.unique(touched[touched >= 0])
+
+def apply_catalog_delta(snapshot: CatalogSnapshot, version: int, changed_books: pd.DataFrame,
+                        changed_ratings: pd.DataFrame) -> CatalogSnapshot:
+    """Bangun snapshot baru dari snapshot lama ditambah delta buku dan ratings"""
+    changes: Dict[str, Any] = {}
+
+    if not changed_books.empty:
+        changes['books_df'], changes['tfidf_matrix'], changed_rows = _apply_book_changes(snapshot, changed_books)
+        # Hanya baris tetangga yang terdampak yang dihitung ulang. Index ANN tidak mendukung update
+        # sehingga tetap versi lama sampai rebuild penuh berkala: baris lama tidak bergeser, jadi
+        # hasilnya tetap valid, hanya buku baru/berubah yang belum terwakili di index
+        changes['content_neighbors'] = update_content_neighbors(
+            snapshot.content_neighbors, changes['tfidf_matrix'], changed_rows
+        )
+
+    if not changed_ratings.empty:
+        changes['ratings_df'], changes['user_item_matrix'], changed_cols = _apply_rating_changes(snapshot, changed_ratings)
+        # Hanya similarity buku yang kolom ratingnya berubah (dan baris yang terdampak) yang dihitung ulang
+        changes['item_similarity'] = update_item_cf(
+            snapshot.item_similarity, changes['user_item_matrix'], snapshot.implicit_feedback, changed_cols
+        )
+        # Model ALS tidak di-training ulang di sini; user dengan rating baru di-fold-in saat serving
+
+    changes['fingerprint'] = catalog_fingerprint(
+        changes.get('books_df', snapshot.books_df),
+        changes.get('ratings_df', snapshot.ratings_df),
+        snapshot.implicit_feedback
+    )
+    return snapshot.evolve(version, **changes)
+
+class CatalogSyncEngine:
+    """Sinkronisasi inkremental katalog dan ratings berbasis watermark updatedAt/rating_date
+
+    Setiap poll hanya mengambil dokumen yang lebih baru dari watermark tersimpan lalu
+    menerapkan delta ke snapshot aktif. Rebuild penuh tetap dijalankan berkala untuk
+    mengatasi drift vocabulary TF-IDF dan dokumen yang dihapus.
+    """
+
+    def __init__(self, catalog_store: CatalogStore, db=None, watermark_path: Optional[str] = None,
+                 poll_interval: Optional[float] = None, full_rebuild_interval: Optional[float] = None,
+                 full_rebuild_change_ratio: Optional[float] = None):
+        """Inisialisasi CatalogSyncEngine"""
+        self.catalog_store = catalog_store
+        self.db = db if db is not None else catalog_store.db
+        self.watermark_path = watermark_path or os.path.join(Config.MODEL_ARTIFACT_DIR, 'sync_watermarks.json')
+        self.poll_interval = poll_interval or Config.CATALOG_SYNC_INTERVAL
+        self.full_rebuild_interval = full_rebuild_interval or Config.CATALOG_FULL_REBUILD_INTERVAL
+        self.full_rebuild_change_ratio = full_rebuild_change_ratio or Config.CATALOG_FULL_REBUILD_CHANGE_RATIO
+        self.projections = merge_projections(*SNAPSHOT_CONSUMERS)
+
+        self._watermarks: Dict[str, Optional[pd.Timestamp]] = {}
+        self._last_full_rebuild = time.time()
+        self._changed_books_since_full = 0
+        self._last_poll: Dict[str, Any] = {}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._load_watermarks()
+
+    def _load_watermarks(self):
+        """Load watermark tersimpan; fallback ke timestamp terbesar pada snapshot aktif"""
+        persisted: Dict[str, Any] = {}
+        try:
+            with open(self.watermark_path) as f:
+                persisted = json.load(f)
+        except (FileNotFoundError, ValueError):
+            pass
+
+        snapshot = self.catalog_store.snapshot
+        frames = {'books': snapshot.books_df, 'ratings': snapshot.ratings_df}
+        for collection_name, fields in WATERMARK_FIELDS.items():
+            candidates = [_max_timestamp(frames[collection_name], fields)]
+            if persisted.get(collection_name):
+                candidates.append(pd.Timestamp(persisted[collection_name]))
+            candidates = [candidate for candidate in candidates if candidate is not None]
+            self._watermarks[collection_name] = max(candidates) if candidates else None
+
+    def _save_watermarks(self):
+        """Simpan watermark ke disk agar restart melanjutkan dari posisi terakhir"""
+        from utils.logger import ai_logger
+
+        try:
+            os.makedirs(os.path.dirname(self.watermark_path) or '.', exist_ok=True)
+            tmp_path = f"{self.watermark_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({
+                    name: value.isoformat() if value is not None else None
+                    for name, value in self._watermarks.items()
+                }, f)
+            os.replace(tmp_path, self.watermark_path)
+        except Exception as e:
+            ai_logger.log_error("CatalogSync", f"Failed to save watermarks: {str(e)}")
+
+    def _fetch_changes(self, collection_name: str, current_df: pd.DataFrame) -> pd.DataFrame:
+        """Ambil dokumen dengan timestamp >= watermark yang baru atau berbeda dari snapshot"""
+        watermark = self._watermarks.get(collection_name)
+        fields = WATERMARK_FIELDS[collection_name]
+        query = {}
+        if watermark is not None:
+            # $gte agar dokumen dengan timestamp sama tidak terlewat; duplikat disaring di bawah
+            query = {'$or': [{field: {'$gte': watermark.to_pydatetime()}} for field in fields]}
+
+        loader = CatalogLoader(self.db)
+        changes = loader.load(collection_name, self.projections[collection_name], query)
+        if changes.empty:
+            return changes
+
+        # Dokumen yang sudah ada hanya dianggap berubah jika timestamp atau nilainya bergeser
+        # (rating yang diedit diganti per _id oleh _apply_rating_changes)
+        unchanged = _unchanged_rows(current_df, changes, CHANGE_FIELDS[collection_name])
+        return changes[~unchanged].reset_index(drop=True)
+
+    def _needs_full_rebuild(self, snapshot: CatalogSnapshot) -> bool:
+        """Rebuild penuh jika interval terlewati atau terlalu banyak buku berubah sejak rebuild terakhir"""
+        if snapshot.tfidf_vectorizer is None or snapshot.books_df.empty:
+            return True
+        if time.time() - self._last_full_rebuild >= self.full_rebuild_interval:
+            return True
+        catalog_size = max(len(snapshot.books_df), 1)
+        return self._changed_books_since_full / catalog_size >= self.full_rebuild_change_ratio
+
+    def full_rebuild(self) -> CatalogSnapshot:
+        """Rebuild penuh (refit vocabulary) lalu reset watermark dari data baru"""
+        snapshot = self.catalog_store.refresh(refit=True)
+        self._last_full_rebuild = time.time()
+        self._changed_books_since_full = 0
+        for collection_name, fields in WATERMARK_FIELDS.items():
+            frame = snapshot.books_df if collection_name == 'books' else snapshot.ratings_df
+            self._watermarks[collection_name] = _max_timestamp(frame, fields) or self._watermarks.get(collection_name)
+        self._save_watermarks()
+        return snapshot
+
+    def poll_once(self) -> Dict[str, Any]:
+        """Satu siklus sinkronisasi; mengembalikan ringkasan delta yang diterapkan"""
+        from utils.logger import ai_logger
+
+        start_time = time.time()
+        snapshot = self.catalog_store.snapshot
+        changed_books, changed_ratings = pd.DataFrame(), pd.DataFrame()
+        # Snapshot kosong (fallback load gagal) atau interval terlewati langsung rebuild penuh tanpa diff
+        if not self._needs_full_rebuild(snapshot):
+            changed_books = self._fetch_changes('books', snapshot.books_df)
+            changed_ratings = self._fetch_changes('ratings', snapshot.ratings_df)
+            self._changed_books_since_full += len(changed_books)
+
+        mode = 'noop'
+        if self._needs_full_rebuild(snapshot):
+            mode = 'full'
+            snapshot = self.full_rebuild()
+        elif not changed_books.empty or not changed_ratings.empty:
+            mode = 'incremental'
+            snapshot = self.catalog_store.apply_update(
+                lambda current, version: apply_catalog_delta(current, version, changed_books, changed_ratings)
+            )
+            self._persist_artifacts(snapshot)
+            self._watermarks['books'] = max(
+                [value for value in (self._watermarks.get('books'), _max_timestamp(changed_books, WATERMARK_FIELDS['books'])) if value is not None],
+                default=None
+            )
+            self._watermarks['ratings'] = max(
+                [value for value in (self._watermarks.get('ratings'), _max_timestamp(changed_ratings, WATERMARK_FIELDS['ratings'])) if value is not None],
+                default=None
+            )
+            self._save_watermarks()
+
+        self._last_poll = {
+            'mode': mode,
+            'books_changed': len(changed_books),
+            'ratings_changed': len(changed_ratings),
+            'seconds': round(time.time() - start_time, 4),
+            'at': datetime.now().isoformat(),
+            'version': snapshot.version
+        }
+        if mode != 'noop':
+            ai_logger.logger.info(
+                f"Catalog sync ({mode}): {len(changed_books)} books, {len(changed_ratings)} ratings "
+                f"-> snapshot v{snapshot.version} in {self._last_poll['seconds']:.3f}s"
+            )
+        return self._last_poll
+
+    def _persist_artifacts(self, snapshot: CatalogSnapshot):
+        """Simpan artefak snapshot inkremental agar restart tetap warm"""
+        from utils.logger import ai_logger
+
+        artifact_store = self.catalog_store.artifact_store
+        if artifact_store is None or snapshot.tfidf_matrix is None:
+            return
+        try:
+            artifact_store.save(snapshot.fingerprint, ModelArtifacts(
+                snapshot.tfidf_vectorizer,
+                snapshot.tfidf_matrix,
+                snapshot.books_df['_id'].tolist(),
+                snapshot.user_item_matrix,
+                content_neighbors=snapshot.content_neighbors,
+                item_similarity=snapshot.item_similarity,
+                als_model=snapshot.als_model
+            ))
+        except Exception as e:
+            ai_logger.log_error("CatalogSync", f"Failed to persist incremental artifacts: {str(e)}")
+
+    def start(self):
+        """Jalankan polling di background thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='catalog-sync', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Hentikan polling background"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval)
+
+    def _run(self):
+        from utils.logger import ai_logger
+
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.poll_once()
+            except Exception as e:
+                ai_logger.log_error("CatalogSync", str(e))
+
+    def status(self) -> Dict[str, Any]:
+        """Status sinkronisasi untuk endpoint monitoring"""
+        return {
+            'running': bool(self._thread and self._thread.is_alive()),
+            'poll_interval_seconds': self.poll_interval,
+            'watermarks': {
+                name: value.isoformat() if value is not None else None
+                for name, value in self._watermarks.items()
+            },
+            'last_full_rebuild': datetime.fromtimestamp(self._last_full_rebuild).isoformat(),
+            'changed_books_since_full_rebuild': self._changed_books_since_full,
+            'last_poll': self._last_poll
+        }
@@ -0,0 +1,226 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+from config.settings import Config
+from .result_cache import estimate_size
+
+class ConversationStore:
+    """Riwayat percakapan per user di memori proses dengan eviction LRU, TTL dan batas memori
+
+    Setiap user menyimpan max_messages pesan terakhir. User yang tidak aktif lebih dari ttl
+    detik dibuang, dan user yang paling lama tidak aktif dibuang lebih dulu saat jumlah user
+    atau perkiraan ukuran memori melewati batas.
+    """
+
+    name = 'memory'
+
+    def __init__(self, max_messages: Optional[int] = None, max_users: Optional[int] = None,
+                 max_bytes: Optional[int] = None, ttl: Optional[float] = None):
+        """Inisialisasi ConversationStore"""
+        self.max_messages = max_messages or Config.CONVERSATION_MAX_MESSAGES
+        self.max_users = max_users or Config.CONVERSATION_MAX_USERS
+        self.max_bytes = max_bytes or Config.CONVERSATION_MAX_BYTES
+        self.ttl = ttl or Config.CONVERSATION_TTL
+        # user_id -> (last_active, deque pesan, ukuran byte)
+        self._users: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = {'lru': 0, 'ttl': 0, 'memory': 0}
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def get(self, user_id: str) -> List[Dict[str, str]]:
+        """Pesan user dari yang terlama; kosong jika user tidak ada atau sudah kedaluwarsa"""
+        with self._lock:
+            self._expire(time.time())
+            entry = self._users.get(user_id)
+            return list(entry[1]) if entry is not None else []
+
+    def append(self, user_id: str, role: str, content: str):
+        """Tambahkan pesan; pesan terlama dibuang setelah max_messages"""
+        message = {"role": role, "content": content}
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            entry = self._users.pop(user_id, None)
+            messages = entry[1] if entry is not None else deque(maxlen=self.max_messages)
+            if entry is not None:
+                self._bytes -= entry[2]
+            messages.append(message)
+            size = estimate_size(list(messages))
+            self._users[user_id] = (now, messages, size)
+            self._bytes += size
+
+            while len(self._users) > self.max_users:
+                self._evict('lru')
+            while self._bytes > self.max_bytes and len(self._users) > 1:
+                self._evict('memory')
+
+    def clear(self, user_id: str):
+        """Hapus riwayat satu user"""
+        with self._lock:
+            entry = self._users.pop(user_id, None)
+            if entry is not None:
+                self._bytes -= entry[2]
+
+    def _expire(self, now: float):
+        """Buang user yang tidak aktif melewati ttl; dipanggil dengan _lock dipegang
+
+        Urutan OrderedDict mengikuti aktivitas terakhir sehingga cukup memeriksa bagian depan.
+        """
+        while self._users:
+            last_active = next(iter(self._users.values()))[0]
+            if now - last_active <= self.ttl:
+                break
+            self._evict('ttl')
+
+    def _evict(self, reason: str):
+        """Buang user paling lama tidak aktif; dipanggil dengan _lock dipegang"""
+        _, (_, _, size) = self._users.popitem(last=False)
+        self._bytes -= size
+        self.evictions[reason] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Ukuran dan counter eviction untuk endpoint metrics"""
+        with self._lock:
+            self._expire(time.time())
+            return {
+                'backend': self.name,
+                'users': len(self._users),
+                'messages': sum(len(entry[1]) for entry in self._users.values()),
+                'bytes': self._bytes,
+                'max_users': self.max_users,
+                'max_bytes': self.max_bytes,
+                'max_messages': self.max_messages,
+                'ttl_seconds': self.ttl,
+                'evictions': dict(self.evictions)
+            }
+
+class SQLiteConversationStore(ConversationStore):
+    """Riwayat percakapan di file SQLite, dipakai bersama oleh beberapa worker dan tetap ada setelah restart
+
+    Mode WAL mengizinkan banyak pembaca bersamaan dengan satu penulis antar proses. Batas
+    max_messages diterapkan saat append; user idle (ttl) dan user di atas max_users dibuang
+    oleh sweep berkala. Batas memori tidak berlaku karena data berada di disk.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path: Optional[str] = None, sweep_interval: Optional[float] = None, **limits):
+        """Inisialisasi SQLiteConversationStore"""
+        super().__init__(**limits)
+        self.path = path or Config.CONVERSATION_DB_PATH
+        self.sweep_interval = sweep_interval or Config.CONVERSATION_SWEEP_INTERVAL
+        self._local = threading.local()
+        self._last_sweep = 0.0
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL, role TEXT NOT NULL, "
+                "content TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS messages_user ON messages (user_id, id)")
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(DISTINCT user_id) FROM messages").fetchone()[0]
+
+    def _connection(self) -> sqlite3.Connection:
+        """Koneksi per thread (objek koneksi sqlite3 tidak boleh dipakai lintas thread)"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, user_id: str) -> List[Dict[str, str]]:
+        """Pesan user dari yang terlama; kosong jika user sudah idle melewati ttl"""
+        rows = self._connection().execute(
+            "SELECT role, content, created_at FROM messages WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+            (user_id, self.max_messages)
+        ).fetchall()
+        if not rows or time.time() - rows[0][2] > self.ttl:
+            return []
+        return [{"role": role, "content": content} for role, content, _ in reversed(rows)]
+
+    def append(self, user_id: str, role: str, content: str):
+        """Tambahkan pesan lalu pangkas pesan user di luar max_messages terakhir"""
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT INTO messages (user_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                (user_id, role, content, now)
+            )
+            connection.execute(
+                "DELETE FROM messages WHERE user_id = ? AND id NOT IN "
+                "(SELECT id FROM messages WHERE user_id = ? ORDER BY id DESC LIMIT ?)",
+                (user_id, user_id, self.max_messages)
+            )
+        if now - self._last_sweep >= self.sweep_interval:
+            self.sweep(now)
+
+    def clear(self, user_id: str):
+        """Hapus riwayat satu user"""
+        with self._connection() as connection:
+            connection.execute("DELETE FROM messages WHERE user_id = ?", (user_id,))
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Buang user idle melewati ttl dan user paling lama tidak aktif di atas max_users"""
+        now = now or time.time()
+        self._last_sweep = now
+        with self._connection() as connection:
+            expired = [row[0] for row in connection.execute(
+                "SELECT user_id FROM messages GROUP BY user_id HAVING MAX(created_at) < ?", (now - self.ttl,)
+            )]
+            connection.executemany("DELETE FROM messages WHERE user_id = ?", [(user_id,) for user_id in expired])
+            overflow = [row[0] for row in connection.execute(
+                "SELECT user_id FROM messages GROUP BY user_id ORDER BY MAX(created_at) DESC LIMIT -1 OFFSET ?",
+                (self.max_users,)
+            )]
+            connection.executemany("DELETE FROM messages WHERE user_id = ?", [(user_id,) for user_id in overflow])
+        with self._lock:
+            self.evictions['ttl'] += len(expired)
+            self.evictions['lru'] += len(overflow)
+        return len(expired) + len(overflow)
+
+    def stats(self) -> Dict[str, Any]:
+        """Ukuran file dan counter eviction untuk endpoint metrics"""
+        users, messages = self._connection().execute(
+            "SELECT COUNT(DISTINCT user_id), COUNT(*) FROM messages"
+        ).fetchone()
+        return {
+            'backend': self.name,
+            'path': self.path,
+            'users': users,
+            'messages': messages,
+            'bytes': os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            'max_users': self.max_users,
+            'max_messages': self.max_messages,
+            'ttl_seconds': self.ttl,
+            'evictions': dict(self.evictions)
+        }
+
+CONVERSATION_STORES = {
+    ConversationStore.name: ConversationStore,
+    SQLiteConversationStore.name: SQLiteConversationStore
+}
+
+def build_conversation_store(backend: Optional[str] = None, **params) -> ConversationStore:
+    """Bangun conversation store sesuai backend (memory | sqlite); backend tidak dikenal memakai memory"""
+    from utils.logger import ai_logger
+
+    backend = backend or Config.CONVERSATION_STORE
+    if backend not in CONVERSATION_STORES:
+        ai_logger.logger.warning(f"Unknown conversation store '{backend}', using memory")
+        backend = ConversationStore.name
+    try:
+        return CONVERSATION_STORES[backend](**params)
+    except (sqlite3.Error, OSError) as e:
+        ai_logger.log_error("ConversationStore", f"Failed to open {backend} store, using memory: {str(e)}")
+        return ConversationStore()
@@ -0,0 +1,198 @@
+import math
+import time
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from scipy import sparse
+from typing import Any, Dict, List, Optional
+from config.settings import Config
+from .book_index import normalize_book_id
+from .catalog_loader import CatalogLoader
+from .user_item_matrix import UserItemMatrix
+
+# Sumber event implicit: koleksi -> (field waktu, field tipe event, tipe default)
+IMPLICIT_SOURCES = {
+    'user_interactions': ('timestamp', ('interaction_type', 'type'), 'view'),
+    'borrowings': ('borrow_date', (), 'borrow')
+}
+
+def _epoch_seconds(value: Any) -> Optional[float]:
+    """Timestamp event sebagai detik epoch, None jika tidak ada/tidak valid"""
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if value is None:
+        return None
+    try:
+        return pd.Timestamp(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+class _PairAccumulator:
+    """Penjumlah bobot (user, buku) yang di-flush ke CSR per chunk agar memori sebanding pasangan unik"""
+
+    def __init__(self, chunk_size: int):
+        self.chunk_size = chunk_size
+        self.rows: List[int] = []
+        self.cols: List[int] = []
+        self.weights: List[float] = []
+        self.total = sparse.csr_matrix((0, 0))
+
+    def add(self, row: int, col: int, weight: float, shape):
+        self.rows.append(row)
+        self.cols.append(col)
+        self.weights.append(weight)
+        if len(self.rows) >= self.chunk_size:
+            self.flush(shape)
+
+    def flush(self, shape) -> sparse.csr_matrix:
+        # Duplikat pada COO dijumlahkan saat konversi ke CSR
+        chunk = sparse.csr_matrix((self.weights, (self.rows, self.cols)), shape=shape, dtype=np.float64)
+        total = self.total
+        total.resize(shape)
+        self.total = total + chunk
+        self.rows, self.cols, self.weights = [], [], []
+        return self.total
+
+class ImplicitFeedbackBuilder:
+    """Agregasi streaming event implicit (interaksi, peminjaman) menjadi matrix user x buku
+
+    Setiap event bernilai bobot tipe event x faktor durasi x peluruhan waktu (half-life).
+    Peluruhan diukur terhadap event terbaru (bukan jam sistem) sehingga hasil deterministik
+    untuk data yang sama; dihitung dalam satu pass dengan akumulasi exp(lambda * (t - t0)).
+    """
+
+    def __init__(self, db, event_weights: Optional[Dict[str, float]] = None,
+                 half_life_days: Optional[float] = None, duration_scale: Optional[float] = None,
+                 loader: Optional[CatalogLoader] = None, chunk_size: int = 100000):
+        """Inisialisasi ImplicitFeedbackBuilder"""
+        self.db = db
+        self.event_weights = event_weights or Config.IMPLICIT_EVENT_WEIGHTS
+        self.half_life_days = half_life_days or Config.IMPLICIT_HALF_LIFE_DAYS
+        self.duration_scale = duration_scale or Config.IMPLICIT_DURATION_SCALE
+        self.loader = loader or CatalogLoader(db)
+        self.chunk_size = chunk_size
+        self.events = 0
+        self.skipped = 0
+
+    def _event_weight(self, document: Any, type_fields, default_type: str) -> float:
+        """Bobot satu event dari tipe dan durasinya (detik)"""
+        event_type = default_type
+        for field in type_fields:
+            if document.get(field):
+                event_type = str(document.get(field)).lower()
+                break
+        weight = self.event_weights.get(event_type, Config.IMPLICIT_DEFAULT_WEIGHT)
+        duration = document.get('duration')
+        if isinstance(duration, (int, float)) and duration > 0:
+            weight *= 1.0 + math.log1p(duration / self.duration_scale)
+        return weight
+
+    def build(self) -> Optional[UserItemMatrix]:
+        """Stream semua sumber lalu kembalikan matrix kekuatan sinyal (None jika tidak ada event)"""
+        from utils.logger import ai_logger
+
+        start_time = time.time()
+        decay = math.log(2) / (self.half_life_days * 86400)
+        user_codes: Dict[str, int] = {}
+        book_codes: Dict[str, int] = {}
+        timed = _PairAccumulator(self.chunk_size)
+        untimed = _PairAccumulator(self.chunk_size)
+        anchor, latest = None, None
+
+        for collection_name, (time_field, type_fields, default_type) in IMPLICIT_SOURCES.items():
+            fields = ['user_id', 'book_id', 'books_id', time_field, 'duration', *type_fields]
+            for document in self.loader.stream(collection_name, fields):
+                # Koleksi lama memakai books_id, user_id bisa string atau ObjectId
+                user_id = normalize_book_id(document.get('user_id'))
+                book_id = normalize_book_id(document.get('book_id') or document.get('books_id'))
+                if not user_id or not book_id:
+                    self.skipped += 1
+                    continue
+
+                row = user_codes.setdefault(user_id, len(user_codes))
+                col = book_codes.setdefault(book_id, len(book_codes))
+                weight = self._event_weight(document, type_fields, default_type)
+                shape = (len(user_codes), len(book_codes))
+                self.events += 1
+
+                timestamp = _epoch_seconds(document.get(time_field))
+                if timestamp is None:
+                    untimed.add(row, col, weight, shape)
+                    continue
+                if anchor is None:
+                    anchor = timestamp
+                latest = timestamp if latest is None else max(latest, timestamp)
+                timed.add(row, col, weight * math.exp(decay * (timestamp - anchor)), shape)
+
+        if not user_codes:
+            ai_logger.logger.info("No implicit feedback events found")
+            return None
+
+        shape = (len(user_codes), len(book_codes))
+        strengths = untimed.flush(shape)
+        if anchor is not None:
+            # Geser referensi peluruhan dari event pertama ke event terbaru
+            strengths = strengths + timed.flush(shape) * math.exp(-decay * (latest - anchor))
+        strengths = strengths.tocsr()
+        strengths.eliminate_zeros()
+        strengths.sort_indices()
+
+        feedback = UserItemMatrix(
+            strengths,
+            np.asarray(list(user_codes), dtype=object),
+            np.asarray(list(book_codes), dtype=object)
+        )
+        ai_logger.log_performance(
+            "ImplicitFeedback",
+            f"aggregate {self.events} events into {feedback.nnz} pairs ({self.skipped} skipped)",
+            time.time() - start_time
+        )
+        return feedback
+
+def build_implicit_feedback(db, loader: Optional[CatalogLoader] = None) -> Optional[UserItemMatrix]:
+    """Matrix kekuatan sinyal implicit dari user_interactions dan borrowings jika diaktifkan"""
+    from utils.logger import ai_logger
+
+    if not Config.IMPLICIT_FEEDBACK_ENABLED or db is None:
+        return None
+    try:
+        return ImplicitFeedbackBuilder(db, loader=loader).build()
+    except Exception as e:
+        ai_logger.log_error("ImplicitFeedback", str(e))
+        return None
+
+def implicit_confidence(strengths: np.ndarray) -> np.ndarray:
+    """Konfidensi dari kekuatan sinyal dengan skala log (efek event berulang makin kecil)"""
+    return np.log1p(strengths)
+
+def implicit_cells(implicit: UserItemMatrix) -> pd.DataFrame:
+    """Sel (user_id, book_id, strength) dari matrix implicit"""
+    coo = implicit.matrix.tocoo()
+    return pd.DataFrame({
+        'user_id': implicit.user_ids[coo.row],
+        'book_id': implicit.book_ids[coo.col],
+        'strength': coo.data
+    })
+
+def with_implicit_feedback(user_item_matrix: UserItemMatrix, implicit: Optional[UserItemMatrix],
+                           pseudo_rating: Optional[float] = None) -> UserItemMatrix:
+    """User-item matrix ditambah pasangan implicit yang belum dirating sebagai pseudo-rating
+
+    Hanya buku yang sudah ada di axis user_item_matrix yang dipakai sehingga kolom tetap sejajar;
+    user yang hanya punya sinyal implicit ditambahkan sebagai baris baru.
+    """
+    if implicit is None or implicit.empty:
+        return user_item_matrix
+    pseudo_rating = Config.IMPLICIT_PSEUDO_RATING if pseudo_rating is None else pseudo_rating
+
+    cells = implicit_cells(implicit)
+    cols = pd.Index(user_item_matrix.book_ids).get_indexer(cells['book_id'])
+    rows = pd.Index(user_item_matrix.user_ids).get_indexer(cells['user_id'])
+    rated = np.zeros(len(cells), dtype=bool)
+    known = (rows >= 0) & (cols >= 0)
+    if known.any():
+        rated[known] = np.asarray(user_item_matrix.matrix[rows[known], cols[known]]).ravel() != 0
+    cells = cells[(cols >= 0) & ~rated]
+    if cells.empty:
+        return user_item_matrix
+    return user_item_matrix.with_updates(cells.assign(rating_value=pseudo_rating))
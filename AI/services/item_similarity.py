@@ -0,0 +1,171 @@
+import time
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+from typing import Optional
+from config.settings import Config
+from .neighbor_table import _block_rows
+from .user_item_matrix import UserItemMatrix
+
+class ItemSimilarity:
+    """Similarity item-item sparse (CSR books x books) dengan paling banyak K tetangga per buku
+
+    Baris/kolom mengikuti UserItemMatrix.book_ids yang dipakai saat build; nilai adalah
+    cosine antar kolom rating (hanya pasangan yang dirating bersama).
+    """
+
+    def __init__(self, matrix: sparse.csr_matrix, k: int):
+        """Inisialisasi ItemSimilarity"""
+        self.matrix = matrix
+        self.k = k
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    @property
+    def nnz(self) -> int:
+        return self.matrix.nnz
+
+    def predict(self, cols: np.ndarray, ratings: np.ndarray) -> np.ndarray:
+        """Prediksi rating semua buku dari buku yang sudah dirating user
+
+        Prediksi = rata-rata rating user berbobot similarity; buku tanpa tetangga di antara
+        buku yang dirating user bernilai -inf (tidak ada dasar prediksi).
+        """
+        neighbors = self.matrix[cols]
+        weights = np.asarray(neighbors.sum(axis=0)).ravel()
+        weighted = np.asarray(neighbors.T @ ratings).ravel()
+        predicted = np.full(len(self), -np.inf)
+        supported = weights > 0
+        predicted[supported] = weighted[supported] / weights[supported]
+        return predicted
+
+def _item_vectors(user_item_matrix: UserItemMatrix):
+    """Vektor rating per buku (dinormalisasi L2) dan indikator rating untuk menghitung co-rating"""
+    # Baris = buku, dinormalisasi L2 sehingga perkalian baris = cosine antar buku
+    items = user_item_matrix.matrix.T.tocsr()
+    normalized = normalize(items.astype(np.float32))
+    rated = items.copy()
+    rated.data = np.ones_like(rated.data, dtype=np.float32)
+    return normalized, normalized.T.tocsr(), rated, rated.T.tocsr()
+
+def _similarity_rows(normalized, normalized_t, rated, rated_t, row_ids: np.ndarray, k: int,
+                     min_co_ratings: int, block_rows: int):
+    """(baris, kolom, nilai) top-k similarity positif untuk buku row_ids"""
+    rows, cols = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+    values = [np.empty(0, dtype=np.float32)]
+
+    for start in range(0, len(row_ids), block_rows):
+        block = row_ids[start:start + block_rows]
+        similarities = (normalized[block] @ normalized_t).tocoo()
+        if min_co_ratings > 1:
+            co_ratings = (rated[block] @ rated_t).tocsr()
+            counts = np.asarray(co_ratings[similarities.row, similarities.col]).ravel()
+        else:
+            counts = np.full(similarities.nnz, min_co_ratings)
+        block_row = block[similarities.row].astype(np.int64)
+        keep = (block_row != similarities.col) & (similarities.data > 0) & (counts >= min_co_ratings)
+        block_row, block_col, data = block_row[keep], similarities.col[keep], similarities.data[keep]
+
+        # Urutkan per buku dengan similarity menurun, ambil K pertama setiap buku
+        order = np.lexsort((-data, block_row))
+        block_row, block_col, data = block_row[order], block_col[order], data[order]
+        first = np.searchsorted(block_row, block_row, side='left')
+        top = np.arange(len(block_row)) - first < k
+        rows.append(block_row[top])
+        cols.append(block_col[top].astype(np.int64))
+        values.append(data[top])
+
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(values)
+
+def build_item_similarity(user_item_matrix: UserItemMatrix, k: Optional[int] = None,
+                          min_co_ratings: Optional[int] = None,
+                          block_memory_mb: Optional[float] = None) -> Optional[ItemSimilarity]:
+    """Hitung similarity item-item dari co-rating dengan perkalian sparse per blok buku
+
+    Pasangan yang dirating bersama oleh kurang dari min_co_ratings user dibuang, lalu
+    setiap buku hanya menyimpan K tetangga dengan similarity positif tertinggi.
+    """
+    from utils.logger import ai_logger
+
+    if user_item_matrix.empty:
+        return None
+
+    start_time = time.time()
+    k = k or Config.ITEM_CF_NEIGHBORS
+    min_co_ratings = min_co_ratings or Config.ITEM_CF_MIN_CO_RATINGS
+    block_memory_mb = block_memory_mb or Config.CONTENT_NEIGHBORS_BLOCK_MB
+
+    normalized, normalized_t, rated, rated_t = _item_vectors(user_item_matrix)
+    n_books = normalized.shape[0]
+    rows, cols, values = _similarity_rows(
+        normalized, normalized_t, rated, rated_t, np.arange(n_books), k, min_co_ratings,
+        _block_rows(n_books, block_memory_mb)
+    )
+    matrix = sparse.csr_matrix((values, (rows, cols)), shape=(n_books, n_books), dtype=np.float32)
+    matrix.sort_indices()
+
+    ai_logger.log_performance(
+        "ItemSimilarity", f"build top-{k} for {n_books} books ({matrix.nnz} pairs)", time.time() - start_time
+    )
+    return ItemSimilarity(matrix, k)
+
+def update_item_similarity(similarity: ItemSimilarity, user_item_matrix: UserItemMatrix,
+                           changed_cols: np.ndarray, min_co_ratings: Optional[int] = None,
+                           block_memory_mb: Optional[float] = None) -> Optional[ItemSimilarity]:
+    """Perbarui similarity hanya untuk buku yang kolom ratingnya berubah
+
+    Cosine pasangan (i, j) hanya bergeser jika i atau j termasuk changed_cols. Yang dihitung ulang
+    hanya baris buku itu (dan buku baru di akhir axis), baris yang menyimpan buku itu sebagai
+    tetangga, dan baris yang top-K-nya kini dimasuki buku itu; baris lain disalin.
+    """
+    from utils.logger import ai_logger
+
+    k = Config.ITEM_CF_NEIGHBORS
+    if similarity is None or similarity.k != k or user_item_matrix.empty:
+        return build_item_similarity(user_item_matrix, min_co_ratings=min_co_ratings,
+                                     block_memory_mb=block_memory_mb)
+
+    start_time = time.time()
+    min_co_ratings = min_co_ratings or Config.ITEM_CF_MIN_CO_RATINGS
+    block_memory_mb = block_memory_mb or Config.CONTENT_NEIGHBORS_BLOCK_MB
+
+    normalized, normalized_t, rated, rated_t = _item_vectors(user_item_matrix)
+    n_books = normalized.shape[0]
+    n_previous = len(similarity)
+    block_rows = _block_rows(n_books, block_memory_mb)
+    changed_cols = np.union1d(np.asarray(changed_cols, dtype=np.int64), np.arange(n_previous, n_books))
+    previous = similarity.matrix
+
+    # Baris yang menyimpan buku yang berubah sebagai tetangga
+    stale = np.unique(previous.tocsc()[:, changed_cols[changed_cols < n_previous]].indices)
+    # Baris yang top-K-nya dimasuki buku yang berubah: similarity baru melewati nilai terkecil
+    # yang disimpan (atau baris masih punya slot kosong). Similarity dan co-rating simetris.
+    counts = np.diff(previous.indptr)
+    threshold = np.zeros(n_previous, dtype=np.float32)
+    nonempty = counts > 0
+    if nonempty.any():
+        threshold[nonempty] = np.minimum.reduceat(previous.data, previous.indptr[:-1][nonempty])
+    threshold[counts < k] = 0
+    _, target, data = _similarity_rows(
+        normalized, normalized_t, rated, rated_t, changed_cols, n_books, min_co_ratings, block_rows
+    )
+    entering = target[(target < n_previous) & (data > threshold[np.minimum(target, n_previous - 1)])]
+    affected = np.union1d(np.union1d(changed_cols, stale), entering)
+
+    kept = previous.tocoo()
+    keep = ~np.isin(kept.row, affected)
+    rows, cols, values = _similarity_rows(
+        normalized, normalized_t, rated, rated_t, affected, k, min_co_ratings, block_rows
+    )
+    matrix = sparse.csr_matrix(
+        (np.concatenate([kept.data[keep], values]),
+         (np.concatenate([kept.row[keep], rows]), np.concatenate([kept.col[keep], cols]))),
+        shape=(n_books, n_books), dtype=np.float32
+    )
+    matrix.sort_indices()
+
+    ai_logger.log_performance(
+        "ItemSimilarity", f"update top-{k} for {len(affected)} of {n_books} books", time.time() - start_time
+    )
+    return ItemSimilarity(matrix, k)
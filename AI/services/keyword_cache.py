@@ -0,0 +1,186 @@
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+from config.settings import Config
+
+def normalize_preference_text(text: str) -> str:
+    """Bentuk kanonik teks preferensi: NFKC, huruf kecil, spasi tunggal, tanpa tanda baca di tepi"""
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip(' \t\n.,;:!?')
+
+class _Flight:
+    """Satu panggilan upstream yang sedang berjalan; request identik menunggu hasilnya"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[List[str]] = None
+        self.error: Optional[BaseException] = None
+
+class KeywordCache:
+    """Cache hasil ekstraksi kata kunci (LRU di memori, dipersist ke disk sebagai JSONL)
+
+    Key adalah teks preferensi yang sudah dinormalisasi. Entri baru ditambahkan ke file
+    (append-only) sehingga restart tetap warm; file dipadatkan saat load jika sudah jauh lebih
+    besar dari kapasitas. Request identik yang datang bersamaan digabung (single-flight):
+    hanya satu yang memanggil upstream, sisanya menunggu hasil yang sama.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None,
+                 namespace: str = 'default', enabled: Optional[bool] = None):
+        """Inisialisasi KeywordCache; namespace (mis. nama model) memisahkan entri yang tidak kompatibel"""
+        self.path = path if path is not None else Config.KEYWORD_CACHE_PATH
+        self.max_entries = max_entries or Config.KEYWORD_CACHE_SIZE
+        self.namespace = namespace
+        self.enabled = Config.KEYWORD_CACHE_ENABLED if enabled is None else enabled
+        self._entries: OrderedDict = OrderedDict()
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.upstream_calls = 0
+        self.upstream_errors = 0
+        self.upstream_seconds = 0.0
+        if self.enabled:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_compute(self, text: str, compute: Callable[[str], List[str]]) -> List[str]:
+        """Kata kunci untuk text dari cache, atau dari compute(text) yang dipanggil sekali per key"""
+        if not self.enabled:
+            return compute(text)
+
+        key = normalize_preference_text(text)
+        with self._lock:
+            keywords = self._entries.get(key)
+            if keywords is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(keywords)
+            self.misses += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return list(flight.result)
+
+        start_time = time.time()
+        try:
+            keywords = list(compute(text))
+            flight.result = keywords
+        except BaseException as e:
+            # Kegagalan tidak di-cache; request berikutnya mencoba upstream lagi
+            flight.error = e
+            with self._lock:
+                self.upstream_errors += 1
+            raise
+        finally:
+            with self._lock:
+                self.upstream_calls += 1
+                self.upstream_seconds += time.time() - start_time
+                self._flights.pop(key, None)
+                if flight.error is None and keywords:
+                    self._put(key, keywords)
+            flight.done.set()
+
+        if keywords:
+            self._append(key, keywords)
+        return list(keywords)
+
+    def _put(self, key: str, keywords: List[str]):
+        """Simpan entri ke LRU; dipanggil dengan _lock dipegang"""
+        self._entries[key] = keywords
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self):
+        """Muat entri dari file; baris rusak atau namespace lain diabaikan"""
+        from utils.logger import ai_logger
+
+        if not self.path or not os.path.exists(self.path):
+            return
+        lines = 0
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record.get('namespace') == self.namespace and isinstance(record.get('keywords'), list):
+                        self._put(record['key'], record['keywords'])
+        except OSError as e:
+            ai_logger.log_error("KeywordCache", f"Failed to load {self.path}: {str(e)}")
+            return
+
+        ai_logger.logger.info(f"Keyword cache loaded {len(self._entries)} entries from {self.path}")
+        if lines > 2 * self.max_entries:
+            self._compact()
+
+    def _append(self, key: str, keywords: List[str]):
+        """Tambahkan satu entri ke file persist"""
+        from utils.logger import ai_logger
+
+        if not self.path:
+            return
+        record = json.dumps({'namespace': self.namespace, 'key': key, 'keywords': keywords}, ensure_ascii=False)
+        try:
+            with self._file_lock:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(record + '\n')
+        except OSError as e:
+            ai_logger.log_error("KeywordCache", f"Failed to persist entry: {str(e)}")
+
+    def _compact(self):
+        """Tulis ulang file hanya dengan entri LRU saat ini (atomik lewat file sementara)"""
+        from utils.logger import ai_logger
+
+        with self._lock:
+            records = [
+                {'namespace': self.namespace, 'key': key, 'keywords': keywords}
+                for key, keywords in self._entries.items()
+            ]
+        try:
+            with self._file_lock:
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    for record in records:
+                        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                os.replace(tmp_path, self.path)
+        except OSError as e:
+            ai_logger.log_error("KeywordCache", f"Failed to compact {self.path}: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Counter cache dan panggilan upstream untuk endpoint metrics"""
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'coalesced': self.coalesced,
+            'upstream_calls': self.upstream_calls,
+            'upstream_errors': self.upstream_errors,
+            'upstream_avg_seconds': round(self.upstream_seconds / self.upstream_calls, 4) if self.upstream_calls else None
+        }
@@ -0,0 +1,374 @@
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from config.settings import Config
+
+class CircuitOpenError(RuntimeError):
+    """Panggilan ditolak tanpa menghubungi provider karena circuit breaker sedang terbuka"""
+
+class CircuitBreaker:
+    """Circuit breaker per provider: closed -> open setelah failure_threshold kegagalan berturut-turut
+
+    Selama open semua panggilan langsung ditolak. Setelah reset_timeout detik satu panggilan
+    percobaan diizinkan (half_open); berhasil menutup kembali breaker, gagal membukanya lagi.
+    """
+
+    def __init__(self, failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None):
+        """Inisialisasi CircuitBreaker"""
+        self.failure_threshold = failure_threshold or Config.LLM_BREAKER_FAILURES
+        self.reset_timeout = reset_timeout or Config.LLM_BREAKER_RESET
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """True jika panggilan boleh diteruskan ke provider"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.time() - self._opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.consecutive_failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probing = False
+            if self.state == 'half_open' or self.consecutive_failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.opened += 1
+                self.state = 'open'
+                self._opened_at = time.time()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'opened': self.opened,
+            'failure_threshold': self.failure_threshold,
+            'reset_timeout_seconds': self.reset_timeout
+        }
+
+class LLMProvider:
+    """Antarmuka chat completion yang dipakai chat dan ekstraksi kata kunci
+
+    Subclass mengimplementasikan _complete (teks lengkap) dan _stream (iterator potongan teks).
+    Kelas dasar menambahkan retry dengan exponential backoff + full jitter untuk error sementara,
+    circuit breaker dan counter untuk endpoint metrics. Pada streaming, retry hanya berlaku sampai
+    potongan pertama diterima; error setelahnya diteruskan ke pemanggil.
+    """
+
+    name = 'base'
+
+    def __init__(self, model: Optional[str] = None, timeout: Optional[float] = None,
+                 max_retries: Optional[int] = None, retry_backoff: Optional[float] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        """Inisialisasi LLMProvider"""
+        self.model = model or Config.OPENAI_MODEL
+        self.timeout = timeout or Config.LLM_TIMEOUT
+        self.max_retries = Config.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.retry_backoff = Config.LLM_RETRY_BACKOFF if retry_backoff is None else retry_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """True jika provider siap dipakai (mis. API key tersedia)"""
+        return True
+
+    def cache_namespace(self, model: Optional[str] = None) -> str:
+        """Namespace cache untuk hasil model ini sehingga hasil provider lain tidak tercampur"""
+        return f"{self.name}:{model or self.model}"
+
+    def complete(self, messages: List[Dict[str, str]], model: Optional[str] = None, **params) -> str:
+        """Teks respons lengkap untuk messages"""
+        return self._call(lambda: self._complete(messages, model or self.model, **params))
+
+    def stream(self, messages: List[Dict[str, str]], model: Optional[str] = None, **params) -> Iterator[str]:
+        """Iterator potongan teks respons, segera setelah diterima dari provider"""
+        def open_stream():
+            chunks = iter(self._stream(messages, model or self.model, **params))
+            return chunks, next(chunks, None)
+
+        chunks, first = self._call(open_stream)
+        if first is None:
+            return
+        yield first
+        try:
+            yield from chunks
+        except Exception:
+            self.breaker.record_failure()
+            with self._lock:
+                self.failures += 1
+            raise
+
+    def _call(self, request: Callable[[], Any]) -> Any:
+        """Jalankan request dengan circuit breaker dan retry untuk error sementara"""
+        from utils.logger import ai_logger
+
+        if not self.breaker.allow():
+            with self._lock:
+                self.rejected += 1
+            raise CircuitOpenError(f"LLM provider '{self.name}' circuit open, request rejected")
+
+        start_time = time.time()
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    result = request()
+                except Exception as e:
+                    if attempt >= self.max_retries or not self._is_retryable(e):
+                        self.breaker.record_failure()
+                        with self._lock:
+                            self.failures += 1
+                        raise
+                    delay = random.uniform(0, self.retry_backoff * 2 ** attempt)
+                    ai_logger.logger.warning(f"LLM provider '{self.name}' attempt {attempt + 1} failed ({type(e).__name__}), retrying in {delay:.2f}s")
+                    with self._lock:
+                        self.retries += 1
+                    time.sleep(delay)
+                    continue
+                self.breaker.record_success()
+                return result
+        finally:
+            with self._lock:
+                self.calls += 1
+                self.seconds += time.time() - start_time
+
+    def _is_retryable(self, error: Exception) -> bool:
+        """Error sementara yang layak dicoba ulang"""
+        return isinstance(error, (TimeoutError, ConnectionError))
+
+    def _complete(self, messages: List[Dict[str, str]], model: str, **params) -> str:
+        raise NotImplementedError
+
+    def _stream(self, messages: List[Dict[str, str]], model: str, **params) -> Iterator[str]:
+        raise NotImplementedError
+
+    def status(self) -> Dict[str, Any]:
+        """Counter panggilan dan status breaker untuk endpoint metrics"""
+        with self._lock:
+            return {
+                'provider': self.name,
+                'model': self.model,
+                'available': self.available(),
+                'calls': self.calls,
+                'retries': self.retries,
+                'failures': self.failures,
+                'rejected': self.rejected,
+                'avg_seconds': round(self.seconds / self.calls, 4) if self.calls else None,
+                'timeout_seconds': self.timeout,
+                'max_retries': self.max_retries,
+                'circuit_breaker': self.breaker.status()
+            }
+
+class OpenAIProvider(LLMProvider):
+    """Provider OpenAI ChatCompletion dengan satu pool koneksi HTTP bersama antar thread
+
+    Library openai membuat satu session per thread secara default; di sini satu requests.Session
+    dengan pool pool_size koneksi dipasang sebagai openai.requestssession sehingga koneksi keep-alive
+    dipakai ulang oleh semua thread worker. Retry bawaan adapter dimatikan karena retry ditangani
+    kelas dasar.
+    """
+
+    name = 'openai'
+
+    def __init__(self, api_key: Optional[str] = None, pool_size: Optional[int] = None, **options):
+        """Inisialisasi OpenAIProvider"""
+        import openai
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        super().__init__(**options)
+        self._openai = openai
+        self.api_key = api_key or Config.OPENAI_API_KEY
+        self.pool_size = pool_size or Config.LLM_POOL_SIZE
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=0)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        openai.requestssession = session
+        self.session = session
+
+    def available(self) -> bool:
+        return bool(self.api_key)
+
+    def cache_namespace(self, model: Optional[str] = None) -> str:
+        # Tetap nama model saja agar cache kata kunci yang sudah dipersist tetap terpakai
+        return model or self.model
+
+    def _is_retryable(self, error: Exception) -> bool:
+        errors = self._openai.error
+        if isinstance(error, (errors.Timeout, errors.APIConnectionError, errors.RateLimitError,
+                              errors.ServiceUnavailableError, errors.TryAgain)):
+            return True
+        if isinstance(error, errors.APIError):
+            return error.http_status is None or error.http_status >= 500
+        return super()._is_retryable(error)
+
+    def _complete(self, messages: List[Dict[str, str]], model: str, **params) -> str:
+        response = self._openai.ChatCompletion.create(
+            model=model, messages=messages, api_key=self.api_key, request_timeout=self.timeout, **params
+        )
+        return response.choices[0].message.content
+
+    def _stream(self, messages: List[Dict[str, str]], model: str, **params) -> Iterator[str]:
+        response = self._openai.ChatCompletion.create(
+            model=model, messages=messages, api_key=self.api_key, request_timeout=self.timeout,
+            stream=True, **params
+        )
+        for chunk in response:
+            text = chunk.choices[0].delta.get('content')
+            if text:
+                yield text
+
+# Respons chat stub; dipilih dari hash prompt sehingga prompt yang sama selalu mendapat teks yang sama
+STUB_RESPONSES = [
+    "Terima kasih atas pertanyaan Anda tentang {topic}. Berdasarkan preferensi dan histori pembacaan Anda, "
+    "buku dengan tema tersebut yang memiliki cerita menarik dan penulis yang kuat akan cocok untuk Anda. "
+    "Ada yang ingin Anda tanyakan lebih lanjut?",
+    "Pilihan yang bagus! Untuk {topic}, saya sarankan mencari buku dari genre yang sudah Anda suka "
+    "karena ceritanya akan lebih mudah dinikmati. Apakah ada penulis tertentu yang ingin Anda jelajahi?",
+    "Tentang {topic}: banyak pembaca yang suka genre ini juga menikmati novel dengan alur yang kuat "
+    "dan karakter yang berkembang. Jika Anda mau, saya dapat memberikan rekomendasi yang lebih spesifik. "
+    "Ada hal lain yang ingin Anda tanyakan?",
+]
+
+_STUB_WORD_PATTERN = re.compile(r'\w{4,}')
+_STUB_TOKEN_PATTERN = re.compile(r'\S+\s*')
+
+class StubLLMProvider(LLMProvider):
+    """Provider lokal deterministik untuk tes throughput dan benchmark tanpa jaringan
+
+    Teks respons hanya bergantung pada isi messages: prompt ekstraksi kata kunci (menyebut
+    'kata kunci') dijawab dengan kata dari teks preferensi, selain itu salah satu template
+    STUB_RESPONSES berbahasa Indonesia. Waktu respons meniru API: latency sebelum token pertama
+    berdistribusi lognormal (median latency_ms, sigma latency_sigma) dan kecepatan token per request
+    juga lognormal (median tokens_per_second, sigma token_rate_sigma). Jika latency melewati timeout
+    provider, panggilan gagal dengan TimeoutError sehingga retry dan circuit breaker ikut teruji.
+    seed membuat urutan sampel latency dapat diulang.
+    """
+
+    name = 'stub'
+
+    def __init__(self, latency_ms: Optional[float] = None, latency_sigma: Optional[float] = None,
+                 tokens_per_second: Optional[float] = None, token_rate_sigma: Optional[float] = None,
+                 seed: Optional[int] = None, **options):
+        """Inisialisasi StubLLMProvider"""
+        super().__init__(**options)
+        self.latency_ms = Config.LLM_STUB_LATENCY_MS if latency_ms is None else latency_ms
+        self.latency_sigma = Config.LLM_STUB_LATENCY_SIGMA if latency_sigma is None else latency_sigma
+        self.tokens_per_second = tokens_per_second or Config.LLM_STUB_TOKENS_PER_SECOND
+        self.token_rate_sigma = Config.LLM_STUB_TOKEN_RATE_SIGMA if token_rate_sigma is None else token_rate_sigma
+        self.seed = Config.LLM_STUB_SEED if seed is None else seed
+        self._random = random.Random(self.seed)
+        self._random_lock = threading.Lock()
+
+    def _sample_timing(self):
+        """(latency detik sebelum token pertama, jeda detik antar token) untuk satu request"""
+        with self._random_lock:
+            latency = self.latency_ms / 1000.0 * math.exp(self._random.gauss(0.0, self.latency_sigma))
+            rate = self.tokens_per_second * math.exp(self._random.gauss(0.0, self.token_rate_sigma))
+        return latency, 1.0 / rate
+
+    def _response_text(self, messages: List[Dict[str, str]], model: str) -> str:
+        """Teks deterministik dari isi messages"""
+        prompt = '\n'.join(message.get('content', '') for message in messages)
+        user_messages = [message.get('content', '') for message in messages if message.get('role') == 'user']
+        last_user = user_messages[-1] if user_messages else prompt
+        # Kata dari bagian setelah titik dua terakhir (teks preferensi pada prompt kata kunci)
+        words = list(dict.fromkeys(word.lower() for word in _STUB_WORD_PATTERN.findall(last_user.rsplit(':', 1)[-1])))
+
+        if 'kata kunci' in prompt.lower():
+            keywords = (words + ['fiksi', 'petualangan', 'misteri', 'sejarah', 'inspiratif'])[:5]
+            return '\n'.join(keywords)
+
+        digest = int(hashlib.sha256(json.dumps([model, messages], sort_keys=True).encode('utf-8')).hexdigest(), 16)
+        topic = ' '.join(words[:4]) or 'buku'
+        return STUB_RESPONSES[digest % len(STUB_RESPONSES)].format(topic=topic)
+
+    def _tokens(self, messages: List[Dict[str, str]], model: str, max_tokens: Optional[int]) -> List[str]:
+        tokens = _STUB_TOKEN_PATTERN.findall(self._response_text(messages, model))
+        return tokens[:max_tokens] if max_tokens else tokens
+
+    def _wait_first_token(self, latency: float):
+        """Tunggu latency; jika melewati timeout, tunggu timeout lalu gagal seperti request sungguhan"""
+        if latency > self.timeout:
+            time.sleep(self.timeout)
+            raise TimeoutError(f"Stub LLM latency {latency:.2f}s exceeded timeout {self.timeout}s")
+        time.sleep(latency)
+
+    def _complete(self, messages: List[Dict[str, str]], model: str, max_tokens: Optional[int] = None, **params) -> str:
+        latency, interval = self._sample_timing()
+        tokens = self._tokens(messages, model, max_tokens)
+        self._wait_first_token(latency)
+        time.sleep(interval * max(len(tokens) - 1, 0))
+        return ''.join(tokens)
+
+    def _stream(self, messages: List[Dict[str, str]], model: str, max_tokens: Optional[int] = None, **params) -> Iterator[str]:
+        latency, interval = self._sample_timing()
+        tokens = self._tokens(messages, model, max_tokens)
+        self._wait_first_token(latency)
+        for position, token in enumerate(tokens):
+            if position:
+                time.sleep(interval)
+            yield token
+
+    def status(self) -> Dict[str, Any]:
+        status = super().status()
+        status['stub'] = {
+            'latency_ms': self.latency_ms,
+            'latency_sigma': self.latency_sigma,
+            'tokens_per_second': self.tokens_per_second,
+            'token_rate_sigma': self.token_rate_sigma,
+            'seed': self.seed
+        }
+        return status
+
+LLM_PROVIDERS = {
+    OpenAIProvider.name: OpenAIProvider,
+    StubLLMProvider.name: StubLLMProvider
+}
+
+def build_llm_provider(name: Optional[str] = None, **params) -> LLMProvider:
+    """Bangun provider sesuai nama (openai | stub); nama tidak dikenal memakai openai"""
+    from utils.logger import ai_logger
+
+    name = name or Config.LLM_PROVIDER
+    if name not in LLM_PROVIDERS:
+        ai_logger.logger.warning(f"Unknown LLM provider '{name}', using openai")
+        name = OpenAIProvider.name
+    return LLM_PROVIDERS[name](**params)
+
+_default_provider: Optional[LLMProvider] = None
+_default_provider_lock = threading.Lock()
+
+def get_llm_provider() -> LLMProvider:
+    """Mendapatkan LLMProvider bersama untuk proses ini (satu pool koneksi dan satu breaker)"""
+    global _default_provider
+    if _default_provider is None:
+        with _default_provider_lock:
+            if _default_provider is None:
+                _default_provider = build_llm_provider()
+    return _default_provider
@@ -0,0 +1,306 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from typing import Any, Callable, Dict, List, Optional
+from config.settings import Config
+from .als_model import AlsModel
+from .item_similarity import ItemSimilarity
+from .neighbor_table import NeighborTable
+from .user_item_matrix import UserItemMatrix
+
+# Naikkan setiap kali layout file artefak berubah
+ARTIFACT_FORMAT_VERSION = 6
+
+def catalog_fingerprint(books_df: pd.DataFrame, ratings_df: pd.DataFrame,
+                        implicit: Optional[UserItemMatrix] = None) -> str:
+    """Sidik jari katalog: berubah hanya jika konten buku, ratings atau sinyal implicit berubah"""
+    digest = hashlib.sha1(f"v{ARTIFACT_FORMAT_VERSION}".encode())
+    for df, columns in (
+        (books_df, ['_id', 'content']),
+        (ratings_df, ['user_id', 'book_id', 'rating_value'])
+    ):
+        present = [column for column in columns if column in df.columns]
+        digest.update(f"{len(df)}:{','.join(present)}".encode())
+        if present and not df.empty:
+            hashes = pd.util.hash_pandas_object(df[present].astype(str), index=False)
+            digest.update(hashes.to_numpy().tobytes())
+    if implicit is not None and not implicit.empty:
+        digest.update('\x00'.join(implicit.user_ids).encode())
+        digest.update('\x00'.join(implicit.book_ids).encode())
+        for array in (implicit.matrix.data, implicit.matrix.indices, implicit.matrix.indptr):
+            digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()[:16]
+
+class ModelArtifacts:
+    """Model hasil fit yang dapat disimpan dan di-load ulang"""
+
+    def __init__(self, tfidf_vectorizer: Optional[TfidfVectorizer], tfidf_matrix: Any,
+                 book_ids: List[str], user_item_matrix: UserItemMatrix,
+                 content_neighbors: Optional[NeighborTable] = None,
+                 item_similarity: Optional[ItemSimilarity] = None,
+                 als_model: Optional[AlsModel] = None):
+        self.tfidf_vectorizer = tfidf_vectorizer
+        self.tfidf_matrix = tfidf_matrix
+        self.book_ids = book_ids
+        self.user_item_matrix = user_item_matrix
+        self.content_neighbors = content_neighbors
+        self.item_similarity = item_similarity
+        self.als_model = als_model
+
+class ModelArtifactStore:
+    """Penyimpanan artefak model di direktori berversi, di-load dengan memory mapping"""
+
+    def __init__(self, root_dir: Optional[str] = None, keep_versions: int = 2):
+        """Inisialisasi ModelArtifactStore"""
+        self.root_dir = os.path.join(root_dir or Config.MODEL_ARTIFACT_DIR, f"v{ARTIFACT_FORMAT_VERSION}")
+        self.keep_versions = keep_versions
+
+    def _path(self, fingerprint: str, *parts: str) -> str:
+        return os.path.join(self.root_dir, fingerprint, *parts)
+
+    def exists(self, fingerprint: str) -> bool:
+        """Apakah artefak untuk fingerprint ini sudah tersimpan lengkap"""
+        return os.path.isfile(self._path(fingerprint, 'manifest.json'))
+
+    def save(self, fingerprint: str, artifacts: ModelArtifacts, overwrite: bool = False):
+        """Simpan artefak secara atomik (tulis ke direktori sementara lalu rename)"""
+        from utils.logger import ai_logger
+
+        os.makedirs(self.root_dir, exist_ok=True)
+        tmp_dir = self._path(f".{fingerprint}.{os.getpid()}.tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        manifest: Dict[str, Any] = {
+            'format_version': ARTIFACT_FORMAT_VERSION,
+            'fingerprint': fingerprint,
+            'created_at': time.time(),
+            'has_tfidf': artifacts.tfidf_matrix is not None,
+            'has_user_item': not artifacts.user_item_matrix.empty,
+            'has_neighbors': artifacts.content_neighbors is not None,
+            'has_item_similarity': artifacts.item_similarity is not None,
+            'has_als': artifacts.als_model is not None
+        }
+
+        with open(os.path.join(tmp_dir, 'book_ids.json'), 'w') as f:
+            json.dump(artifacts.book_ids, f)
+
+        if artifacts.tfidf_matrix is not None:
+            vectorizer = artifacts.tfidf_vectorizer
+            matrix = artifacts.tfidf_matrix.tocsr()
+            with open(os.path.join(tmp_dir, 'vocabulary.json'), 'w') as f:
+                json.dump({term: int(idx) for term, idx in vectorizer.vocabulary_.items()}, f)
+            np.save(os.path.join(tmp_dir, 'idf.npy'), vectorizer.idf_)
+            np.save(os.path.join(tmp_dir, 'tfidf_data.npy'), matrix.data)
+            np.save(os.path.join(tmp_dir, 'tfidf_indices.npy'), matrix.indices)
+            np.save(os.path.join(tmp_dir, 'tfidf_indptr.npy'), matrix.indptr)
+            manifest['tfidf_shape'] = list(matrix.shape)
+            manifest['tfidf_params'] = {
+                'stop_words': vectorizer.stop_words,
+                'max_features': vectorizer.max_features,
+                'ngram_range': list(vectorizer.ngram_range)
+            }
+
+        if manifest['has_user_item']:
+            user_item = artifacts.user_item_matrix
+            np.save(os.path.join(tmp_dir, 'user_item_data.npy'), user_item.matrix.data)
+            np.save(os.path.join(tmp_dir, 'user_item_indices.npy'), user_item.matrix.indices)
+            np.save(os.path.join(tmp_dir, 'user_item_indptr.npy'), user_item.matrix.indptr)
+            manifest['user_item_shape'] = list(user_item.shape)
+            with open(os.path.join(tmp_dir, 'user_item_axes.json'), 'w') as f:
+                json.dump({
+                    'users': [str(u) for u in user_item.user_ids],
+                    'books': [str(b) for b in user_item.book_ids]
+                }, f)
+
+        if manifest['has_neighbors']:
+            np.save(os.path.join(tmp_dir, 'neighbors_indices.npy'), artifacts.content_neighbors.indices)
+            np.save(os.path.join(tmp_dir, 'neighbors_scores.npy'), artifacts.content_neighbors.scores)
+
+        if manifest['has_item_similarity']:
+            item_similarity = artifacts.item_similarity
+            np.save(os.path.join(tmp_dir, 'item_sim_data.npy'), item_similarity.matrix.data)
+            np.save(os.path.join(tmp_dir, 'item_sim_indices.npy'), item_similarity.matrix.indices)
+            np.save(os.path.join(tmp_dir, 'item_sim_indptr.npy'), item_similarity.matrix.indptr)
+            manifest['item_similarity_shape'] = list(item_similarity.matrix.shape)
+            manifest['item_similarity_k'] = item_similarity.k
+
+        if manifest['has_als']:
+            als_model = artifacts.als_model
+            np.save(os.path.join(tmp_dir, 'als_user_factors.npy'), als_model.user_factors)
+            np.save(os.path.join(tmp_dir, 'als_item_factors.npy'), als_model.item_factors)
+            np.save(os.path.join(tmp_dir, 'als_rating_counts.npy'), als_model.rating_counts)
+            np.save(os.path.join(tmp_dir, 'als_rating_checksums.npy'), als_model.rating_checksums)
+            manifest['als'] = {
+                'global_mean': als_model.global_mean,
+                'regularization': als_model.regularization,
+                'training_report': als_model.training_report
+            }
+            with open(os.path.join(tmp_dir, 'als_axes.json'), 'w') as f:
+                json.dump({
+                    'users': [str(u) for u in als_model.user_ids],
+                    'books': [str(b) for b in als_model.book_ids]
+                }, f)
+
+        with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        final_dir = self._path(fingerprint)
+        if os.path.isdir(final_dir) and not overwrite:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+        if os.path.isdir(final_dir):
+            # File yang sedang di-mmap worker lain tetap valid setelah direktori lama dihapus
+            old_dir = self._path(f".{fingerprint}.{os.getpid()}.old")
+            os.replace(final_dir, old_dir)
+            os.replace(tmp_dir, final_dir)
+            shutil.rmtree(old_dir, ignore_errors=True)
+        else:
+            os.replace(tmp_dir, final_dir)
+        ai_logger.logger.info(f"Saved model artifacts {fingerprint} to {final_dir}")
+        self._prune(keep=fingerprint)
+
+    def load(self, fingerprint: str) -> Optional[ModelArtifacts]:
+        """Load artefak dengan memory mapping; None jika tidak ada atau rusak"""
+        from utils.logger import ai_logger
+
+        if not self.exists(fingerprint):
+            return None
+
+        try:
+            start_time = time.time()
+            with open(self._path(fingerprint, 'manifest.json')) as f:
+                manifest = json.load(f)
+            with open(self._path(fingerprint, 'book_ids.json')) as f:
+                book_ids = json.load(f)
+
+            tfidf_vectorizer, tfidf_matrix = None, None
+            if manifest.get('has_tfidf'):
+                params = manifest['tfidf_params']
+                tfidf_vectorizer = TfidfVectorizer(
+                    stop_words=params['stop_words'],
+                    max_features=params['max_features'],
+                    ngram_range=tuple(params['ngram_range'])
+                )
+                with open(self._path(fingerprint, 'vocabulary.json')) as f:
+                    tfidf_vectorizer.vocabulary_ = json.load(f)
+                tfidf_vectorizer.idf_ = np.load(self._path(fingerprint, 'idf.npy'))
+                tfidf_matrix = sparse.csr_matrix(
+                    (
+                        np.load(self._path(fingerprint, 'tfidf_data.npy'), mmap_mode='r'),
+                        np.load(self._path(fingerprint, 'tfidf_indices.npy'), mmap_mode='r'),
+                        np.load(self._path(fingerprint, 'tfidf_indptr.npy'), mmap_mode='r')
+                    ),
+                    shape=tuple(manifest['tfidf_shape']),
+                    copy=False
+                )
+
+            user_item_matrix = UserItemMatrix.create_empty()
+            if manifest.get('has_user_item'):
+                with open(self._path(fingerprint, 'user_item_axes.json')) as f:
+                    axes = json.load(f)
+                user_item_matrix = UserItemMatrix(
+                    sparse.csr_matrix(
+                        (
+                            np.load(self._path(fingerprint, 'user_item_data.npy'), mmap_mode='r'),
+                            np.load(self._path(fingerprint, 'user_item_indices.npy'), mmap_mode='r'),
+                            np.load(self._path(fingerprint, 'user_item_indptr.npy'), mmap_mode='r')
+                        ),
+                        shape=tuple(manifest['user_item_shape']),
+                        copy=False
+                    ),
+                    np.asarray(axes['users'], dtype=object),
+                    np.asarray(axes['books'], dtype=object)
+                )
+
+            content_neighbors = None
+            if manifest.get('has_neighbors'):
+                content_neighbors = NeighborTable(
+                    np.load(self._path(fingerprint, 'neighbors_indices.npy'), mmap_mode='r'),
+                    np.load(self._path(fingerprint, 'neighbors_scores.npy'), mmap_mode='r')
+                )
+
+            item_similarity = None
+            if manifest.get('has_item_similarity'):
+                item_similarity = ItemSimilarity(
+                    sparse.csr_matrix(
+                        (
+                            np.load(self._path(fingerprint, 'item_sim_data.npy'), mmap_mode='r'),
+                            np.load(self._path(fingerprint, 'item_sim_indices.npy'), mmap_mode='r'),
+                            np.load(self._path(fingerprint, 'item_sim_indptr.npy'), mmap_mode='r')
+                        ),
+                        shape=tuple(manifest['item_similarity_shape']),
+                        copy=False
+                    ),
+                    manifest['item_similarity_k']
+                )
+
+            als_model = None
+            if manifest.get('has_als'):
+                with open(self._path(fingerprint, 'als_axes.json')) as f:
+                    axes = json.load(f)
+                als_model = AlsModel(
+                    np.load(self._path(fingerprint, 'als_user_factors.npy'), mmap_mode='r'),
+                    np.load(self._path(fingerprint, 'als_item_factors.npy'), mmap_mode='r'),
+                    np.asarray(axes['users'], dtype=object),
+                    np.asarray(axes['books'], dtype=object),
+                    manifest['als']['global_mean'],
+                    manifest['als']['regularization'],
+                    np.load(self._path(fingerprint, 'als_rating_counts.npy')),
+                    manifest['als']['training_report'],
+                    np.load(self._path(fingerprint, 'als_rating_checksums.npy'))
+                )
+
+            ai_logger.log_performance("ModelArtifactStore", f"load {fingerprint}", time.time() - start_time)
+            return ModelArtifacts(
+                tfidf_vectorizer, tfidf_matrix, book_ids, user_item_matrix,
+                content_neighbors=content_neighbors,
+                item_similarity=item_similarity,
+                als_model=als_model
+            )
+
+        except Exception as e:
+            ai_logger.log_error("ModelArtifactStore", f"Failed to load artifacts {fingerprint}: {str(e)}")
+            return None
+
+    def load_or_build(self, fingerprint: str, book_ids: List[str],
+                      build: Callable[[], ModelArtifacts],
+                      refit: bool = False) -> ModelArtifacts:
+        """Load artefak yang cocok dengan fingerprint, atau fit ulang lalu simpan
+
+        refit=True memaksa fit ulang dan menimpa artefak dengan fingerprint yang sama
+        (misalnya artefak hasil update inkremental).
+        """
+        from utils.logger import ai_logger
+
+        artifacts = None if refit else self.load(fingerprint)
+        if artifacts is not None and artifacts.book_ids == book_ids:
+            ai_logger.logger.info(f"Using persisted model artifacts {fingerprint}")
+            return artifacts
+
+        artifacts = build()
+        try:
+            self.save(fingerprint, artifacts, overwrite=refit)
+        except Exception as e:
+            ai_logger.log_error("ModelArtifactStore", f"Failed to save artifacts {fingerprint}: {str(e)}")
+        return artifacts
+
+    def _prune(self, keep: str):
+        """Hapus direktori artefak lama, sisakan keep_versions terbaru"""
+        try:
+            entries = [
+                entry for entry in os.scandir(self.root_dir)
+                if entry.is_dir() and not entry.name.startswith('.')
+            ]
+        except FileNotFoundError:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+        for entry in entries[self.keep_versions:]:
+            if entry.name != keep:
+                shutil.rmtree(entry.path, ignore_errors=True)
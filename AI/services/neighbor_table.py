@@ -0,0 +1,146 @@
+import time
+import numpy as np
+from sklearn.preprocessing import normalize
+from typing import Any, Optional, Tuple
+from config.settings import Config
+
+class NeighborTable:
+    """Tabel top-K tetangga per buku (indeks baris + skor cosine) berbasis array"""
+
+    def __init__(self, indices: np.ndarray, scores: np.ndarray):
+        """Inisialisasi NeighborTable; baris ke-i berisi tetangga buku ke-i terurut menurun"""
+        self.indices = indices
+        self.scores = scores
+
+    @property
+    def k(self) -> int:
+        """Jumlah tetangga yang disimpan per buku"""
+        return self.indices.shape[1]
+
+    def __len__(self) -> int:
+        return self.indices.shape[0]
+
+    def can_serve(self, n_recommendations: int) -> bool:
+        """Apakah tabel cukup untuk menjawab n rekomendasi tanpa menghitung ulang"""
+        return n_recommendations <= self.k or self.k == len(self) - 1
+
+    def neighbors(self, row: int, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-n tetangga untuk satu baris buku (tanpa buku itu sendiri)"""
+        indices, scores = self.indices[row, :n], self.scores[row, :n]
+        # Tabel hasil ANN bisa berisi slot kosong (-1) jika kandidat kurang dari K
+        valid = indices >= 0
+        return indices[valid], scores[valid]
+
+def _block_rows(n_books: int, block_memory_mb: float) -> int:
+    """Jumlah baris per blok agar matriks similarity padat satu blok muat di anggaran memori"""
+    bytes_per_row = max(n_books, 1) * np.dtype(np.float32).itemsize
+    return max(1, int(block_memory_mb * 1024 * 1024 // bytes_per_row))
+
+def _build_with_ann(ann_index, k: int) -> NeighborTable:
+    """Top-K tetangga setiap buku lewat index ANN (untuk katalog yang terlalu besar untuk exact)"""
+    n_books = len(ann_index)
+    indices, scores = ann_index.query(ann_index.matrix, k, exclude=np.arange(n_books))
+    return NeighborTable(indices.astype(np.int32), scores)
+
+def _exact_top_k(matrix, matrix_t, row_ids: np.ndarray, k: int,
+                 block_rows: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k tetangga exact untuk baris row_ids dari matrix yang sudah dinormalisasi L2"""
+    indices = np.empty((len(row_ids), k), dtype=np.int32)
+    scores = np.empty((len(row_ids), k), dtype=np.float32)
+    if k == 0:
+        return indices, scores
+
+    for start in range(0, len(row_ids), block_rows):
+        block = row_ids[start:start + block_rows]
+        similarities = (matrix[block] @ matrix_t).toarray()
+        # Buku itu sendiri tidak pernah menjadi tetangganya
+        similarities[np.arange(len(block)), block] = -np.inf
+
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(similarities, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        indices[start:start + len(block)] = np.take_along_axis(top, order, axis=1)
+        scores[start:start + len(block)] = np.take_along_axis(top_scores, order, axis=1)
+    return indices, scores
+
+def build_neighbor_table(tfidf_matrix: Any, k: Optional[int] = None,
+                         block_memory_mb: Optional[float] = None, ann_index=None) -> Optional[NeighborTable]:
+    """Hitung top-K tetangga cosine setiap buku dengan perkalian sparse per blok baris
+
+    Jika ann_index diberikan, kandidat diambil dari index ANN alih-alih seluruh katalog.
+    """
+    from utils.logger import ai_logger
+
+    if tfidf_matrix is None or tfidf_matrix.shape[0] == 0:
+        return None
+
+    start_time = time.time()
+    k = k or Config.CONTENT_NEIGHBORS_K
+    block_memory_mb = block_memory_mb or Config.CONTENT_NEIGHBORS_BLOCK_MB
+
+    n_books = tfidf_matrix.shape[0]
+    k = min(k, n_books - 1)
+
+    if ann_index is not None:
+        table = _build_with_ann(ann_index, k)
+        ai_logger.log_performance(
+            "NeighborTable", f"build top-{k} for {n_books} books ({ann_index.name})", time.time() - start_time
+        )
+        return table
+
+    matrix = normalize(tfidf_matrix.tocsr().astype(np.float32))
+    matrix_t = matrix.T.tocsr()
+    indices, scores = _exact_top_k(matrix, matrix_t, np.arange(n_books), k, _block_rows(n_books, block_memory_mb))
+
+    ai_logger.log_performance(
+        "NeighborTable", f"build top-{k} for {n_books} books", time.time() - start_time
+    )
+    return NeighborTable(indices, scores)
+
+def update_neighbor_table(table: NeighborTable, tfidf_matrix: Any, changed_rows: np.ndarray,
+                          block_memory_mb: Optional[float] = None) -> Optional[NeighborTable]:
+    """Perbarui tabel hanya pada baris yang terdampak buku yang berubah
+
+    Baris lama tetap di posisinya dan buku baru ada di akhir matrix. Yang dihitung ulang hanya
+    baris buku yang berubah/baru, baris yang top-K lamanya memuat buku itu, dan baris yang
+    top-K-nya kini dimasuki buku itu; baris lain disalin dari tabel lama.
+    """
+    from utils.logger import ai_logger
+
+    n_books = tfidf_matrix.shape[0]
+    k = min(Config.CONTENT_NEIGHBORS_K, n_books - 1)
+    if table is None or table.k != k or k == 0:
+        # K ikut bergeser saat katalog masih lebih kecil dari CONTENT_NEIGHBORS_K
+        return build_neighbor_table(tfidf_matrix, block_memory_mb=block_memory_mb)
+
+    start_time = time.time()
+    block_memory_mb = block_memory_mb or Config.CONTENT_NEIGHBORS_BLOCK_MB
+    n_previous = len(table)
+    changed_rows = np.union1d(np.asarray(changed_rows, dtype=np.int64), np.arange(n_previous, n_books))
+
+    matrix = normalize(tfidf_matrix.tocsr().astype(np.float32))
+    matrix_t = matrix.T.tocsr()
+
+    # Baris yang top-K lamanya memuat buku yang berubah
+    stale = np.flatnonzero(np.isin(table.indices, changed_rows).any(axis=1))
+    # Baris yang top-K-nya dimasuki buku yang berubah (cosine simetris, cukup satu perkalian per buku)
+    candidates = (matrix[changed_rows] @ matrix_t).tocoo()
+    threshold = np.where(table.indices[:, -1] >= 0, table.scores[:, -1], -np.inf)
+    target = candidates.col.astype(np.int64)
+    old_target = np.minimum(target, n_previous - 1)
+    entering = (target < n_previous) & (target != changed_rows[candidates.row]) & \
+        (candidates.data > threshold[old_target])
+    affected = np.union1d(np.union1d(changed_rows, stale), target[entering])
+
+    indices = np.empty((n_books, k), dtype=np.int32)
+    scores = np.empty((n_books, k), dtype=np.float32)
+    indices[:n_previous] = table.indices
+    scores[:n_previous] = table.scores
+    indices[affected], scores[affected] = _exact_top_k(
+        matrix, matrix_t, affected, k, _block_rows(n_books, block_memory_mb)
+    )
+
+    ai_logger.log_performance(
+        "NeighborTable", f"update top-{k} for {len(affected)} of {n_books} books", time.time() - start_time
+    )
+    return NeighborTable(indices, scores)
@@ -0,0 +1,178 @@
+import re
+import time
+import numpy as np
+import pandas as pd
+from collections import Counter
+from scipy import sparse
+from sklearn.preprocessing import normalize
+from typing import Any, Dict, List, Optional, Tuple
+from config.settings import Config
+from .book_index import BookIndex, normalize_book_id
+from .catalog_loader import CatalogLoader
+from .item_similarity import build_item_similarity
+from .keyword_cache import normalize_preference_text
+from .user_item_matrix import UserItemMatrix
+
+_WORD_PATTERN = re.compile(r'\w+')
+
+def phrase_key(text: str) -> str:
+    """Kunci frasa: kata-kata teks ternormalisasi dipisah satu spasi"""
+    return ' '.join(_WORD_PATTERN.findall(normalize_preference_text(text)))
+
+class QueryExpander:
+    """Ekspansi teks preferensi menjadi vektor query TF-IDF berbobot tanpa LLM
+
+    Tiga komponen dijumlahkan lalu dinormalisasi L2:
+    - term TF-IDF teks itu sendiri (analyzer dan idf vectorizer snapshot);
+    - tetangga co-occurrence setiap term (cosine antar kolom TF-IDF, top-K per term);
+    - vektor frasa yang dikenali (keyword buku dan nama genre) = centroid TF-IDF buku bertanda frasa itu.
+    Semua struktur dihitung saat snapshot dibangun sehingga expand() hanya operasi dict kecil.
+    """
+
+    def __init__(self, vectorizer, term_neighbors: Optional[sparse.csr_matrix],
+                 phrases: Dict[str, Tuple[np.ndarray, np.ndarray]],
+                 cooccurrence_weight: Optional[float] = None, phrase_weight: Optional[float] = None):
+        """Inisialisasi QueryExpander; phrases: kunci frasa -> (indeks term, bobot)"""
+        self.vocabulary = vectorizer.vocabulary_
+        self.idf = vectorizer.idf_
+        self.n_features = len(self.idf)
+        self.term_neighbors = term_neighbors
+        self.phrases = phrases
+        self.max_phrase_words = max((len(key.split(' ')) for key in phrases), default=0)
+        self.cooccurrence_weight = Config.QUERY_EXPANSION_COOC_WEIGHT if cooccurrence_weight is None else cooccurrence_weight
+        self.phrase_weight = Config.QUERY_EXPANSION_PHRASE_WEIGHT if phrase_weight is None else phrase_weight
+        self._analyzer = vectorizer.build_analyzer()
+
+    def match_phrases(self, text: str) -> List[str]:
+        """Frasa dikenal yang muncul di teks (n-gram kata sampai panjang frasa terpanjang)"""
+        words = phrase_key(text).split(' ')
+        matched = []
+        for start in range(len(words)):
+            for length in range(1, min(self.max_phrase_words, len(words) - start) + 1):
+                key = ' '.join(words[start:start + length])
+                if key in self.phrases and key not in matched:
+                    matched.append(key)
+        return matched
+
+    def expand(self, text: str) -> Tuple[Optional[sparse.csr_matrix], Dict[str, Any]]:
+        """Vektor query (1 x n_features, L2) dan detail ekspansi; vektor None jika tidak ada term dikenal"""
+        counts = Counter(
+            index for index in (self.vocabulary.get(term) for term in self._analyzer(text or ''))
+            if index is not None
+        )
+        weights: Dict[int, float] = {}
+        base_norm = np.sqrt(sum((count * self.idf[index]) ** 2 for index, count in counts.items())) or 1.0
+        for index, count in counts.items():
+            weight = count * self.idf[index] / base_norm
+            weights[index] = weights.get(index, 0.0) + weight
+            if self.term_neighbors is not None and self.cooccurrence_weight:
+                start, end = self.term_neighbors.indptr[index], self.term_neighbors.indptr[index + 1]
+                for neighbor, similarity in zip(self.term_neighbors.indices[start:end], self.term_neighbors.data[start:end]):
+                    weights[neighbor] = weights.get(neighbor, 0.0) + self.cooccurrence_weight * weight * similarity
+
+        matched = self.match_phrases(text or '') if self.phrases else []
+        for key in matched:
+            indices, values = self.phrases[key]
+            for index, value in zip(indices, values):
+                weights[index] = weights.get(index, 0.0) + self.phrase_weight * value
+
+        details = {'terms': len(counts), 'phrases': matched, 'features': len(weights)}
+        if not weights:
+            return None, details
+        indices = np.fromiter(weights.keys(), dtype=np.int32, count=len(weights))
+        values = np.fromiter(weights.values(), dtype=np.float64, count=len(weights))
+        values /= np.linalg.norm(values)
+        order = np.argsort(indices)
+        vector = sparse.csr_matrix(
+            (values[order], indices[order], np.array([0, len(indices)])), shape=(1, self.n_features)
+        )
+        return vector, details
+
+def _load_phrase_books(loader: CatalogLoader, book_index: BookIndex, books_df: pd.DataFrame) -> Dict[str, Dict[int, float]]:
+    """Frasa -> {baris buku: bobot} dari keywords/book_keywords, genres/book_genres dan kolom genre"""
+    phrase_books: Dict[str, Dict[int, float]] = {}
+
+    def add(phrase: Any, book_id: Any, weight: float = 1.0):
+        row = book_index.get(book_id)
+        key = phrase_key(str(phrase)) if phrase else ''
+        if row is None or not key:
+            return
+        books = phrase_books.setdefault(key, {})
+        books[row] = max(books.get(row, 0.0), weight)
+
+    for collection_name in ('keywords', 'book_keywords'):
+        for document in loader.stream(collection_name, ['book_id', 'books_id', 'keyword', 'weight']):
+            weight = document.get('weight')
+            add(document.get('keyword'), document.get('book_id') or document.get('books_id'),
+                float(weight) if isinstance(weight, (int, float)) and weight > 0 else 1.0)
+
+    # book_genres menyimpan id genre; nama genre diambil dari koleksi genres
+    genre_names = {
+        normalize_book_id(document.get('_id')): document.get('genres_name') or document.get('name')
+        for document in loader.stream('genres', ['_id', 'genres_name', 'name'])
+    }
+    for document in loader.stream('book_genres', ['books_id', 'book_id', 'genres_id', 'genre_id']):
+        genre_id = normalize_book_id(document.get('genres_id') or document.get('genre_id'))
+        add(genre_names.get(genre_id), document.get('books_id') or document.get('book_id'))
+
+    if 'genre' in books_df.columns and '_id' in books_df.columns:
+        for book_id, genre in zip(books_df['_id'], books_df['genre']):
+            if isinstance(genre, str):
+                add(genre, book_id)
+    return phrase_books
+
+def _phrase_vectors(phrase_books: Dict[str, Dict[int, float]], vectorizer, tfidf_matrix,
+                    max_terms: int) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """Vektor setiap frasa: TF-IDF frasa + centroid berbobot buku bertanda frasa, dipangkas ke max_terms"""
+    keys = list(phrase_books)
+    rows, cols, values = [], [], []
+    for position, key in enumerate(keys):
+        for book_row, weight in phrase_books[key].items():
+            rows.append(position)
+            cols.append(book_row)
+            values.append(weight)
+    membership = sparse.csr_matrix((values, (rows, cols)), shape=(len(keys), tfidf_matrix.shape[0]))
+    # Satu perkalian sparse untuk semua centroid (baris membership dinormalisasi L1)
+    centroids = normalize(membership, norm='l1') @ tfidf_matrix
+    vectors = normalize(normalize(centroids) + vectorizer.transform(keys)).tocsr()
+
+    phrases = {}
+    for position, key in enumerate(keys):
+        start, end = vectors.indptr[position], vectors.indptr[position + 1]
+        indices, data = vectors.indices[start:end], vectors.data[start:end]
+        if len(data) > max_terms:
+            top = np.argpartition(-data, max_terms - 1)[:max_terms]
+            indices, data = indices[top], data[top]
+        if len(data):
+            phrases[key] = (indices.astype(np.int32), (data / np.linalg.norm(data)).astype(np.float32))
+    return phrases
+
+def build_query_expander(db, vectorizer, tfidf_matrix, book_index: BookIndex, books_df: pd.DataFrame,
+                         loader: Optional[CatalogLoader] = None) -> Optional[QueryExpander]:
+    """Bangun QueryExpander dari koleksi keyword/genre dan TF-IDF snapshot jika diaktifkan"""
+    from utils.logger import ai_logger
+
+    if not Config.QUERY_EXPANSION_ENABLED or vectorizer is None or tfidf_matrix is None:
+        return None
+    try:
+        start_time = time.time()
+        loader = loader or CatalogLoader(db)
+        phrase_books = _load_phrase_books(loader, book_index, books_df) if db is not None else {}
+        phrases = _phrase_vectors(phrase_books, vectorizer, tfidf_matrix, Config.QUERY_EXPANSION_PHRASE_TERMS) if phrase_books else {}
+
+        # Co-occurrence term: similarity item-item dengan buku sebagai "user" dan term sebagai "item"
+        terms = np.asarray(vectorizer.get_feature_names_out(), dtype=object)
+        term_similarity = build_item_similarity(
+            UserItemMatrix(sparse.csr_matrix(tfidf_matrix), np.arange(tfidf_matrix.shape[0]).astype(str).astype(object), terms),
+            k=Config.QUERY_EXPANSION_NEIGHBORS
+        )
+        expander = QueryExpander(vectorizer, term_similarity.matrix if term_similarity is not None else None, phrases)
+        ai_logger.log_performance(
+            "QueryExpander",
+            f"{len(phrases)} phrases, {term_similarity.nnz if term_similarity is not None else 0} term neighbors",
+            time.time() - start_time
+        )
+        return expander
+    except Exception as e:
+        ai_logger.log_error("QueryExpander", str(e))
+        return None
@@ -0,0 +1,234 @@
+import atexit
+import threading
+import time
+import numpy as np
+import pandas as pd
+from bson import ObjectId
+from datetime import datetime
+from pymongo.errors import BulkWriteError
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from config.settings import Config
+from .user_item_matrix import UserItemMatrix
+
+# Kode error MongoDB untuk duplicate key: dokumen sudah tersimpan pada percobaan sebelumnya
+DUPLICATE_KEY_ERROR = 11000
+
+class RatingOverlay:
+    """Rating yang sudah diterima tetapi belum masuk snapshot, dikelompokkan per user (thread-safe)
+
+    Pembaca menggabungkan baris user di snapshot dengan overlay-nya sehingga rating baru langsung
+    terlihat tanpa rebuild. Entri dihapus (compact) begitu snapshot baru memuat rating yang sama.
+    """
+
+    def __init__(self):
+        """Inisialisasi RatingOverlay"""
+        self._lock = threading.Lock()
+        self._cells: Dict[str, Dict[str, Tuple[float, float]]] = {}
+        self._versions: Dict[str, int] = {}
+        self._listeners: List[Callable[[str], Any]] = []
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(cells) for cells in self._cells.values())
+
+    def add_listener(self, callback: Callable[[str], Any]):
+        """Daftarkan callback(user_id) yang dipanggil setiap ada rating baru (mis. invalidasi cache)"""
+        self._listeners.append(callback)
+
+    def add(self, user_id: Any, book_id: Any, rating: float) -> int:
+        """Catat rating (menimpa rating sebelumnya untuk buku yang sama); kembalikan versi user"""
+        user_key, book_key = str(user_id), str(book_id)
+        with self._lock:
+            self._cells.setdefault(user_key, {})[book_key] = (float(rating), time.time())
+            version = self._versions.get(user_key, 0) + 1
+            self._versions[user_key] = version
+        for callback in self._listeners:
+            callback(user_key)
+        return version
+
+    def user_version(self, user_id: Any) -> int:
+        """Versi overlay user; bertambah setiap rating baru (komponen cache key per user)"""
+        return self._versions.get(str(user_id), 0)
+
+    def cells(self, user_id: Any) -> Dict[str, Tuple[float, float]]:
+        """Salinan rating overlay user: book_id -> (rating, timestamp epoch)"""
+        with self._lock:
+            return dict(self._cells.get(str(user_id), ()))
+
+    def merged_ratings(self, user_item_matrix: UserItemMatrix, user_id: Any) -> Tuple[Optional[int], np.ndarray, np.ndarray]:
+        """(baris user atau None, kolom buku, rating) dari snapshot digabung overlay, O(rating user)
+
+        Buku yang belum ada di axis matrix diabaikan sampai sinkronisasi berikutnya; rating 0
+        (dibaca tanpa rating) tidak menjadi sel matrix.
+        """
+        user_idx = user_item_matrix.user_row(user_id)
+        cols, ratings = (user_item_matrix.user_ratings(user_idx) if user_idx is not None
+                         else (np.empty(0, dtype=np.int32), np.empty(0)))
+        overlay = self.cells(user_id)
+        if not overlay:
+            return user_idx, cols, ratings
+
+        merged = dict(zip(cols.tolist(), ratings.tolist()))
+        for book_id, (rating, _) in overlay.items():
+            col = user_item_matrix.book_col(book_id)
+            if col is None:
+                continue
+            if rating > 0:
+                merged[col] = rating
+            else:
+                merged.pop(col, None)
+        merged_cols = np.fromiter(sorted(merged), dtype=np.int64, count=len(merged))
+        return user_idx, merged_cols, np.array([merged[col] for col in merged_cols.tolist()], dtype=np.float64)
+
+    def compact(self, snapshot) -> int:
+        """Hapus entri yang ratingnya sudah termuat di snapshot; kembalikan jumlah entri yang dihapus"""
+        ratings_df = snapshot.ratings_df
+        if ratings_df.empty or 'book_id' not in ratings_df.columns:
+            return 0
+        value_column = 'rating_value' if 'rating_value' in ratings_df.columns else 'rating'
+
+        removed = 0
+        with self._lock:
+            for user_id in list(self._cells):
+                user_rows = ratings_df.iloc[snapshot.user_rating_rows(user_id)]
+                if user_rows.empty:
+                    continue
+                loaded = dict(zip(user_rows['book_id'].astype(str), user_rows[value_column].fillna(0)))
+                cells = self._cells[user_id]
+                for book_id, (rating, _) in list(cells.items()):
+                    if book_id in loaded and float(loaded[book_id]) == rating:
+                        del cells[book_id]
+                        removed += 1
+                if not cells:
+                    # Versi ikut dibuang agar _versions tidak tumbuh tanpa batas; aman karena cache key
+                    # juga memuat snapshot.version yang baru sehingga versi yang mulai dari 0 tidak bentrok
+                    del self._cells[user_id]
+                    self._versions.pop(user_id, None)
+        return removed
+
+    def history_frame(self, user_id: Any, exclude_books: Optional[set] = None) -> pd.DataFrame:
+        """Rating overlay user sebagai baris ratings_df (kolom rating/rating_value/timestamp)"""
+        exclude_books = exclude_books or set()
+        rows = [
+            {
+                'user_id': str(user_id),
+                'book_id': book_id,
+                'rating': rating,
+                'rating_value': rating,
+                'timestamp': pd.Timestamp(received_at, unit='s')
+            }
+            for book_id, (rating, received_at) in self.cells(user_id).items()
+            if book_id not in exclude_books
+        ]
+        return pd.DataFrame(rows)
+
+class RatingWriteBuffer:
+    """Buffer tulis ratings: dokumen dikumpulkan lalu disimpan dengan satu insert_many
+
+    Flush terjadi saat buffer mencapai batch_size, setiap flush_interval detik oleh thread
+    background, dan saat proses berhenti. Batch yang gagal dikembalikan ke buffer untuk dicoba lagi;
+    _id dibuat di sisi client sehingga percobaan ulang tidak menggandakan dokumen.
+    """
+
+    def __init__(self, collection, batch_size: Optional[int] = None, flush_interval: Optional[float] = None,
+                 stamp_field: Optional[str] = 'rating_date'):
+        """Inisialisasi RatingWriteBuffer
+
+        stamp_field diisi waktu flush agar dokumen tidak tertinggal watermark sinkronisasi
+        (dokumen yang timestamp-nya lebih tua dari watermark tidak akan terambil poll).
+        """
+        self.collection = collection
+        self.batch_size = batch_size or Config.RATING_WRITE_BATCH_SIZE
+        self.flush_interval = flush_interval or Config.RATING_WRITE_FLUSH_INTERVAL
+        self.stamp_field = stamp_field
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.flushed = 0
+        self.failed_flushes = 0
+        atexit.register(self.close)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def add(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        """Tambahkan dokumen ke buffer; flush langsung jika buffer penuh"""
+        document.setdefault('_id', ObjectId())
+        with self._lock:
+            self._pending.append(document)
+            full = len(self._pending) >= self.batch_size
+        self._ensure_thread()
+        if full:
+            self.flush()
+        return document
+
+    def flush(self) -> int:
+        """Simpan semua dokumen tertunda dengan insert_many; kembalikan jumlah dokumen yang tersimpan"""
+        from utils.logger import ai_logger
+
+        with self._flush_lock:
+            with self._lock:
+                documents, self._pending = self._pending, []
+            if not documents:
+                return 0
+
+            start_time = time.time()
+            if self.stamp_field:
+                flushed_at = datetime.now()
+                for document in documents:
+                    document[self.stamp_field] = flushed_at
+            retry: List[Dict[str, Any]] = []
+            try:
+                self.collection.insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                # ordered=False: dokumen lain tetap tersimpan; duplicate key berarti sudah tersimpan sebelumnya
+                retry = [
+                    documents[error['index']] for error in e.details.get('writeErrors', [])
+                    if error.get('code') != DUPLICATE_KEY_ERROR
+                ]
+            except Exception as e:
+                ai_logger.log_error("RatingWriteBuffer", f"insert_many failed: {str(e)}")
+                retry = documents
+
+            if retry:
+                self.failed_flushes += 1
+                with self._lock:
+                    self._pending = retry + self._pending
+            saved = len(documents) - len(retry)
+            self.flushed += saved
+            ai_logger.log_performance(
+                "RatingWriteBuffer", f"insert_many {saved} ratings ({len(retry)} re-queued)",
+                time.time() - start_time
+            )
+            return saved
+
+    def _ensure_thread(self):
+        """Mulai thread flush periodik saat dokumen pertama masuk"""
+        if self._thread is not None or self._stop_event.is_set():
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='rating-write-buffer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        """Hentikan thread background lalu flush sisa buffer"""
+        self._stop_event.set()
+        self.flush()
+
+    def status(self) -> Dict[str, Any]:
+        """Status buffer untuk monitoring"""
+        return {
+            'pending': len(self),
+            'flushed': self.flushed,
+            'failed_flushes': self.failed_flushes,
+            'batch_size': self.batch_size,
+            'flush_interval': self.flush_interval
+        }
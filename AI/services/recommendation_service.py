@@ -1,155 +1,191 @@
 import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
+from scipy import sparse
 from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.preprocessing import MinMaxScaler
-import openai
-from pymongo import MongoClient
-from typing import List, Dict, Any, Optional
-import os
+from sklearn.preprocessing import MinMaxScaler, normalize
+from typing import List, Dict, Any, Callable, Optional, Tuple
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from config.settings import Config
+from .als_model import rating_checksum
+from .catalog_snapshot import CatalogSnapshot, CatalogStore, get_catalog_store
+from .keyword_cache import KeywordCache
+from .llm_provider import LLMProvider, get_llm_provider
+from .result_cache import ResultCache
+from .user_item_matrix import UserItemMatrix
+
+# Strategi yang didukung get_collaborative_recommendations
+COLLABORATIVE_STRATEGIES = ('user_user', 'item_item', 'als')
 
 # Load environment variables
 load_dotenv()
 
+def _top_n(scores: np.ndarray, n: int) -> np.ndarray:
+    """Indeks n skor tertinggi terurut menurun (argpartition, tanpa sort seluruh array)"""
+    n = min(n, len(scores))
+    if n <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, n - 1)[:n] if n < len(scores) else np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind='stable')]
+
+def _timed_call(call: Callable[[], Any]) -> Tuple[Any, float]:
+    """Jalankan call dan kembalikan (hasil, durasi detik) yang diukur di thread pelaksana"""
+    start_time = time.time()
+    return call(), time.time() - start_time
+
+# Key skor internal setiap bagian hybrid (dibuang dari response kecuali with_scores)
+SOURCE_SCORE_KEYS = {
+    'content_based': '_internal_similarity_score',
+    'collaborative': '_internal_predicted_rating',
+    'ai_enhanced': '_internal_relevance_score'
+}
+
+# Mode response hybrid dan metode fusion untuk mode 'fused'
+HYBRID_MODES = ('separate', 'fused')
+FUSION_METHODS = ('weighted', 'rrf')
+
+def hybrid_fusion_weights() -> Dict[str, float]:
+    """Bobot setiap sumber pada fusion hybrid (HYBRID_WEIGHT_*)"""
+    return {
+        'content_based': Config.HYBRID_WEIGHT_CONTENT,
+        'collaborative': Config.HYBRID_WEIGHT_COLLABORATIVE,
+        'ai_enhanced': Config.HYBRID_WEIGHT_AI
+    }
+
+def _strip_internal(recommendations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Salinan rekomendasi tanpa field internal (diawali '_') untuk response user"""
+    return [{k: v for k, v in book.items() if not k.startswith('_')} for book in recommendations]
+
+def fuse_recommendations(sources: Dict[str, List[Dict[str, Any]]], n: int, method: str = 'weighted',
+                         weights: Optional[Dict[str, float]] = None, k: int = 60) -> List[Dict[str, Any]]:
+    """Gabungkan daftar beberapa sumber menjadi satu daftar terurut, dedup per book_id
+
+    weighted: skor internal setiap sumber dinormalisasi MinMaxScaler ke [0, 1] lalu dikali bobot
+    sumber (sumber tanpa skor internal memakai peringkat sebagai skor); rrf: bobot / (k + peringkat).
+    Kontribusi disusun sebagai matrix buku x sumber sehingga skor akhir cukup satu penjumlahan;
+    setiap buku membawa fused_score dan kontribusi per sumber (sources).
+    """
+    names = [name for name, ranked in sources.items() if ranked]
+    rows: Dict[str, int] = {}
+    books: List[Dict[str, Any]] = []
+    for name in names:
+        for book in sources[name]:
+            book_id = str(book.get('book_id'))
+            if book_id not in rows:
+                rows[book_id] = len(books)
+                books.append(book)
+    
+    contributions = np.zeros((len(books), len(names)))
+    present = np.zeros((len(books), len(names)), dtype=bool)
+    for column, name in enumerate(names):
+        # Peringkat pertama buku di sumber ini (duplikat di dalam satu sumber diabaikan)
+        first_rank: Dict[str, int] = {}
+        for rank, book in enumerate(sources[name]):
+            first_rank.setdefault(str(book.get('book_id')), rank)
+        book_rows = np.fromiter((rows[book_id] for book_id in first_rank), dtype=np.int64, count=len(first_rank))
+        ranks = np.fromiter(first_rank.values(), dtype=np.float64, count=len(first_rank))
+        weight = (weights or {}).get(name, 1.0)
+        
+        if method == 'rrf':
+            scores = 1.0 / (k + ranks + 1)
+        else:
+            score_key = SOURCE_SCORE_KEYS.get(name)
+            raw = [sources[name][int(rank)].get(score_key) for rank in ranks]
+            raw = np.asarray(raw, dtype=np.float64) if all(isinstance(value, (int, float)) for value in raw) else -ranks
+            scores = (MinMaxScaler().fit_transform(raw.reshape(-1, 1)).ravel() if np.ptp(raw) > 0
+                      else np.ones(len(raw)))
+        contributions[book_rows, column] = weight * scores
+        present[book_rows, column] = True
+    
+    total = contributions.sum(axis=1)
+    fused = []
+    for row in _top_n(total, n):
+        book = {key: value for key, value in books[row].items() if not key.startswith('_')}
+        book['fused_score'] = round(float(total[row]), 4)
+        book['sources'] = {
+            name: round(float(contributions[row, column]), 4)
+            for column, name in enumerate(names) if present[row, column]
+        }
+        fused.append(book)
+    return fused
+
 class RecommendationService:
     """Service class untuk menangani rekomendasi buku"""
     
-    def __init__(self):
+    def __init__(self, catalog_store: Optional[CatalogStore] = None, llm_provider: Optional[LLMProvider] = None):
         """Inisialisasi Recommendation Service"""
-        self._setup_openai()
+        self.catalog_store = catalog_store or get_catalog_store()
+        # Provider LLM bersama (OpenAI atau stub offline) untuk ekstraksi kata kunci
+        self.llm = llm_provider or get_llm_provider()
+        # Cache hasil per user; rating baru user tersebut langsung menginvalidasi entrinya
+        self.result_cache = ResultCache('recommendations')
+        self.catalog_store.rating_overlay.add_listener(self.result_cache.invalidate_user)
+        # Kata kunci LLM per teks preferensi, tetap warm setelah restart
+        self.keyword_cache = KeywordCache(namespace=self.llm.cache_namespace())
+        # Ekstraksi LLM berjalan di thread terpisah agar bisa dibatasi waktu tanpa membatalkannya
+        self._llm_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='keyword-llm')
+        # Strategi hybrid berjalan paralel; jumlah thread dibatasi agar request lambat tidak menumpuk
+        self._hybrid_executor = ThreadPoolExecutor(max_workers=Config.HYBRID_WORKERS, thread_name_prefix='hybrid')
+        self._setup_llm()
         self._setup_database()
         self._setup_ml_components()
         self._load_data()
     
-    def _setup_openai(self):
-        """Setup konfigurasi OpenAI"""
-        openai.api_key = os.getenv('OPENAI_API_KEY')
-        if not openai.api_key:
-            print("Warning: OPENAI_API_KEY tidak ditemukan")
+    def _setup_llm(self):
+        """Cek kesiapan provider LLM"""
+        if not self.llm.available():
+            print(f"Warning: LLM provider '{self.llm.name}' tidak tersedia, ekstraksi kata kunci LLM dinonaktifkan")
     
     def _setup_database(self):
         """Setup koneksi database"""
-        mongodb_uri = os.getenv('MONGODB_URI')
-        if not mongodb_uri:
-            raise ValueError("MONGODB_URI tidak ditemukan di environment variables")
-        
-        self.client = MongoClient(mongodb_uri)
-        self.db = self.client['smartlibrary']
+        self.db = self.catalog_store.db
         self.books_collection = self.db['books']
         self.ratings_collection = self.db['ratings']
+        self.precomputed_collection = self.db[Config.PRECOMPUTE_COLLECTION]
     
     def _setup_ml_components(self):
         """Setup komponen machine learning"""
-        self.tfidf_vectorizer = TfidfVectorizer(
-            stop_words='english',
-            max_features=5000,
-            ngram_range=(1, 2)
-        )
         self.scaler = MinMaxScaler()
     
     def _load_data(self):
-        """Load data dari MongoDB"""
-        try:
-            from utils.logger import ai_logger
-            
-            # Load buku
-            books_data = list(self.books_collection.find())
-            self.books_df = pd.DataFrame(books_data)
-            ai_logger.logger.info(f"Loaded {len(books_data)} books from database")
-            
-            # Load ratings
-            ratings_data = list(self.ratings_collection.find())
-            self.ratings_df = pd.DataFrame(ratings_data)
-            ai_logger.logger.info(f"Loaded {len(ratings_data)} ratings from database")
-            
-            if not self.books_df.empty:
-                self._prepare_content_data()
-                self._create_user_item_matrix()
-                ai_logger.logger.info("Data preparation completed successfully")
-            else:
-                ai_logger.logger.warning("No books data found in database")
-                
-        except Exception as e:
-            ai_logger.log_error("DataLoading", str(e))
-            print(f"Error loading data: {str(e)}")
-            self.books_df = pd.DataFrame()
-            self.ratings_df = pd.DataFrame()
+        """Memastikan snapshot katalog bersama sudah dimuat"""
+        return self.catalog_store.snapshot
     
-    def _prepare_content_data(self):
-        """Mempersiapkan data untuk content-based filtering"""
-        from utils.logger import ai_logger
-        
-        try:
-            # Gabungkan semua informasi buku
-            self.books_df['content'] = (
-                self.books_df['title'].fillna('') + ' ' +
-                self.books_df['description'].fillna('') + ' ' +
-                self.books_df['author'].fillna('') + ' ' +
-                self.books_df['genre'].fillna('')
-            )
-            
-            # Buat TF-IDF matrix
-            self.tfidf_matrix = self.tfidf_vectorizer.fit_transform(self.books_df['content'])
-            ai_logger.logger.info(f"Created TF-IDF matrix: {self.tfidf_matrix.shape}")
-            
-        except Exception as e:
-            ai_logger.logger.error(f"Failed to prepare content data: {str(e)}")
-            self.tfidf_matrix = None
+    @property
+    def snapshot(self) -> CatalogSnapshot:
+        """Snapshot katalog aktif yang dibagi dengan service lain"""
+        return self.catalog_store.snapshot
     
-    def _create_user_item_matrix(self):
-        """Membuat user-item matrix untuk collaborative filtering"""
-        from utils.logger import ai_logger
-        
-        if not self.ratings_df.empty:
-            try:
-                self.user_item_matrix = self.ratings_df.pivot(
-                    index='user_id',
-                    columns='book_id',
-                    values='rating_value'
-                ).fillna(0)
-                ai_logger.logger.info(f"Created user-item matrix: {self.user_item_matrix.shape}")
-            except Exception as e:
-                ai_logger.logger.warning(f"Failed to create user-item matrix: {str(e)}")
-                self.user_item_matrix = pd.DataFrame()
-        else:
-            ai_logger.logger.warning("No ratings data available for collaborative filtering")
-            self.user_item_matrix = pd.DataFrame()
+    @property
+    def books_df(self) -> pd.DataFrame:
+        return self.snapshot.books_df
     
-    def _get_book_index(self, book_id: str) -> Optional[int]:
-        """Mendapatkan indeks buku dari DataFrame"""
-        try:
-            from bson import ObjectId
-            
-            # Coba sebagai string biasa
-            try:
-                return self.books_df[self.books_df['_id'] == book_id].index[0]
-            except (IndexError, KeyError):
-                pass
-            
-            # Coba sebagai ObjectId
-            try:
-                obj_id = ObjectId(book_id)
-                return self.books_df[self.books_df['_id'] == obj_id].index[0]
-            except (IndexError, KeyError, ValueError):
-                pass
-            
-            # Coba sebagai string dari ObjectId
-            try:
-                return self.books_df[self.books_df['_id'].astype(str) == book_id].index[0]
-            except (IndexError, KeyError):
-                pass
-            
-            return None
-        except Exception as e:
-            from utils.logger import ai_logger
-            ai_logger.logger.warning(f"Error in _get_book_index: {str(e)}")
-            return None
+    @property
+    def ratings_df(self) -> pd.DataFrame:
+        return self.snapshot.ratings_df
     
-    def _get_book_by_index(self, index: int) -> Optional[Dict[str, Any]]:
+    @property
+    def tfidf_vectorizer(self):
+        return self.snapshot.tfidf_vectorizer
+    
+    @property
+    def tfidf_matrix(self):
+        return self.snapshot.tfidf_matrix
+    
+    @property
+    def user_item_matrix(self) -> UserItemMatrix:
+        return self.snapshot.user_item_matrix
+    
+    def _get_book_index(self, book_id: str, snapshot: Optional[CatalogSnapshot] = None) -> Optional[int]:
+        """Mendapatkan indeks buku dari DataFrame (string, ObjectId atau id `book-N`)"""
+        return (snapshot or self.snapshot).book_index.get(book_id)
+    
+    def _get_book_by_index(self, index: int, snapshot: Optional[CatalogSnapshot] = None) -> Optional[Dict[str, Any]]:
         """Mendapatkan data buku berdasarkan indeks"""
         try:
-            book = self.books_df.iloc[index]
+            book = (snapshot or self.snapshot).books_df.iloc[index]
             return {
                 'book_id': str(book['_id']),
                 'title': book.get('title', 'N/A'),
@@ -160,247 +196,517 @@ class RecommendationService:
         except (IndexError, KeyError):
             return None
     
-    def get_content_based_recommendations(self, book_id: str, n_recommendations: int = 5) -> List[Dict[str, Any]]:
-        """Mendapatkan rekomendasi berdasarkan konten buku"""
+    def get_content_based_recommendations(self, book_id: str, n_recommendations: int = 5,
+                                          with_scores: bool = False) -> List[Dict[str, Any]]:
+        """Mendapatkan rekomendasi berdasarkan konten buku (with_scores: pertahankan skor internal)"""
         from utils.logger import ai_logger
         
         try:
             ai_logger.logger.info(f"CONTENT-BASED: Processing book_id={book_id}")
             
-            if self.books_df.empty or self.tfidf_matrix is None:
+            # Satu snapshot untuk seluruh request agar konsisten selama hot-swap
+            snapshot = self.snapshot
+            if snapshot.books_df.empty or snapshot.tfidf_matrix is None:
                 ai_logger.logger.warning("   No data available for content-based filtering")
                 return []
             
-            book_idx = self._get_book_index(book_id)
+            book_idx = self._get_book_index(book_id, snapshot)
             if book_idx is None:
                 ai_logger.logger.warning(f"   Book ID {book_id} not found in database")
                 return []
             
             ai_logger.logger.info(f"   Found book at index {book_idx}")
             
-            # Hitung similarity scores
-            cosine_similarities = cosine_similarity(
-                self.tfidf_matrix[book_idx:book_idx+1],
-                self.tfidf_matrix
-            ).flatten()
-            
-            ai_logger.logger.info(f"   Calculated {len(cosine_similarities)} similarity scores")
-            ai_logger.logger.info(f"   Score range: {cosine_similarities.min():.4f} - {cosine_similarities.max():.4f}")
-            
-            # Dapatkan indeks buku yang paling similar (exclude buku yang sama)
-            similar_indices = cosine_similarities.argsort()[-n_recommendations-1:-1][::-1]
+            content_neighbors = snapshot.content_neighbors
+            if content_neighbors is not None and content_neighbors.can_serve(n_recommendations):
+                # Lookup tabel tetangga yang sudah dihitung di background
+                similar_indices, similar_scores = content_neighbors.neighbors(book_idx, n_recommendations)
+                ai_logger.logger.info(f"   Neighbor table lookup (top-{content_neighbors.k})")
+            elif snapshot.content_ann is not None:
+                # Katalog besar: kandidat dari index ANN, di-rerank dengan cosine exact
+                neighbors, scores = snapshot.content_ann.query(
+                    snapshot.tfidf_matrix[book_idx:book_idx+1], n_recommendations, exclude=np.array([book_idx])
+                )
+                valid = neighbors[0] >= 0
+                similar_indices, similar_scores = neighbors[0][valid], scores[0][valid]
+                ai_logger.logger.info(f"   ANN lookup ({snapshot.content_ann.name})")
+            else:
+                # Hitung similarity scores
+                cosine_similarities = cosine_similarity(
+                    snapshot.tfidf_matrix[book_idx:book_idx+1],
+                    snapshot.tfidf_matrix
+                ).flatten()
+                
+                ai_logger.logger.info(f"   Calculated {len(cosine_similarities)} similarity scores")
+                ai_logger.logger.info(f"   Score range: {cosine_similarities.min():.4f} - {cosine_similarities.max():.4f}")
+                
+                # Dapatkan indeks buku yang paling similar (exclude buku yang sama)
+                cosine_similarities[book_idx] = -np.inf
+                similar_indices = cosine_similarities.argsort()[::-1][:min(n_recommendations, len(cosine_similarities) - 1)]
+                similar_scores = cosine_similarities[similar_indices]
             
             ai_logger.logger.info(f"   Selected top {len(similar_indices)} similar books")
             
             # Dapatkan detail buku yang direkomendasikan
             recommendations = []
-            for i, idx in enumerate(similar_indices, 1):
-                book_data = self._get_book_by_index(idx)
+            for i, (idx, score) in enumerate(zip(similar_indices, similar_scores), 1):
+                book_data = self._get_book_by_index(idx, snapshot)
                 if book_data:
-                    score = float(cosine_similarities[idx])
-                    # Simpan score hanya untuk internal logging, tidak untuk user
+                    score = float(score)
+                    # Simpan score hanya untuk internal logging dan fusion, tidak untuk user
                     book_data['_internal_similarity_score'] = score
-                    # Hapus score dari response user
-                    clean_book_data = {k: v for k, v in book_data.items() if not k.startswith('_')}
-                    recommendations.append(clean_book_data)
+                    recommendations.append(book_data)
                     ai_logger.logger.info(f"      {i}. {book_data.get('title', 'N/A')} - Score: {score:.4f}")
             
             ai_logger.logger.info(f"   Content-based: Generated {len(recommendations)} recommendations")
-            return recommendations
+            # Hapus score dari response user
+            return recommendations if with_scores else _strip_internal(recommendations)
             
         except Exception as e:
             ai_logger.log_error("ContentBasedRecommendation", str(e))
             return []
     
-    def get_collaborative_recommendations(self, user_id: str, n_recommendations: int = 5) -> List[Dict[str, Any]]:
-        """Mendapatkan rekomendasi berdasarkan collaborative filtering"""
+    def get_collaborative_recommendations(self, user_id: str, n_recommendations: int = 5,
+                                          strategy: Optional[str] = None, with_scores: bool = False) -> List[Dict[str, Any]]:
+        """Mendapatkan rekomendasi berdasarkan collaborative filtering
+        
+        strategy: 'user_user' (similarity antar user, dihitung per request), 'item_item'
+        (similarity antar buku yang sudah dihitung di snapshot) atau 'als' (faktorisasi matrix);
+        default Config.COLLABORATIVE_STRATEGY. Hasil di-cache per (strategy, user, n, versi model)
+        beserta skor internal; skor hanya dikembalikan jika with_scores.
+        """
         from utils.logger import ai_logger
         
         try:
-            ai_logger.logger.info(f"COLLABORATIVE: Processing user_id={user_id}")
-            
-            if self.user_item_matrix.empty or user_id not in self.user_item_matrix.index:
-                ai_logger.logger.warning(f"   User {user_id} not found or no user-item matrix available")
-                return []
-            
-            ai_logger.logger.info(f"   Found user in matrix with {len(self.user_item_matrix.columns)} books")
-            
-            # Hitung similarity antar user
-            user_similarities = cosine_similarity(
-                self.user_item_matrix.loc[user_id:user_id],
-                self.user_item_matrix
-            ).flatten()
-            
-            ai_logger.logger.info(f"   Calculated similarities with {len(user_similarities)} users")
-            ai_logger.logger.info(f"   Similarity range: {user_similarities.min():.4f} - {user_similarities.max():.4f}")
-            
-            # Dapatkan user yang paling similar (exclude user sendiri)
-            user_idx = self.user_item_matrix.index.get_loc(user_id)
-            user_similarities[user_idx] = 0  # Set similarity dengan diri sendiri ke 0
-            
-            similar_users = user_similarities.argsort()[-n_recommendations-1:-1][::-1]
-            ai_logger.logger.info(f"   Selected top {len(similar_users)} similar users")
-            
-            # Log similar users dengan detail
-            for i, user_idx in enumerate(similar_users, 1):
-                similarity = user_similarities[user_idx]
-                similar_user_id = self.user_item_matrix.index[user_idx]
-                ai_logger.logger.info(f"      {i}. User {similar_user_id} - Similarity: {similarity:.4f}")
-            
-            # Dapatkan buku yang belum dibaca oleh user
-            user_books = set(self.user_item_matrix.columns[self.user_item_matrix.loc[user_id] > 0])
-            all_books = set(self.user_item_matrix.columns)
-            unread_books = all_books - user_books
-            
-            ai_logger.logger.info(f"   User has read {len(user_books)} books, {len(unread_books)} unread books available")
-            
-            # Hitung prediksi rating untuk buku yang belum dibaca
-            predictions = []
-            for book_id in unread_books:
-                # Dapatkan rating dari user yang similar
-                similar_user_ratings = self.user_item_matrix.iloc[similar_users][book_id]
-                # Hitung weighted average rating
-                weighted_rating = np.average(
-                    similar_user_ratings,
-                    weights=user_similarities[similar_users]
-                )
-                predictions.append((book_id, weighted_rating))
-            
-            ai_logger.logger.info(f"   Calculated predictions for {len(predictions)} unread books")
-            
-            # Urutkan berdasarkan prediksi rating
-            predictions.sort(key=lambda x: x[1], reverse=True)
-            
-            # Filter hanya buku dengan rating > 0 (yang benar-benar direkomendasikan)
-            positive_predictions = [(book_id, rating) for book_id, rating in predictions if rating > 0]
-            
-            if not positive_predictions:
-                ai_logger.logger.info("   No positive predictions found, using top predictions")
-                positive_predictions = predictions[:n_recommendations]
-            
-            # Dapatkan detail buku yang direkomendasikan
-            recommendations = []
-            for i, (book_id, predicted_rating) in enumerate(positive_predictions[:n_recommendations], 1):
-                book_data = self._get_book_by_id(book_id)
-                if book_data:
-                    # Simpan rating hanya untuk internal logging, tidak untuk user
-                    book_data['_internal_predicted_rating'] = float(predicted_rating)
-                    # Hapus rating dari response user
-                    clean_book_data = {k: v for k, v in book_data.items() if not k.startswith('_')}
-                    recommendations.append(clean_book_data)
-                    ai_logger.logger.info(f"      {i}. {book_data.get('title', 'N/A')} - Predicted Rating: {predicted_rating:.2f}")
-            
-            # Jika tidak ada rekomendasi dari collaborative, coba fallback ke content-based
-            if not recommendations and len(unread_books) > 0:
-                ai_logger.logger.info("   No collaborative recommendations, trying content-based fallback")
-                # Ambil buku pertama yang belum dibaca untuk content-based
-                fallback_book_id = list(unread_books)[0]
-                # Pastikan book_id valid untuk content-based
-                if fallback_book_id in self.books_df['_id'].astype(str).values:
-                    fallback_recs = self.get_content_based_recommendations(fallback_book_id, n_recommendations)
-                    recommendations = fallback_recs[:n_recommendations]
-                    ai_logger.logger.info(f"   Content-based fallback generated {len(recommendations)} recommendations")
-                else:
-                    ai_logger.logger.warning(f"   Fallback book_id {fallback_book_id} not found in books database")
-            
-            ai_logger.logger.info(f"   Collaborative: Generated {len(recommendations)} recommendations")
-            return recommendations
+            strategy = strategy or Config.COLLABORATIVE_STRATEGY
+            # Satu snapshot untuk seluruh request agar konsisten selama hot-swap
+            snapshot = self.snapshot
+            cache_key = ('collaborative', strategy, str(user_id), n_recommendations,
+                         snapshot.version, self.catalog_store.rating_overlay.user_version(user_id))
+            recommendations = self.result_cache.get(cache_key)
+            if recommendations is not None:
+                ai_logger.logger.info(f"COLLABORATIVE: Cache hit for user_id={user_id} (strategy={strategy})")
+                return recommendations if with_scores else _strip_internal(recommendations)
+            
+            # Tabel hasil job batch lebih dulu; hitung live jika tidak ada atau sudah basi
+            recommendations = self._get_precomputed(user_id, 'collaborative', n_recommendations, strategy, snapshot)
+            if recommendations is None:
+                recommendations = self._collaborative_recommendations(user_id, n_recommendations, strategy, snapshot)
+            self.result_cache.put(cache_key, recommendations, user_id=user_id)
+            return recommendations if with_scores else _strip_internal(recommendations)
             
         except Exception as e:
             ai_logger.log_error("CollaborativeRecommendation", str(e))
             return []
     
-    def _get_book_by_id(self, book_id: str) -> Optional[Dict[str, Any]]:
-        """Mendapatkan data buku berdasarkan ID"""
-        try:
-            book = self.books_df[self.books_df['_id'] == book_id].iloc[0]
-            return {
-                'book_id': str(book['_id']),
-                'title': book.get('title', 'N/A'),
-                'author': book.get('author', 'N/A'),
-                'genre': book.get('genre', 'N/A'),
-                'description': book.get('description', 'N/A')
+    def _get_precomputed(self, user_id: str, section: str, n_recommendations: int, strategy: str,
+                         snapshot: CatalogSnapshot) -> Optional[List[Dict[str, Any]]]:
+        """Daftar precomputed user jika masih segar; None jika harus dihitung live"""
+        from utils.logger import ai_logger
+        
+        document = self._get_precomputed_document(user_id, [section], n_recommendations, strategy, snapshot)
+        if document is None:
+            return None
+        ai_logger.logger.info(f"   Serving precomputed {section} recommendations for user {user_id}")
+        return document.get(section, [])[:n_recommendations]
+    
+    def _get_precomputed_hybrid(self, user_id: str, n_recommendations: int, mode: str, fusion: str,
+                                snapshot: CatalogSnapshot) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """Response hybrid dari tabel precomputed untuk request yang hanya berisi user_id
+        
+        Mode separate memakai daftar collaborative dan content_based (dari buku dengan rating
+        tertinggi user); mode fused memakai daftar fused jika dihitung dengan metode fusion yang
+        sama. None jika dokumen tidak segar atau tidak berisi rekomendasi.
+        """
+        from utils.logger import ai_logger
+        
+        document = self._get_precomputed_document(
+            user_id, ['content_based', 'collaborative', 'fused', 'fusion'], n_recommendations,
+            Config.COLLABORATIVE_STRATEGY, snapshot
+        )
+        if document is None:
+            return None
+        if mode == 'fused':
+            if document.get('fusion') != fusion:
+                return None
+            result = {'fused': document.get('fused', [])[:n_recommendations]}
+        else:
+            result = {
+                'content_based': _strip_internal(document.get('content_based', [])[:n_recommendations]),
+                'collaborative': _strip_internal(document.get('collaborative', [])[:n_recommendations]),
+                'ai_enhanced': []
             }
-        except (IndexError, KeyError):
+        if not any(result.values()):
             return None
+        ai_logger.logger.info(f"   Serving precomputed hybrid ({mode}) recommendations for user {user_id}")
+        return result
     
-    def get_ai_enhanced_recommendations(self, user_preferences: str, n_recommendations: int = 5) -> List[Dict[str, Any]]:
-        """Mendapatkan rekomendasi yang ditingkatkan dengan OpenAI"""
+    def _get_precomputed_document(self, user_id: str, fields: List[str], n_recommendations: int, strategy: str,
+                                  snapshot: CatalogSnapshot) -> Optional[Dict[str, Any]]:
+        """Dokumen precomputed user (hanya fields) jika masih segar; None jika harus dihitung live
+        
+        Segar berarti dihitung dengan strategy yang sama, minimal n_recommendations, belum melewati
+        PRECOMPUTE_MAX_AGE_HOURS, dan user belum memberi rating setelah dokumen dibuat.
+        """
+        from utils.logger import ai_logger
+        
+        if not Config.PRECOMPUTE_SERVE_ENABLED:
+            return None
+        try:
+            document = self.precomputed_collection.find_one(
+                {'_id': str(user_id)}, {**{field: 1 for field in fields}, 'strategy': 1, 'n': 1, 'generated_at': 1}
+            )
+        except Exception as e:
+            ai_logger.log_error("PrecomputedRecommendation", str(e))
+            return None
+        if document is None or document.get('strategy') != strategy or document.get('n', 0) < n_recommendations:
+            return None
+        
+        generated_at = document.get('generated_at')
+        if not isinstance(generated_at, datetime):
+            return None
+        if datetime.now() - generated_at > timedelta(hours=Config.PRECOMPUTE_MAX_AGE_HOURS):
+            return None
+        if self.catalog_store.rating_overlay.cells(user_id):
+            return None
+        user_ratings = snapshot.ratings_df.iloc[snapshot.user_rating_rows(user_id)]
+        if 'rating_date' in user_ratings.columns and user_ratings['rating_date'].max() > pd.Timestamp(generated_at):
+            return None
+        return document
+    
+    def _collaborative_recommendations(self, user_id: str, n_recommendations: int, strategy: str,
+                                       snapshot: CatalogSnapshot) -> List[Dict[str, Any]]:
+        """Hitung rekomendasi collaborative (dengan skor internal) tanpa cache; exception diteruskan ke pemanggil"""
+        from utils.logger import ai_logger
+        
+        ai_logger.logger.info(f"COLLABORATIVE: Processing user_id={user_id} (strategy={strategy})")
+        
+        user_item_matrix = snapshot.user_item_matrix
+        # Baris user di snapshot digabung rating baru yang belum termuat snapshot
+        user_idx, read_cols, read_ratings = self.catalog_store.rating_overlay.merged_ratings(
+            user_item_matrix, user_id
+        )
+        if user_item_matrix.empty or not len(read_cols):
+            ai_logger.logger.warning(f"   User {user_id} not found or no user-item matrix available")
+            return []
+        
+        ai_logger.logger.info(f"   Found user in matrix with {len(user_item_matrix.book_ids)} books")
+        
+        # Dapatkan buku yang belum dibaca oleh user
+        n_unread = len(user_item_matrix.book_ids) - len(read_cols)
+        
+        ai_logger.logger.info(f"   User has read {len(read_cols)} books, {n_unread} unread books available")
+        
+        missing_model = {'item_item': snapshot.item_similarity, 'als': snapshot.als_model}
+        if strategy in missing_model and missing_model[strategy] is None:
+            ai_logger.logger.warning(f"   Model for {strategy} not available, using user_user strategy")
+            strategy = 'user_user'
+        
+        if strategy == 'item_item':
+            predicted = snapshot.item_similarity.predict(read_cols, read_ratings)
+        elif strategy == 'als':
+            predicted = self._predict_als(snapshot.als_model, user_item_matrix, user_id, read_cols, read_ratings)
+        else:
+            predicted = self._predict_user_user(user_item_matrix, user_idx, read_cols, read_ratings, n_recommendations)
+        
+        top_cols = np.empty(0, dtype=np.int64)
+        if predicted is not None:
+            # Buku yang sudah dibaca tidak boleh terpilih
+            predicted[read_cols] = -np.inf
+            n_candidates = int(np.isfinite(predicted).sum())
+            top_cols = _top_n(predicted, min(n_recommendations, n_candidates))
+            ai_logger.logger.info(f"   Calculated predictions for {n_candidates} unread books")
+        
+        # Filter hanya buku dengan rating > 0 (yang benar-benar direkomendasikan)
+        positive_cols = top_cols[predicted[top_cols] > 0] if len(top_cols) else top_cols
+        
+        if len(top_cols) and not len(positive_cols):
+            ai_logger.logger.info("   No positive predictions found, using top predictions")
+            positive_cols = top_cols
+        
+        # Dapatkan detail buku yang direkomendasikan
+        recommendations = []
+        for i, col in enumerate(positive_cols, 1):
+            book_id, predicted_rating = user_item_matrix.book_ids[col], predicted[col]
+            book_data = self._get_book_by_id(book_id, snapshot)
+            if book_data:
+                # Simpan rating hanya untuk internal logging dan fusion, tidak untuk user
+                book_data['_internal_predicted_rating'] = float(predicted_rating)
+                recommendations.append(book_data)
+                ai_logger.logger.info(f"      {i}. {book_data.get('title', 'N/A')} - Predicted Rating: {predicted_rating:.2f}")
+        
+        # Jika tidak ada rekomendasi dari collaborative, coba fallback ke content-based
+        if not recommendations and n_unread > 0:
+            ai_logger.logger.info("   No collaborative recommendations, trying content-based fallback")
+            # Ambil buku pertama yang belum dibaca untuk content-based
+            unread_mask = np.ones(len(user_item_matrix.book_ids), dtype=bool)
+            unread_mask[read_cols] = False
+            fallback_book_id = user_item_matrix.book_ids[np.argmax(unread_mask)]
+            # Pastikan book_id valid untuk content-based
+            if fallback_book_id in snapshot.book_index:
+                fallback_recs = self.get_content_based_recommendations(fallback_book_id, n_recommendations)
+                recommendations = fallback_recs[:n_recommendations]
+                ai_logger.logger.info(f"   Content-based fallback generated {len(recommendations)} recommendations")
+            else:
+                ai_logger.logger.warning(f"   Fallback book_id {fallback_book_id} not found in books database")
+        
+        ai_logger.logger.info(f"   Collaborative: Generated {len(recommendations)} recommendations")
+        return recommendations
+    
+    def _predict_user_user(self, user_item_matrix, user_idx: Optional[int], read_cols: np.ndarray,
+                           read_ratings: np.ndarray, n_recommendations: int) -> Optional[np.ndarray]:
+        """Prediksi rating semua buku dari user yang paling similar; None jika tidak ada co-rating
+        
+        Vektor user dibangun dari (read_cols, read_ratings) sehingga rating yang belum masuk
+        snapshot ikut dihitung; user_idx None untuk user yang belum ada di matrix.
+        """
+        from utils.logger import ai_logger
+        
+        # Hitung similarity antar user langsung pada matrix sparse (baris sudah dinormalisasi L2)
+        normalized = user_item_matrix.normalized
+        user_vector = sparse.csr_matrix(
+            (read_ratings / np.linalg.norm(read_ratings), (np.zeros(len(read_cols), dtype=np.int64), read_cols)),
+            shape=(1, len(user_item_matrix.book_ids))
+        )
+        user_similarities = (normalized @ user_vector.T).toarray().ravel()
+        
+        ai_logger.logger.info(f"   Calculated similarities with {len(user_similarities)} users")
+        ai_logger.logger.info(f"   Similarity range: {user_similarities.min():.4f} - {user_similarities.max():.4f}")
+        
+        # Dapatkan user yang paling similar (exclude user sendiri)
+        if user_idx is not None:
+            user_similarities[user_idx] = 0  # Set similarity dengan diri sendiri ke 0
+        
+        similar_users = _top_n(user_similarities, n_recommendations + 1)[1:]
+        ai_logger.logger.info(f"   Selected top {len(similar_users)} similar users")
+        
+        # Log similar users dengan detail
+        for i, similar_idx in enumerate(similar_users, 1):
+            similarity = user_similarities[similar_idx]
+            similar_user_id = user_item_matrix.user_ids[similar_idx]
+            ai_logger.logger.info(f"      {i}. User {similar_user_id} - Similarity: {similarity:.4f}")
+        
+        # Prediksi rating (weighted average rating user yang similar) untuk semua buku:
+        # satu perkalian vektor bobot x baris tetangga
+        weights = user_similarities[similar_users]
+        if weights.sum() <= 0:
+            ai_logger.logger.info("   Similar users have no co-ratings with this user")
+            return None
+        return np.asarray(weights @ user_item_matrix.matrix[similar_users]).ravel() / weights.sum()
+    
+    def _predict_als(self, als_model, user_item_matrix, user_id: str, read_cols: np.ndarray,
+                     read_ratings: np.ndarray) -> Optional[np.ndarray]:
+        """Prediksi rating semua buku dari faktor ALS; None jika user tidak bisa di-fold-in"""
+        from utils.logger import ai_logger
+        
+        positions = als_model.item_positions(user_item_matrix.book_ids)
+        user_row = als_model.user_row(user_id)
+        # Faktor hasil training hanya dipakai jika rating user persis sama dengan saat training:
+        # tidak ada rating di overlay dan checksum baris (buku, rating) tidak berubah
+        fresh = (
+            user_row is not None
+            and not self.catalog_store.rating_overlay.cells(user_id)
+            and als_model.rating_checksums[user_row] == rating_checksum(user_item_matrix.book_ids[read_cols], read_ratings)
+        )
+        if fresh:
+            user_vector = als_model.user_factors[user_row]
+        else:
+            # User baru atau rating berubah setelah training: fold-in dengan satu solve least-squares
+            item_rows = positions[read_cols]
+            known = item_rows >= 0
+            if not known.any():
+                ai_logger.logger.info("   None of the user's books are in the ALS model")
+                return None
+            user_vector = als_model.fold_in(item_rows[known], read_ratings[known])
+            ai_logger.logger.info(f"   Folded in user from {int(known.sum())} ratings")
+        
+        scores = als_model.predict(user_vector)
+        predicted = np.full(len(user_item_matrix.book_ids), -np.inf)
+        in_model = positions >= 0
+        predicted[in_model] = scores[positions[in_model]]
+        return predicted
+    
+    def _get_book_by_id(self, book_id: str, snapshot: Optional[CatalogSnapshot] = None) -> Optional[Dict[str, Any]]:
+        """Mendapatkan data buku berdasarkan ID"""
+        snapshot = snapshot or self.snapshot
+        index = self._get_book_index(book_id, snapshot)
+        if index is None:
+            return None
+        return self._get_book_by_index(index, snapshot)
+    
+    def get_ai_enhanced_recommendations(self, user_preferences: str, n_recommendations: int = 5,
+                                        with_scores: bool = False) -> List[Dict[str, Any]]:
+        """Mendapatkan rekomendasi dari teks preferensi (ekspansi query lokal, diperkaya LLM bila sempat)"""
         from utils.logger import ai_logger
         
         try:
             ai_logger.logger.info(f"AI-ENHANCED: Processing user preferences")
             ai_logger.logger.info(f"   User Preferences: {user_preferences[:100] + '...' if len(user_preferences) > 100 else user_preferences}")
             
-            if not openai.api_key or self.books_df.empty:
-                ai_logger.logger.warning("   OpenAI API key not available or no books data")
+            # Satu snapshot untuk seluruh request agar konsisten selama hot-swap
+            snapshot = self.snapshot
+            if snapshot.books_df.empty or snapshot.tfidf_vectorizer is None:
+                ai_logger.logger.warning("   No books data available")
                 return []
             
-            ai_logger.logger.info("   Calling OpenAI API for keyword extraction...")
-            
-            # Gunakan OpenAI untuk menganalisis preferensi user
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "Anda adalah asisten yang ahli dalam menganalisis preferensi buku. Berikan 5 kata kunci yang relevan untuk pencarian buku."},
-                    {"role": "user", "content": f"Analisis preferensi buku berikut dan berikan 5 kata kunci yang relevan: {user_preferences}"}
-                ],
-                max_tokens=100
-            )
-            
-            # Ekstrak kata kunci dari respons OpenAI
-            keywords_text = response.choices[0].message.content.strip()
-            keywords = [kw.strip() for kw in keywords_text.split('\n') if kw.strip()]
-            
-            ai_logger.logger.info(f"   Extracted keywords: {', '.join(keywords)}")
-            
-            # Tambahkan kata kunci ke query pencarian
-            search_query = ' '.join(keywords)
-            ai_logger.logger.info(f"   Search query: {search_query}")
+            query_vector, keywords = self._preference_query(user_preferences, snapshot)
+            if query_vector is None or query_vector.nnz == 0:
+                ai_logger.logger.warning("   No known terms in user preferences")
+                return []
             
             # Gunakan TF-IDF untuk mencari buku yang cocok
-            query_vector = self.tfidf_vectorizer.transform([search_query])
-            cosine_similarities = cosine_similarity(
-                query_vector,
-                self.tfidf_matrix
-            ).flatten()
-            
-            ai_logger.logger.info(f"   Calculated {len(cosine_similarities)} relevance scores")
-            ai_logger.logger.info(f"   Relevance range: {cosine_similarities.min():.4f} - {cosine_similarities.max():.4f}")
-            
-            # Dapatkan indeks buku yang paling cocok
-            similar_indices = cosine_similarities.argsort()[-n_recommendations:][::-1]
+            if snapshot.content_ann is not None:
+                # Katalog besar: kandidat dari index ANN, di-rerank dengan cosine exact
+                neighbors, scores = snapshot.content_ann.query(query_vector, n_recommendations)
+                valid = neighbors[0] >= 0
+                similar_indices, similar_scores = neighbors[0][valid], scores[0][valid]
+                ai_logger.logger.info(f"   ANN lookup ({snapshot.content_ann.name})")
+            else:
+                cosine_similarities = cosine_similarity(
+                    query_vector,
+                    snapshot.tfidf_matrix
+                ).flatten()
+                
+                ai_logger.logger.info(f"   Calculated {len(cosine_similarities)} relevance scores")
+                ai_logger.logger.info(f"   Relevance range: {cosine_similarities.min():.4f} - {cosine_similarities.max():.4f}")
+                
+                # Dapatkan indeks buku yang paling cocok
+                similar_indices = cosine_similarities.argsort()[-n_recommendations:][::-1]
+                similar_scores = cosine_similarities[similar_indices]
             ai_logger.logger.info(f"   Selected top {len(similar_indices)} relevant books")
             
             # Dapatkan detail buku yang direkomendasikan
             recommendations = []
-            for i, idx in enumerate(similar_indices, 1):
-                book_data = self._get_book_by_index(idx)
+            for i, (idx, relevance_score) in enumerate(zip(similar_indices, similar_scores), 1):
+                book_data = self._get_book_by_index(idx, snapshot)
                 if book_data:
-                    relevance_score = float(cosine_similarities[idx])
-                    # Simpan score dan keywords hanya untuk internal logging
+                    relevance_score = float(relevance_score)
+                    # Simpan score dan keywords hanya untuk internal logging dan fusion
                     book_data['_internal_relevance_score'] = relevance_score
                     book_data['_internal_keywords'] = keywords
-                    # Hapus score dan keywords dari response user
-                    clean_book_data = {k: v for k, v in book_data.items() if not k.startswith('_')}
-                    recommendations.append(clean_book_data)
+                    recommendations.append(book_data)
                     ai_logger.logger.info(f"      {i}. {book_data.get('title', 'N/A')} - Relevance: {relevance_score:.4f}")
                     ai_logger.logger.info(f"         Keywords: {', '.join(keywords)}")
             
             ai_logger.logger.info(f"   AI-Enhanced: Generated {len(recommendations)} recommendations")
-            return recommendations
+            # Hapus score dan keywords dari response user
+            return recommendations if with_scores else _strip_internal(recommendations)
             
         except Exception as e:
             ai_logger.log_error("AIEnhancedRecommendation", str(e))
             return []
     
+    def _preference_query(self, user_preferences: str, snapshot: CatalogSnapshot):
+        """Vektor query TF-IDF dan kata kunci untuk teks preferensi
+
+        Jalur default adalah ekspansi lokal snapshot (term, co-occurrence, keyword/genre) tanpa
+        panggilan jaringan. Jika provider LLM tersedia, kata kuncinya ditambahkan selama selesai dalam
+        AI_KEYWORD_LLM_BUDGET detik; panggilan yang melewati budget tetap berjalan dan mengisi
+        keyword_cache sehingga request berikutnya dengan teks yang sama langsung memakainya.
+        """
+        from utils.logger import ai_logger
+        
+        expander = snapshot.query_expander
+        local_vector, keywords = None, []
+        if expander is not None:
+            start_time = time.perf_counter()
+            local_vector, details = expander.expand(user_preferences)
+            keywords = list(details['phrases'])
+            ai_logger.logger.info(
+                f"   Local expansion: {details['terms']} terms, {len(details['phrases'])} phrases, "
+                f"{details['features']} features ({(time.perf_counter() - start_time) * 1000:.3f} ms)"
+            )
+        
+        llm_keywords: List[str] = []
+        if self.llm.available() and Config.AI_KEYWORD_LLM_ENABLED:
+            # Kata kunci dari cache; LLM hanya dipanggil sekali per teks preferensi (ternormalisasi)
+            future = self._llm_executor.submit(self.keyword_cache.get_or_compute, user_preferences, self._extract_keywords)
+            try:
+                # Tanpa vektor lokal tidak ada fallback, jadi tunggu LLM sampai selesai
+                llm_keywords = future.result(timeout=Config.AI_KEYWORD_LLM_BUDGET if local_vector is not None else None)
+                ai_logger.logger.info(f"   Extracted keywords: {', '.join(llm_keywords)}")
+            except FutureTimeoutError:
+                ai_logger.logger.warning(f"   LLM keyword extraction exceeded {Config.AI_KEYWORD_LLM_BUDGET}s budget, using local expansion")
+            except Exception as e:
+                ai_logger.log_error("AIEnhancedRecommendation", f"Keyword extraction failed: {str(e)}")
+        
+        if not llm_keywords:
+            if local_vector is None and expander is None:
+                local_vector = snapshot.tfidf_vectorizer.transform([user_preferences])
+            return local_vector, keywords
+        
+        search_query = ' '.join(llm_keywords)
+        ai_logger.logger.info(f"   Search query: {search_query}")
+        llm_vector = expander.expand(search_query)[0] if expander is not None else snapshot.tfidf_vectorizer.transform([search_query])
+        keywords = llm_keywords + [keyword for keyword in keywords if keyword not in llm_keywords]
+        if local_vector is None or llm_vector is None or llm_vector.nnz == 0:
+            return (llm_vector if llm_vector is not None else local_vector), keywords
+        return normalize(local_vector + llm_vector), keywords
+    
+    def _extract_keywords(self, user_preferences: str) -> List[str]:
+        """Ekstraksi 5 kata kunci preferensi dengan provider LLM (dipanggil lewat keyword_cache)"""
+        from utils.logger import ai_logger
+        
+        ai_logger.logger.info(f"   Calling LLM provider '{self.llm.name}' for keyword extraction...")
+        
+        # Gunakan LLM untuk menganalisis preferensi user
+        keywords_text = self.llm.complete(
+            [
+                {"role": "system", "content": "Anda adalah asisten yang ahli dalam menganalisis preferensi buku. Berikan 5 kata kunci yang relevan untuk pencarian buku."},
+                {"role": "user", "content": f"Analisis preferensi buku berikut dan berikan 5 kata kunci yang relevan: {user_preferences}"}
+            ],
+            max_tokens=100
+        ).strip()
+        
+        # Ekstrak kata kunci dari respons LLM
+        return [kw.strip() for kw in keywords_text.split('\n') if kw.strip()]
+    
     def get_hybrid_recommendations(self, user_id: Optional[str] = None, book_id: Optional[str] = None, 
-                                 user_preferences: Optional[str] = None, n_recommendations: int = 5) -> Dict[str, List[Dict[str, Any]]]:
-        """Mendapatkan rekomendasi hybrid dari semua metode"""
-        import time
+                                 user_preferences: Optional[str] = None, n_recommendations: int = 5,
+                                 with_metadata: bool = False, mode: str = 'separate',
+                                 fusion: Optional[str] = None):
+        """Mendapatkan rekomendasi hybrid dari semua metode
+        
+        mode 'separate' mengembalikan tiga daftar per metode; mode 'fused' mengembalikan
+        {'fused': [...]}, satu daftar hasil fuse_recommendations (fusion 'weighted' atau 'rrf',
+        default Config.HYBRID_FUSION_METHOD) atas kandidat setiap metode.
+        
+        Request yang hanya berisi user_id dilayani dari tabel precomputed (daftar content_based dan
+        collaborative, atau fused) jika dokumennya masih segar; selain itu dihitung live.
+        
+        Strategi yang diminta dijalankan paralel di executor terbatas, masing-masing dengan timeout
+        sendiri dan semuanya dibatasi HYBRID_DEADLINE. Strategi yang melewati batas menghasilkan daftar
+        kosong dan ditandai timed_out (panggilannya tetap selesai di background dan mengisi cache
+        strategi tersebut). with_metadata=True mengembalikan (recommendations, metadata).
+        
+        Hasil di-cache per (user, buku, preferensi, n, versi model); entri milik user_id
+        diinvalidasi saat user tersebut memberi rating baru.
+        """
         from utils.logger import ai_logger
         
         start_time = time.time()
+        fusion = fusion or Config.HYBRID_FUSION_METHOD
+        if mode not in HYBRID_MODES or fusion not in FUSION_METHODS:
+            raise ValueError(f"Unknown hybrid mode '{mode}' or fusion '{fusion}'")
+        
+        snapshot = self.snapshot
+        cache_key = ('hybrid', mode, fusion if mode == 'fused' else None, str(user_id) if user_id else None, str(book_id) if book_id else None,
+                     user_preferences or None, n_recommendations, snapshot.version,
+                     self.catalog_store.rating_overlay.user_version(user_id) if user_id else 0)
+        cached = self.result_cache.get(cache_key)
+        if cached is not None:
+            ai_logger.logger.info(f"HYBRID RECOMMENDATION cache hit for user {user_id or 'None'}")
+            metadata = {'cached': True, 'mode': mode, 'total_seconds': round(time.time() - start_time, 3), 'strategies': {}}
+            return (cached, metadata) if with_metadata else cached
+        
+        # Request yang hanya berisi user_id dilayani dari tabel job batch selama dokumennya segar
+        if user_id and not book_id and not user_preferences:
+            precomputed = self._get_precomputed_hybrid(user_id, n_recommendations, mode, fusion, snapshot)
+            if precomputed is not None:
+                self.result_cache.put(cache_key, precomputed, user_id=user_id)
+                metadata = {'cached': False, 'precomputed': True, 'mode': mode,
+                            'total_seconds': round(time.time() - start_time, 3), 'strategies': {}}
+                return (precomputed, metadata) if with_metadata else precomputed
         
         # Log request
         ai_logger.logger.info(f"HYBRID RECOMMENDATION REQUEST")
@@ -408,86 +714,109 @@ class RecommendationService:
         ai_logger.logger.info(f"   Book ID: {book_id or 'None'}")
         ai_logger.logger.info(f"   User Preferences: {user_preferences[:100] + '...' if user_preferences and len(user_preferences) > 100 else user_preferences or 'None'}")
         ai_logger.logger.info(f"   N Recommendations: {n_recommendations}")
+        ai_logger.logger.info(f"   Mode: {mode}{f' ({fusion})' if mode == 'fused' else ''}")
         
+        # Mode fused mengambil kandidat lebih banyak per metode agar irisan antar metode ikut terhitung
+        n_candidates = n_recommendations * Config.HYBRID_FUSION_CANDIDATES if mode == 'fused' else n_recommendations
         recommendations = {
             'content_based': [],
             'collaborative': [],
             'ai_enhanced': []
         }
         
-        # Content-based recommendations
-        if book_id:
-            ai_logger.logger.info(f"Generating Content-Based Recommendations for book: {book_id}")
-            content_start = time.time()
-            recommendations['content_based'] = self.get_content_based_recommendations(
-                book_id, n_recommendations
-            )
-            content_time = time.time() - content_start
-            ai_logger.logger.info(f"   Content-Based: {len(recommendations['content_based'])} recommendations in {content_time:.3f}s")
-            
-            # Log scoring details (menggunakan internal data)
-            for i, rec in enumerate(recommendations['content_based'], 1):
-                # Ambil score dari internal data untuk logging
-                internal_score = getattr(rec, '_internal_similarity_score', 0)
-                ai_logger.logger.info(f"      {i}. {rec.get('title', 'N/A')} - Score: {internal_score:.4f}")
-        
-        # Collaborative filtering recommendations
-        if user_id:
-            ai_logger.logger.info(f"Generating Collaborative Recommendations for user: {user_id}")
-            collab_start = time.time()
-            recommendations['collaborative'] = self.get_collaborative_recommendations(
-                user_id, n_recommendations
-            )
-            collab_time = time.time() - collab_start
-            ai_logger.logger.info(f"   Collaborative: {len(recommendations['collaborative'])} recommendations in {collab_time:.3f}s")
-            
-            # Log scoring details (menggunakan internal data)
-            for i, rec in enumerate(recommendations['collaborative'], 1):
-                # Ambil rating dari internal data untuk logging
-                internal_rating = getattr(rec, '_internal_predicted_rating', 0)
-                ai_logger.logger.info(f"      {i}. {rec.get('title', 'N/A')} - Predicted Rating: {internal_rating:.2f}")
-        
-        # AI-enhanced recommendations
-        if user_preferences:
-            ai_logger.logger.info(f"Generating AI-Enhanced Recommendations")
-            ai_start = time.time()
-            recommendations['ai_enhanced'] = self.get_ai_enhanced_recommendations(
-                user_preferences, n_recommendations
-            )
-            ai_time = time.time() - ai_start
-            ai_logger.logger.info(f"   AI-Enhanced: {len(recommendations['ai_enhanced'])} recommendations in {ai_time:.3f}s")
-            
-            # Log scoring details (menggunakan internal data)
-            for i, rec in enumerate(recommendations['ai_enhanced'], 1):
-                # Ambil score dan keywords dari internal data untuk logging
-                internal_relevance = getattr(rec, '_internal_relevance_score', 0)
-                internal_keywords = getattr(rec, '_internal_keywords', [])
-                ai_logger.logger.info(f"      {i}. {rec.get('title', 'N/A')} - Relevance Score: {internal_relevance:.4f}")
-                if internal_keywords:
-                    ai_logger.logger.info(f"         Keywords: {', '.join(internal_keywords)}")
+        # section -> (input, label, timeout, panggilan strategi)
+        strategies = {
+            'content_based': (book_id, 'Content-Based', Config.HYBRID_CONTENT_TIMEOUT,
+                              lambda: self.get_content_based_recommendations(book_id, n_candidates, with_scores=True)),
+            'collaborative': (user_id, 'Collaborative', Config.HYBRID_COLLABORATIVE_TIMEOUT,
+                              lambda: self.get_collaborative_recommendations(user_id, n_candidates, with_scores=True)),
+            'ai_enhanced': (user_preferences, 'AI-Enhanced', Config.HYBRID_AI_TIMEOUT,
+                            lambda: self.get_ai_enhanced_recommendations(user_preferences, n_candidates, with_scores=True))
+        }
+        futures = {
+            section: self._hybrid_executor.submit(_timed_call, call)
+            for section, (value, _, _, call) in strategies.items() if value
+        }
+        ai_logger.logger.info(f"   Running {', '.join(strategies[section][1] for section in futures)} in parallel (deadline {Config.HYBRID_DEADLINE}s)")
+        
+        deadline = start_time + Config.HYBRID_DEADLINE
+        strategy_metadata = {}
+        for section, future in futures.items():
+            _, label, timeout, _ = strategies[section]
+            try:
+                results, seconds = future.result(timeout=max(min(start_time + timeout, deadline) - time.time(), 0))
+                recommendations[section] = results
+                strategy_metadata[section] = {'seconds': round(seconds, 3), 'timed_out': False, 'count': len(results)}
+                ai_logger.logger.info(f"   {label}: {len(results)} recommendations in {seconds:.3f}s")
+            except FutureTimeoutError:
+                waited = time.time() - start_time
+                strategy_metadata[section] = {'seconds': round(waited, 3), 'timed_out': True, 'count': 0}
+                ai_logger.logger.warning(f"   {label}: timed out after {waited:.3f}s (timeout {timeout}s), returning partial results")
+            except Exception as e:
+                strategy_metadata[section] = {'seconds': round(time.time() - start_time, 3), 'timed_out': False, 'count': 0, 'error': str(e)}
+                ai_logger.log_error("HybridRecommendation", f"{label} failed: {str(e)}")
+        
+        # Log scoring details (menggunakan internal data)
+        for i, rec in enumerate(recommendations['content_based'], 1):
+            # Ambil score dari internal data untuk logging
+            internal_score = rec.get('_internal_similarity_score', 0)
+            ai_logger.logger.info(f"      Content-Based {i}. {rec.get('title', 'N/A')} - Score: {internal_score:.4f}")
+        for i, rec in enumerate(recommendations['collaborative'], 1):
+            # Ambil rating dari internal data untuk logging
+            internal_rating = rec.get('_internal_predicted_rating', 0)
+            ai_logger.logger.info(f"      Collaborative {i}. {rec.get('title', 'N/A')} - Predicted Rating: {internal_rating:.2f}")
+        for i, rec in enumerate(recommendations['ai_enhanced'], 1):
+            # Ambil score dan keywords dari internal data untuk logging
+            internal_relevance = rec.get('_internal_relevance_score', 0)
+            internal_keywords = rec.get('_internal_keywords', [])
+            ai_logger.logger.info(f"      AI-Enhanced {i}. {rec.get('title', 'N/A')} - Relevance Score: {internal_relevance:.4f}")
+            if internal_keywords:
+                ai_logger.logger.info(f"         Keywords: {', '.join(internal_keywords)}")
+        
+        if mode == 'fused':
+            fusion_start = time.time()
+            result = {'fused': fuse_recommendations(recommendations, n_recommendations, fusion, hybrid_fusion_weights())}
+            ai_logger.logger.info(f"   Fused ({fusion}): {len(result['fused'])} recommendations in {time.time() - fusion_start:.4f}s")
+            for i, rec in enumerate(result['fused'], 1):
+                ai_logger.logger.info(f"      Fused {i}. {rec.get('title', 'N/A')} - Score: {rec['fused_score']:.4f} {rec['sources']}")
+        else:
+            result = {section: _strip_internal(recs) for section, recs in recommendations.items()}
         
         # Calculate total time
         total_time = time.time() - start_time
         
         # Log summary
         total_recommendations = sum(len(recs) for recs in recommendations.values())
+        timed_out = [section for section, meta in strategy_metadata.items() if meta['timed_out']]
         ai_logger.logger.info(f"HYBRID RECOMMENDATION SUMMARY")
         ai_logger.logger.info(f"   Total Recommendations: {total_recommendations}")
         ai_logger.logger.info(f"   Content-Based: {len(recommendations['content_based'])}")
         ai_logger.logger.info(f"   Collaborative: {len(recommendations['collaborative'])}")
         ai_logger.logger.info(f"   AI-Enhanced: {len(recommendations['ai_enhanced'])}")
+        ai_logger.logger.info(f"   Timed Out: {', '.join(timed_out) or 'None'}")
         ai_logger.logger.info(f"   Total Time: {total_time:.3f}s")
         
         # Log performance metrics
         ai_logger.log_performance("HybridRecommendation", "generate", total_time)
         
-        return recommendations
-    
-    def refresh_data(self):
-        """Refresh data dari database"""
-        self._load_data()
+        # Bagian yang diminta tetapi kosong atau terlambat bisa berasal dari kegagalan sementara
+        # (mis. LLM); hasil seperti itu tidak di-cache agar request berikutnya mencoba lagi
+        requested = {'content_based': book_id, 'collaborative': user_id, 'ai_enhanced': user_preferences}
+        if not timed_out and all(recommendations[section] for section, value in requested.items() if value):
+            self.result_cache.put(cache_key, result, user_id=user_id)
+        
+        metadata = {
+            'cached': False,
+            'mode': mode,
+            'deadline_seconds': Config.HYBRID_DEADLINE,
+            'total_seconds': round(total_time, 3),
+            'strategies': strategy_metadata
+        }
+        return (result, metadata) if with_metadata else result
     
-    def __del__(self):
-        """Cleanup saat object dihapus"""
-        if hasattr(self, 'client'):
-            self.client.close() 
\ No newline at end of file
+    def refresh_data(self, wait: bool = False):
+        """Refresh data dari database; default di background lalu di-swap secara atomik"""
+        if wait:
+            self.catalog_store.refresh()
+        else:
+            self.catalog_store.refresh_async() 
\ No newline at end of file
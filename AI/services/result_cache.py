@@ -0,0 +1,132 @@
+import copy
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set
+from config.settings import Config
+
+def estimate_size(value: Any) -> int:
+    """Perkiraan ukuran memori (byte) nilai hasil: dict/list/tuple ditelusuri rekursif"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(key) + estimate_size(item) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(estimate_size(item) for item in value)
+    return size
+
+class ResultCache:
+    """Cache hasil rekomendasi LRU + TTL dengan batas jumlah entri dan batas memori (byte)
+
+    Key sebaiknya memuat versi model sehingga entri lama tidak pernah terbaca setelah swap;
+    entri dapat ditandai user_id agar seluruh hasil satu user bisa diinvalidasi sekaligus.
+    Nilai disalin saat disimpan dan dibaca sehingga pemanggil bebas memodifikasinya.
+    """
+
+    def __init__(self, name: str = 'results', max_entries: Optional[int] = None,
+                 max_bytes: Optional[int] = None, ttl: Optional[float] = None,
+                 enabled: Optional[bool] = None):
+        """Inisialisasi ResultCache"""
+        self.name = name
+        self.max_entries = max_entries or Config.RESULT_CACHE_MAX_ENTRIES
+        self.max_bytes = max_bytes or Config.RESULT_CACHE_MAX_BYTES
+        self.ttl = ttl or Config.CACHE_TTL
+        self.enabled = Config.CACHE_ENABLED if enabled is None else enabled
+        # key -> (expires_at, size, user_id, value)
+        self._entries: OrderedDict = OrderedDict()
+        self._user_keys: Dict[str, Set[Hashable]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Nilai tersimpan untuk key, atau None jika tidak ada/kedaluwarsa"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.time():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[3]
+        return copy.deepcopy(value)
+
+    def put(self, key: Hashable, value: Any, user_id: Optional[Any] = None):
+        """Simpan nilai; entri paling lama tidak dipakai dibuang sampai batas terpenuhi"""
+        if not self.enabled:
+            return
+        value = copy.deepcopy(value)
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        user_key = str(user_id) if user_id is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.time() + self.ttl, size, user_key, value)
+            self._bytes += size
+            if user_key is not None:
+                self._user_keys.setdefault(user_key, set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: Any) -> int:
+        """Hapus semua entri milik satu user; kembalikan jumlah entri yang dihapus"""
+        with self._lock:
+            keys = self._user_keys.pop(str(user_id), set())
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        """Kosongkan cache (counter tetap)"""
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Hashable):
+        """Hapus satu entri; dipanggil dengan _lock dipegang"""
+        _, size, user_key, _ = self._entries.pop(key)
+        self._bytes -= size
+        if user_key is not None:
+            keys = self._user_keys.get(user_key)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._user_keys[user_key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Counter hit/miss/eviction dan ukuran cache untuk endpoint metrics"""
+        lookups = self.hits + self.misses
+        return {
+            'name': self.name,
+            'enabled': self.enabled,
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations
+        }
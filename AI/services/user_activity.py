@@ -0,0 +1,133 @@
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from config.settings import Config
+
+# Koleksi aktivitas user dan field timestamp yang dipakai watermark polling
+ACTIVITY_COLLECTIONS = {
+    'borrowings': ('updatedAt', 'borrow_date', 'return_date'),
+    'user_interactions': ('timestamp', 'updatedAt'),
+    'ratings': ('rating_date', 'timestamp')
+}
+
+class UserActivityWatcher:
+    """Memberi tahu listener setiap kali borrowings, user_interactions atau ratings seorang user berubah
+
+    Memakai change stream MongoDB jika server mendukungnya (replica set / sharded). Pada server
+    standalone watcher turun ke polling berbasis watermark timestamp per koleksi setiap
+    poll_interval detik. Dokumen yang dihapus tidak terdeteksi saat polling; pemakai sebaiknya
+    tetap memasang TTL.
+    """
+
+    def __init__(self, db, poll_interval: Optional[float] = None,
+                 collections: Optional[Dict[str, Tuple[str, ...]]] = None):
+        """Inisialisasi UserActivityWatcher"""
+        self.db = db
+        self.poll_interval = poll_interval or Config.USER_ACTIVITY_POLL_INTERVAL
+        self.collections = collections or ACTIVITY_COLLECTIONS
+        self.mode: Optional[str] = None
+        self.events = 0
+        self.notified_users = 0
+        self._listeners: List[Callable[[str], Any]] = []
+        # Hanya perubahan setelah watcher dibuat yang relevan bagi cache yang dibangun setelahnya.
+        # Backend menyimpan tanggal BSON dalam UTC dan pymongo mengembalikannya naive UTC, jadi
+        # batas jendela juga naive UTC (bukan waktu lokal host)
+        started_at = datetime.utcnow()
+        self._watermarks: Dict[str, datetime] = {name: started_at for name in self.collections}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_listener(self, callback: Callable[[str], Any]):
+        """Daftarkan callback(user_id) yang dipanggil saat aktivitas user berubah"""
+        self._listeners.append(callback)
+
+    def _notify(self, user_ids):
+        """Panggil semua listener untuk setiap user; error listener tidak menghentikan watcher"""
+        from utils.logger import ai_logger
+
+        for user_id in user_ids:
+            self.notified_users += 1
+            for callback in self._listeners:
+                try:
+                    callback(user_id)
+                except Exception as e:
+                    ai_logger.log_error("UserActivityWatcher", f"Listener failed for {user_id}: {str(e)}")
+
+    def poll_once(self) -> int:
+        """Satu siklus polling; kembalikan jumlah user yang aktivitasnya berubah"""
+        changed = set()
+        # MongoDB menyimpan datetime dengan presisi milidetik; batas dibulatkan ke bawah dan dipakai
+        # inklusif di kedua sisi sehingga dokumen pada milidetik batas tidak terlewat
+        now = datetime.utcnow()
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        for collection_name, fields in self.collections.items():
+            # Jendela [watermark, now]: timestamp di masa depan (mis. rencana tanggal kembali)
+            # tidak terus-menerus dianggap perubahan
+            window = {'$gte': self._watermarks[collection_name], '$lte': now}
+            query = {'$or': [{field: window} for field in fields]}
+            for document in self.db[collection_name].find(query, {'user_id': 1}):
+                if document.get('user_id') is not None:
+                    changed.add(str(document['user_id']))
+            self._watermarks[collection_name] = now
+        self.events += len(changed)
+        self._notify(changed)
+        return len(changed)
+
+    def _watch(self):
+        """Konsumsi change stream database sampai watcher dihentikan"""
+        pipeline = [{'$match': {
+            'ns.coll': {'$in': list(self.collections)},
+            'operationType': {'$in': ['insert', 'update', 'replace']}
+        }}]
+        with self.db.watch(pipeline, full_document='updateLookup', max_await_time_ms=1000) as stream:
+            self.mode = 'change_stream'
+            while not self._stop_event.is_set():
+                change = stream.try_next()
+                if change is None:
+                    continue
+                user_id = (change.get('fullDocument') or {}).get('user_id')
+                if user_id is not None:
+                    self.events += 1
+                    self._notify([str(user_id)])
+
+    def start(self):
+        """Jalankan watcher di background thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='user-activity-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Hentikan watcher"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval)
+
+    def _run(self):
+        from utils.logger import ai_logger
+
+        try:
+            self._watch()
+            return
+        except Exception as e:
+            if self._stop_event.is_set():
+                return
+            ai_logger.logger.warning(f"Change streams unavailable ({str(e)}), polling user activity every {self.poll_interval}s")
+
+        self.mode = 'poll'
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.poll_once()
+            except Exception as e:
+                ai_logger.log_error("UserActivityWatcher", str(e))
+
+    def status(self) -> Dict[str, Any]:
+        """Status watcher untuk endpoint monitoring"""
+        return {
+            'running': bool(self._thread and self._thread.is_alive()),
+            'mode': self.mode,
+            'events': self.events,
+            'notified_users': self.notified_users,
+            'poll_interval_seconds': self.poll_interval
+        }
@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+from functools import cached_property
+from scipy import sparse
+from sklearn.preprocessing import normalize
+from typing import Any, Dict, Optional, Tuple
+
+class UserItemMatrix:
+    """User-item matrix sparse (CSR users x books) dengan dimensi user/buku berkode integer
+
+    Baris ke-i adalah user_ids[i], kolom ke-j adalah book_ids[j]; sel kosong berarti belum dirating.
+    """
+
+    def __init__(self, matrix: sparse.csr_matrix, user_ids: np.ndarray, book_ids: np.ndarray):
+        """Inisialisasi UserItemMatrix"""
+        self.matrix = matrix
+        self.user_ids = user_ids
+        self.book_ids = book_ids
+        self._user_rows: Dict[str, int] = {user_id: row for row, user_id in enumerate(user_ids)}
+        self._book_cols: Dict[str, int] = {book_id: col for col, book_id in enumerate(book_ids)}
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.matrix.shape
+
+    @property
+    def empty(self) -> bool:
+        return self.matrix.nnz == 0
+
+    @property
+    def nnz(self) -> int:
+        return self.matrix.nnz
+
+    def user_row(self, user_id: Any) -> Optional[int]:
+        """Baris untuk user_id, atau None jika user belum pernah memberi rating"""
+        return self._user_rows.get(str(user_id)) if user_id is not None else None
+
+    def book_col(self, book_id: Any) -> Optional[int]:
+        """Kolom untuk book_id, atau None jika buku belum pernah dirating"""
+        return self._book_cols.get(str(book_id)) if book_id is not None else None
+
+    def __contains__(self, user_id: Any) -> bool:
+        return self.user_row(user_id) is not None
+
+    def get(self, user_id: Any, book_id: Any, default: float = 0.0) -> float:
+        """Nilai rating satu sel"""
+        row, col = self.user_row(user_id), self.book_col(book_id)
+        if row is None or col is None:
+            return default
+        return float(self.matrix[row, col])
+
+    def user_ratings(self, row: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(kolom buku, nilai rating) yang dirating user pada baris tersebut"""
+        start, end = self.matrix.indptr[row], self.matrix.indptr[row + 1]
+        return self.matrix.indices[start:end], self.matrix.data[start:end]
+
+    @cached_property
+    def normalized(self) -> sparse.csr_matrix:
+        """Baris dinormalisasi L2 sehingga perkalian baris = cosine similarity antar user"""
+        return normalize(self.matrix)
+
+    @cached_property
+    def item_matrix(self) -> sparse.csc_matrix:
+        """Representasi CSC untuk akses per kolom buku"""
+        return self.matrix.tocsc()
+
+    def to_frame(self) -> pd.DataFrame:
+        """Konversi ke DataFrame dense (hanya untuk debugging katalog kecil)"""
+        return pd.DataFrame(
+            self.matrix.toarray(),
+            index=pd.Index(self.user_ids, name='user_id'),
+            columns=pd.Index(self.book_ids, name='book_id')
+        )
+
+    def with_updates(self, cells: pd.DataFrame, removed: Optional[pd.DataFrame] = None) -> 'UserItemMatrix':
+        """Matrix baru dengan sel (user_id, book_id, rating_value) diganti/ditambahkan; matrix ini tidak berubah
+
+        Sel pada koordinat removed (user_id, book_id) dibuang lebih dulu, lalu cells diterapkan.
+        """
+        cells = _clean_cells(cells)
+        existing = self.matrix.tocoo()
+        if removed is not None and not removed.empty:
+            removed_rows = np.array([self._user_rows.get(str(user_id), -1) for user_id in removed['user_id']], dtype=np.int64)
+            removed_cols = np.array([self._book_cols.get(str(book_id), -1) for book_id in removed['book_id']], dtype=np.int64)
+            known = (removed_rows >= 0) & (removed_cols >= 0)
+            n_cols = max(self.shape[1], 1)
+            drop = np.isin(existing.row.astype(np.int64) * n_cols + existing.col,
+                           removed_rows[known] * n_cols + removed_cols[known])
+            if drop.any():
+                existing = sparse.coo_matrix(
+                    (existing.data[~drop], (existing.row[~drop], existing.col[~drop])), shape=self.shape
+                )
+            elif cells.empty:
+                return self
+        elif cells.empty:
+            return self
+
+        new_users = pd.Index(cells['user_id'].unique()).difference(pd.Index(self.user_ids), sort=False)
+        new_books = pd.Index(cells['book_id'].unique()).difference(pd.Index(self.book_ids), sort=False)
+        user_ids = np.concatenate([self.user_ids, new_users.to_numpy(dtype=object)])
+        book_ids = np.concatenate([self.book_ids, new_books.to_numpy(dtype=object)])
+
+        rows = pd.Index(user_ids).get_indexer(cells['user_id'])
+        cols = pd.Index(book_ids).get_indexer(cells['book_id'])
+
+        # Sel lama diikuti sel baru; untuk pasangan yang sama entri terakhir (baru) yang dipakai
+        all_rows = np.concatenate([existing.row, rows])
+        all_cols = np.concatenate([existing.col, cols])
+        all_values = np.concatenate([existing.data, cells['rating_value'].to_numpy(dtype=np.float64)])
+        matrix = _csr_keep_last(all_rows, all_cols, all_values, (len(user_ids), len(book_ids)))
+        return UserItemMatrix(matrix, user_ids, book_ids)
+
+    @classmethod
+    def from_ratings(cls, ratings_df: pd.DataFrame) -> 'UserItemMatrix':
+        """Bangun matrix dari ratings; pasangan (user_id, book_id) duplikat memakai rating terbaru"""
+        cells = _clean_cells(ratings_df)
+        if cells.empty:
+            return cls.create_empty()
+
+        user_codes, user_ids = pd.factorize(cells['user_id'])
+        book_codes, book_ids = pd.factorize(cells['book_id'])
+        matrix = _csr_keep_last(
+            user_codes, book_codes, cells['rating_value'].to_numpy(dtype=np.float64),
+            (len(user_ids), len(book_ids))
+        )
+        return cls(matrix, np.asarray(user_ids, dtype=object), np.asarray(book_ids, dtype=object))
+
+    @classmethod
+    def create_empty(cls) -> 'UserItemMatrix':
+        return cls(sparse.csr_matrix((0, 0), dtype=np.float64), np.empty(0, dtype=object), np.empty(0, dtype=object))
+
+def _clean_cells(ratings_df: pd.DataFrame) -> pd.DataFrame:
+    """Ambil kolom sel rating yang valid, diurutkan agar rating terbaru berada di akhir"""
+    required = ['user_id', 'book_id', 'rating_value']
+    if ratings_df.empty or any(column not in ratings_df.columns for column in required):
+        return pd.DataFrame(columns=required)
+
+    cells = ratings_df.dropna(subset=required)
+    if 'rating_date' in cells.columns:
+        cells = cells.sort_values('rating_date', kind='stable', na_position='first')
+    cells = cells[required].copy()
+    cells['user_id'] = cells['user_id'].astype(str)
+    cells['book_id'] = cells['book_id'].astype(str)
+    return cells
+
+def _csr_keep_last(rows: np.ndarray, cols: np.ndarray, values: np.ndarray, shape) -> sparse.csr_matrix:
+    """CSR dari koordinat; koordinat duplikat memakai nilai terakhir (bukan dijumlahkan)"""
+    keys = rows.astype(np.int64) * max(shape[1], 1) + cols
+    # Urutan terbalik + unique mengambil kemunculan terakhir setiap key
+    _, last = np.unique(keys[::-1], return_index=True)
+    keep = len(keys) - 1 - last
+    matrix = sparse.csr_matrix((values[keep], (rows[keep], cols[keep])), shape=shape, dtype=np.float64)
+    matrix.eliminate_zeros()
+    matrix.sort_indices()
+    return matrix
@@ -1,11 +1,17 @@
+import copy
+import threading
 import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
+from collections import OrderedDict
 from sklearn.metrics.pairwise import cosine_similarity
-from pymongo import MongoClient
 from typing import List, Dict, Any, Optional
-import os
 from dotenv import load_dotenv
+from config.settings import Config
+from .catalog_snapshot import CatalogSnapshot, CatalogStore, get_catalog_store
+from .rating_updates import RatingWriteBuffer
+
+# Kolom buku yang digabungkan ke riwayat user
+HISTORY_BOOK_COLUMNS = ['title', 'author', 'genre', 'description']
 
 # Load environment variables
 load_dotenv()
@@ -13,109 +19,128 @@ load_dotenv()
 class UserPreferenceService:
     """Service class untuk menganalisis preferensi pengguna"""
     
-    def __init__(self):
+    def __init__(self, catalog_store: Optional[CatalogStore] = None):
         """Inisialisasi UserPreference Service"""
+        self.catalog_store = catalog_store or get_catalog_store()
+        # Cache profil per user: user_id -> ((versi snapshot, versi overlay user), profil)
+        self._profile_cache: OrderedDict = OrderedDict()
+        self._profile_cache_lock = threading.Lock()
         self._setup_database()
-        self._setup_ml_components()
         self._load_data()
     
     def _setup_database(self):
         """Setup koneksi database"""
-        mongodb_uri = os.getenv('MONGODB_URI')
-        if not mongodb_uri:
-            raise ValueError("MONGODB_URI tidak ditemukan di environment variables")
-        
-        self.client = MongoClient(mongodb_uri)
-        self.db = self.client['smartlibrary']
+        self.db = self.catalog_store.db
         self.books_collection = self.db['books']
         self.ratings_collection = self.db['ratings']
         self.reading_history_collection = self.db['reading_history']
         self.user_interactions_collection = self.db['user_interactions']
-    
-    def _setup_ml_components(self):
-        """Setup komponen machine learning"""
-        self.tfidf_vectorizer = TfidfVectorizer(
-            stop_words='english',
-            max_features=5000,
-            ngram_range=(1, 2)
-        )
+        self.rating_writer = RatingWriteBuffer(self.ratings_collection)
     
     def _load_data(self):
-        """Load data dari MongoDB"""
-        try:
-            # Load buku
-            books_data = list(self.books_collection.find())
-            self.books_df = pd.DataFrame(books_data)
-            
-            # Load ratings
-            ratings_data = list(self.ratings_collection.find())
-            self.ratings_df = pd.DataFrame(ratings_data)
-            
-            # Load reading history
-            reading_history_data = list(self.reading_history_collection.find())
-            self.reading_history_df = pd.DataFrame(reading_history_data)
-            
-            # Load user interactions
-            user_interactions_data = list(self.user_interactions_collection.find())
-            self.user_interactions_df = pd.DataFrame(user_interactions_data)
-            
-            if not self.books_df.empty:
-                self._prepare_content_data()
-            else:
-                print("Warning: Tidak ada data buku yang ditemukan")
-                
-        except Exception as e:
-            print(f"Error loading data: {str(e)}")
-            self.books_df = pd.DataFrame()
-            self.ratings_df = pd.DataFrame()
-            self.reading_history_df = pd.DataFrame()
-            self.user_interactions_df = pd.DataFrame()
+        """Memastikan snapshot katalog bersama sudah dimuat"""
+        return self.catalog_store.snapshot
     
-    def _prepare_content_data(self):
-        """Mempersiapkan data untuk content-based filtering"""
-        # Gabungkan semua informasi buku
-        self.books_df['content'] = (
-            self.books_df['title'].fillna('') + ' ' +
-            self.books_df['description'].fillna('') + ' ' +
-            self.books_df['author'].fillna('') + ' ' +
-            self.books_df['genre'].fillna('')
-        )
-        
-        # Buat TF-IDF matrix
-        self.tfidf_matrix = self.tfidf_vectorizer.fit_transform(self.books_df['content'])
+    @property
+    def snapshot(self) -> CatalogSnapshot:
+        """Snapshot katalog aktif yang dibagi dengan service lain"""
+        return self.catalog_store.snapshot
+    
+    @property
+    def books_df(self) -> pd.DataFrame:
+        return self.snapshot.books_df
+    
+    @property
+    def ratings_df(self) -> pd.DataFrame:
+        return self.snapshot.ratings_df
+    
+    @property
+    def reading_history_df(self) -> pd.DataFrame:
+        return self.snapshot.reading_history_df
+    
+    @property
+    def user_interactions_df(self) -> pd.DataFrame:
+        return self.snapshot.user_interactions_df
     
-    def _get_user_history(self, user_id: str) -> pd.DataFrame:
-        """Mendapatkan riwayat membaca user"""
+    @property
+    def tfidf_vectorizer(self):
+        return self.snapshot.tfidf_vectorizer
+    
+    @property
+    def tfidf_matrix(self):
+        return self.snapshot.tfidf_matrix
+    
+    def _get_user_history(self, user_id: str, snapshot: Optional[CatalogSnapshot] = None) -> pd.DataFrame:
+        """Mendapatkan riwayat membaca user
+        
+        Rating diambil lewat index per user di snapshot ditambah rating baru di overlay,
+        sehingga biayanya sebanding jumlah rating user, bukan ukuran koleksi ratings.
+        """
         try:
-            # Cari dari ratings (sebagai riwayat utama)
-            user_ratings = self.ratings_df[self.ratings_df['user_id'] == user_id]
+            snapshot = snapshot or self.snapshot
+            ratings_df = snapshot.ratings_df
+            reading_history_df = snapshot.reading_history_df
+            
+            # Cari dari ratings (sebagai riwayat utama); rating overlay menimpa rating lama buku yang sama
+            user_ratings = ratings_df.iloc[snapshot.user_rating_rows(user_id)]
+            overlay_ratings = self.catalog_store.rating_overlay.history_frame(user_id)
+            if not overlay_ratings.empty:
+                user_ratings = pd.concat([
+                    user_ratings[~user_ratings['book_id'].astype(str).isin(overlay_ratings['book_id'])],
+                    overlay_ratings
+                ], ignore_index=True)
             if not user_ratings.empty:
-                user_history = user_ratings.merge(
-                    self.books_df[['_id', 'title', 'author', 'genre', 'description']],
-                    left_on='book_id',
-                    right_on='_id',
-                    how='left'
-                )
-                return user_history
+                return self._attach_books(user_ratings, snapshot)
             # Jika tidak ada di ratings, cari dari reading_history
-            user_reading = self.reading_history_df[self.reading_history_df['user_id'] == user_id]
+            user_reading = reading_history_df[reading_history_df['user_id'] == user_id]
             if not user_reading.empty:
-                user_history = user_reading.merge(
-                    self.books_df[['_id', 'title', 'author', 'genre', 'description']],
-                    left_on='book_id',
-                    right_on='_id',
-                    how='left'
-                )
-                return user_history
+                return self._attach_books(user_reading, snapshot)
             return pd.DataFrame()
         except Exception as e:
             print(f"Error mendapatkan riwayat user: {str(e)}")
             return pd.DataFrame()
     
-    def analyze_user_preferences(self, user_id: str) -> Dict[str, List[str]]:
-        """Menganalisis preferensi pengguna berdasarkan riwayat membaca"""
+    def _attach_books(self, history: pd.DataFrame, snapshot: CatalogSnapshot) -> pd.DataFrame:
+        """Left join riwayat dengan detail buku lewat book_index (tanpa merge seluruh books_df)"""
+        history = history.reset_index(drop=True)
+        books_df = snapshot.books_df
+        columns = [column for column in HISTORY_BOOK_COLUMNS if column in books_df.columns]
+        if books_df.empty or not columns:
+            return history
+        
+        positions = snapshot.book_index.positions(history['book_id'])
+        found = positions >= 0
+        books = books_df[columns].iloc[np.where(found, positions, 0)].reset_index(drop=True)
+        books.loc[~found, columns] = np.nan
+        return pd.concat([history.drop(columns=columns, errors='ignore'), books], axis=1)
+    
+    def analyze_user_preferences(self, user_id: str, snapshot: Optional[CatalogSnapshot] = None) -> Dict[str, List[str]]:
+        """Menganalisis preferensi pengguna berdasarkan riwayat membaca
+        
+        Hasil di-cache per user dan berlaku selama snapshot dan rating overlay user tersebut
+        tidak berubah; rating baru hanya menginvalidasi cache user itu sendiri.
+        """
+        # Satu snapshot untuk seluruh request agar konsisten selama hot-swap
+        snapshot = snapshot or self.snapshot
+        cache_key = (snapshot.version, self.catalog_store.rating_overlay.user_version(user_id))
+        with self._profile_cache_lock:
+            cached = self._profile_cache.get(user_id)
+            if cached is not None and cached[0] == cache_key:
+                self._profile_cache.move_to_end(user_id)
+                return copy.deepcopy(cached[1])
+        
+        preferences = self._analyze_user_preferences(user_id, snapshot)
+        with self._profile_cache_lock:
+            self._profile_cache[user_id] = (cache_key, preferences)
+            self._profile_cache.move_to_end(user_id)
+            while len(self._profile_cache) > Config.USER_PROFILE_CACHE_SIZE:
+                self._profile_cache.popitem(last=False)
+        return copy.deepcopy(preferences)
+    
+    def _analyze_user_preferences(self, user_id: str, snapshot: CatalogSnapshot) -> Dict[str, List[str]]:
+        """Analisis preferensi tanpa cache"""
         try:
-            user_history = self._get_user_history(user_id)
+            user_history = self._get_user_history(user_id, snapshot)
             
             if user_history.empty:
                 return {
@@ -143,14 +168,14 @@ class UserPreferenceService:
             if 'description' in user_history.columns:
                 book_descriptions = ' '.join(user_history['description'].fillna('').tolist())
                 if book_descriptions.strip():
-                    topic_vector = self.tfidf_vectorizer.transform([book_descriptions])
-                    topic_similarities = cosine_similarity(topic_vector, self.tfidf_matrix).flatten()
+                    topic_vector = snapshot.tfidf_vectorizer.transform([book_descriptions])
+                    topic_similarities = cosine_similarity(topic_vector, snapshot.tfidf_matrix).flatten()
                     similar_indices = topic_similarities.argsort()[-3:][::-1]
-                    preferred_topics = self.books_df.iloc[similar_indices]['genre'].tolist()
+                    preferred_topics = snapshot.books_df.iloc[similar_indices]['genre'].dropna().tolist()
             
             # Analisis pola membaca
             reading_patterns = {}
-            if 'rating' in user_history.columns:
+            if 'rating' in user_history.columns and user_history['rating'].notna().any():
                 reading_patterns = {
                     'average_rating': float(user_history['rating'].mean()),
                     'total_ratings': int(user_history['rating'].count()),
@@ -175,10 +200,11 @@ class UserPreferenceService:
                 'total_books_read': 0
             }
     
-    def get_user_preference_vector(self, user_id: str) -> Optional[np.ndarray]:
+    def get_user_preference_vector(self, user_id: str, snapshot: Optional[CatalogSnapshot] = None) -> Optional[np.ndarray]:
         """Mendapatkan vektor preferensi pengguna"""
         try:
-            preferences = self.analyze_user_preferences(user_id)
+            snapshot = snapshot or self.snapshot
+            preferences = self.analyze_user_preferences(user_id, snapshot)
             
             # Gabungkan semua preferensi menjadi satu string
             preference_text = ' '.join(preferences['preferred_genres']) + ' ' + \
@@ -189,7 +215,7 @@ class UserPreferenceService:
                 return None
             
             # Transformasi ke vektor TF-IDF
-            preference_vector = self.tfidf_vectorizer.transform([preference_text])
+            preference_vector = snapshot.tfidf_vectorizer.transform([preference_text])
             
             return preference_vector
             
@@ -200,13 +226,15 @@ class UserPreferenceService:
     def find_similar_users(self, user_id: str, n_similar_users: int = 5) -> List[Dict[str, Any]]:
         """Mencari pengguna yang memiliki preferensi serupa"""
         try:
-            user_vector = self.get_user_preference_vector(user_id)
+            # Satu snapshot untuk seluruh request agar konsisten selama hot-swap
+            snapshot = self.snapshot
+            user_vector = self.get_user_preference_vector(user_id, snapshot)
             
-            if user_vector is None or self.tfidf_matrix is None:
+            if user_vector is None or snapshot.tfidf_matrix is None:
                 return []
             
             # Hitung similarity dengan semua buku
-            similarities = cosine_similarity(user_vector, self.tfidf_matrix).flatten()
+            similarities = cosine_similarity(user_vector, snapshot.tfidf_matrix).flatten()
             
             # Dapatkan indeks buku yang paling similar
             similar_indices = similarities.argsort()[-n_similar_users:][::-1]
@@ -214,7 +242,7 @@ class UserPreferenceService:
             # Dapatkan detail buku yang similar
             similar_books = []
             for idx in similar_indices:
-                book_data = self._get_book_by_index(idx)
+                book_data = self._get_book_by_index(idx, snapshot)
                 if book_data:
                     book_data['similarity_score'] = float(similarities[idx])
                     similar_books.append(book_data)
@@ -225,10 +253,10 @@ class UserPreferenceService:
             print(f"Error mencari user serupa: {str(e)}")
             return []
     
-    def _get_book_by_index(self, index: int) -> Optional[Dict[str, Any]]:
+    def _get_book_by_index(self, index: int, snapshot: Optional[CatalogSnapshot] = None) -> Optional[Dict[str, Any]]:
         """Mendapatkan data buku berdasarkan indeks"""
         try:
-            book = self.books_df.iloc[index]
+            book = (snapshot or self.snapshot).books_df.iloc[index]
             return {
                 'book_id': str(book['_id']),
                 'title': book.get('title', 'N/A'),
@@ -255,7 +283,7 @@ class UserPreferenceService:
             
             stats = {
                 'total_books': len(user_history),
-                'average_rating': float(user_history['rating'].mean()) if 'rating' in user_history.columns else 0,
+                'average_rating': float(user_history['rating'].mean()) if 'rating' in user_history.columns and user_history['rating'].notna().any() else 0,
                 'favorite_genre': user_history['genre'].mode().iloc[0] if 'genre' in user_history.columns else None,
                 'favorite_author': user_history['author'].mode().iloc[0] if 'author' in user_history.columns else None,
                 'reading_streak': 0  # TODO: Implement reading streak calculation
@@ -274,8 +302,15 @@ class UserPreferenceService:
             }
     
     def update_user_preferences(self, user_id: str, book_data: Dict[str, Any]):
-        """Memperbarui preferensi pengguna berdasarkan buku yang dibaca"""
+        """Memperbarui preferensi pengguna berdasarkan buku yang dibaca
+        
+        Rating langsung terlihat lewat overlay snapshot (tanpa rebuild) dan hanya cache profil
+        user ini yang diinvalidasi; penulisan ke database di-buffer lalu disimpan per batch.
+        Snapshot memuat rating ini pada sinkronisasi berikutnya dan overlay dibersihkan otomatis.
+        """
         try:
+            rating = book_data.get('rating', 0)
+            timestamp = pd.Timestamp.now()
             # Simpan preferensi baru ke database
             preference_data = {
                 'user_id': user_id,
@@ -284,23 +319,29 @@ class UserPreferenceService:
                 'author': book_data.get('author'),
                 'genre': book_data.get('genre'),
                 'description': book_data.get('description'),
-                'rating': book_data.get('rating', 0),
-                'timestamp': pd.Timestamp.now()
+                'rating': rating,
+                'rating_value': rating,
+                'timestamp': timestamp,
+                'rating_date': timestamp
             }
             
-            self.ratings_collection.insert_one(preference_data)
-            
-            # Refresh data
-            self._load_data()
+            self.catalog_store.rating_overlay.add(user_id, preference_data['book_id'], rating)
+            with self._profile_cache_lock:
+                self._profile_cache.pop(user_id, None)
+            self.rating_writer.add(preference_data)
             
         except Exception as e:
             print(f"Error memperbarui preferensi user: {str(e)}")
     
-    def refresh_data(self):
-        """Refresh data dari database"""
-        self._load_data()
+    def flush_pending_ratings(self) -> int:
+        """Simpan rating yang masih di buffer ke database sekarang juga"""
+        return self.rating_writer.flush()
     
-    def __del__(self):
-        """Cleanup saat object dihapus"""
-        if hasattr(self, 'client'):
-            self.client.close() 
\ No newline at end of file
+    def refresh_data(self, wait: bool = False):
+        """Refresh data dari database; default di background lalu di-swap secara atomik"""
+        # Rating yang masih di buffer harus tersimpan dulu agar ikut termuat
+        self.rating_writer.flush()
+        if wait:
+            self.catalog_store.refresh()
+        else:
+            self.catalog_store.refresh_async() 
\ No newline at end of file
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Script benchmark faktorisasi ALS: waktu training per iterasi, RMSE held-out dan latency serving
+(dot product untuk user hasil training, fold-in untuk user baru)
+
+Data berasal dari ratings sintetis (default) atau ratings MongoDB (--from-db). Sebagian user
+dikeluarkan dari training untuk mengukur fold-in, sebagian rating di-hold-out untuk RMSE.
+"""
+
+import logging
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Tambahkan direktori AI ke path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.als_model import als_training_matrices, train_als
+from tools.benchmark_collaborative import synthetic_ratings
+
+def ratings_from_db() -> pd.DataFrame:
+    """Ratings dari snapshot katalog MongoDB"""
+    from services.catalog_snapshot import CatalogStore
+
+    return CatalogStore(artifact_store=None).snapshot.ratings_df
+
+def _percentile_ms(latencies, q):
+    return np.percentile(latencies, q) * 1000
+
+def run_benchmark(ratings_df: pd.DataFrame, factors: int, iterations: int, workers: int,
+                  n: int = 10, new_user_ratio: float = 0.05, holdout_ratio: float = 0.1, seed: int = 11):
+    """Training ALS pada sebagian data lalu ukur kualitas dan latency serving"""
+    rng = np.random.default_rng(seed)
+    ratings_df = ratings_df.dropna(subset=['user_id', 'book_id', 'rating_value']).astype({'user_id': str, 'book_id': str})
+    users = ratings_df['user_id'].unique()
+    new_users = set(rng.choice(users, size=max(1, int(len(users) * new_user_ratio)), replace=False))
+    is_new = ratings_df['user_id'].isin(new_users).to_numpy()
+    holdout = (rng.random(len(ratings_df)) < holdout_ratio) & ~is_new
+    train_df = ratings_df[~is_new & ~holdout]
+
+    print("🧮 ALS BENCHMARK")
+    print("=" * 60)
+    print(f"Ratings: {len(ratings_df)} ({len(users)} users), train {len(train_df)}, "
+          f"held-out {int(holdout.sum())}, new users {len(new_users)}")
+    print(f"factors={factors}, iterations={iterations}, workers={workers or os.cpu_count()}")
+    print("-" * 60)
+
+    values, weights, user_ids, book_ids, rating_counts, rating_checksums = als_training_matrices(train_df)
+    model = train_als(values, weights, user_ids, book_ids, rating_counts, rating_checksums,
+                      factors=factors, iterations=iterations, workers=workers)
+    print(f"{'iteration':>9} {'seconds':>8} {'train RMSE':>11}")
+    for step in model.training_report:
+        print(f"{step['iteration']:>9} {step['seconds']:>8.2f} {step['rmse']:>11.4f}")
+    total = sum(step['seconds'] for step in model.training_report)
+    print(f"Total training: {total:.2f}s ({total / max(len(model.training_report), 1):.2f}s/iteration)")
+
+    # RMSE held-out: pasangan user/buku yang ada di model saja
+    test_df = ratings_df[holdout]
+    user_rows = np.array([model.user_row(u) if model.user_row(u) is not None else -1 for u in test_df['user_id']])
+    item_rows = model.item_positions(test_df['book_id'].to_numpy())
+    known = (user_rows >= 0) & (item_rows >= 0)
+    if known.any():
+        predicted = np.einsum(
+            'ij,ij->i', model.user_factors[user_rows[known]], model.item_factors[item_rows[known]]
+        ) + model.global_mean
+        actual = test_df['rating_value'].to_numpy(dtype=np.float64)[known]
+        rmse = np.sqrt(np.mean((np.clip(predicted, 1, 5) - actual) ** 2))
+        baseline = np.sqrt(np.mean((model.global_mean - actual) ** 2))
+        print(f"Held-out RMSE: {rmse:.4f} (global mean baseline {baseline:.4f}, {int(known.sum())} pairs)")
+
+    print("-" * 60)
+    print(f"{'serving':<22} {'p50 ms':>8} {'p95 ms':>8}")
+    sample = rng.choice(len(model.user_ids), size=min(500, len(model.user_ids)), replace=False)
+    latencies = []
+    for row in sample:
+        start_time = time.perf_counter()
+        scores = model.predict(model.user_factors[row])
+        np.argpartition(-scores, min(n, len(scores) - 1))[:n]
+        latencies.append(time.perf_counter() - start_time)
+    print(f"{'known user (dot)':<22} {_percentile_ms(latencies, 50):>8.3f} {_percentile_ms(latencies, 95):>8.3f}")
+
+    new_df = ratings_df[is_new]
+    latencies = []
+    for _, user_ratings in list(new_df.groupby('user_id'))[:500]:
+        start_time = time.perf_counter()
+        rows = model.item_positions(user_ratings['book_id'].to_numpy())
+        found = rows >= 0
+        if not found.any():
+            continue
+        vector = model.fold_in(rows[found], user_ratings['rating_value'].to_numpy()[found])
+        scores = model.predict(vector)
+        np.argpartition(-scores, min(n, len(scores) - 1))[:n]
+        latencies.append(time.perf_counter() - start_time)
+    if latencies:
+        print(f"{'new user (fold-in)':<22} {_percentile_ms(latencies, 50):>8.3f} {_percentile_ms(latencies, 95):>8.3f}")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark training dan serving ALS")
+    parser.add_argument("--users", type=int, default=20000, help="Jumlah user sintetis")
+    parser.add_argument("--books", type=int, default=20000, help="Jumlah buku sintetis")
+    parser.add_argument("--factors", type=int, default=32, help="Dimensi faktor laten")
+    parser.add_argument("--iterations", type=int, default=10, help="Jumlah iterasi ALS")
+    parser.add_argument("--workers", type=int, default=0, help="Jumlah thread solve (0 = semua core)")
+    parser.add_argument("--from-db", action="store_true", help="Gunakan ratings dari MongoDB")
+
+    args = parser.parse_args()
+
+    from utils.logger import ai_logger
+    ai_logger.logger.logger.setLevel(logging.WARNING)
+
+    ratings_df = ratings_from_db() if args.from_db else synthetic_ratings(args.users, args.books)
+    if ratings_df.empty:
+        print("❌ Tidak ada ratings")
+        sys.exit(1)
+    run_benchmark(ratings_df, args.factors, args.iterations, args.workers)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Script benchmark recall@k dan latency engine ANN terhadap jalur cosine exact
+
+Data berasal dari katalog sintetis (default) atau snapshot katalog MongoDB (--from-db).
+Query adalah baris-baris katalog itu sendiri (item-ke-item), buku query tidak dihitung.
+"""
+
+import os
+import sys
+import time
+import numpy as np
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Tambahkan direktori AI ke path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.ann_index import AnnIndex, IvfLsaIndex, RandomProjectionLSH
+
+def synthetic_catalog(n_books: int, n_terms: int = 5000, seed: int = 7):
+    """Katalog TF-IDF sintetis: setiap buku mengambil istilah (berbobot Zipf) dari satu topik utama,
+    satu topik sekunder dan sedikit noise, mirip judul/penulis/genre/deskripsi"""
+    from sklearn.feature_extraction.text import TfidfTransformer
+    from scipy import sparse
+
+    rng = np.random.default_rng(seed)
+    n_topics = max(n_books // 50, 2)
+    topic_terms = rng.integers(0, n_terms, size=(n_topics, 30))
+    weights = 1.0 / np.arange(1, 31)
+    weights /= weights.sum()
+    rows, cols = [], []
+    for book in range(n_books):
+        primary, secondary = rng.choice(n_topics, size=2, replace=False)
+        terms = np.concatenate([
+            rng.choice(topic_terms[primary], size=14, p=weights),
+            rng.choice(topic_terms[secondary], size=4, p=weights),
+            rng.integers(0, n_terms, 4)
+        ])
+        rows.extend([book] * len(terms))
+        cols.extend(terms)
+    counts = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n_books, n_terms))
+    return TfidfTransformer().fit_transform(counts)
+
+def catalog_from_db():
+    """TF-IDF matrix dari snapshot katalog MongoDB"""
+    from services.catalog_snapshot import CatalogStore
+
+    return CatalogStore(artifact_store=None).snapshot.tfidf_matrix
+
+def _percentile_ms(latencies, q):
+    return np.percentile(latencies, q) * 1000
+
+def run_engine(index: AnnIndex, matrix, queries, k: int, truth=None):
+    """Jalankan query satu per satu; kembalikan hasil, recall@k dan latency"""
+    results, latencies = [], []
+    for row in queries:
+        start_time = time.perf_counter()
+        indices, _ = index.query(matrix[row], k, exclude=np.array([row]))
+        latencies.append(time.perf_counter() - start_time)
+        results.append(indices[0])
+
+    recall = None
+    if truth is not None:
+        hits = [len(set(found[found >= 0]) & set(expected)) for found, expected in zip(results, truth)]
+        recall = sum(hits) / (len(truth) * k)
+    return results, recall, latencies
+
+def run_benchmark(matrix, k: int = 10, n_queries: int = 200, seed: int = 11):
+    """Bandingkan engine exact, LSH dan IVF-LSA pada beberapa setting"""
+    rng = np.random.default_rng(seed)
+    queries = rng.choice(matrix.shape[0], size=min(n_queries, matrix.shape[0]), replace=False)
+
+    print("🔍 ANN RECALL BENCHMARK")
+    print("=" * 86)
+    print(f"Catalog: {matrix.shape[0]} books x {matrix.shape[1]} terms, {len(queries)} queries, k={k}")
+    print("-" * 86)
+    print(f"{'engine':<8} {'params':<52} {'build s':>7} {'recall':>6} {'p50 ms':>6} {'p95 ms':>6}")
+
+    start_time = time.perf_counter()
+    exact = AnnIndex(matrix)
+    build_seconds = time.perf_counter() - start_time
+    truth, _, latencies = run_engine(exact, matrix, queries, k)
+    print(f"{'exact':<8} {'-':<52} {build_seconds:>7.2f} {1.0:>6.3f} "
+          f"{_percentile_ms(latencies, 50):>6.2f} {_percentile_ms(latencies, 95):>6.2f}")
+
+    settings = [
+        (RandomProjectionLSH, {'n_tables': 8, 'n_bits': 12}),
+        (RandomProjectionLSH, {'n_tables': 16, 'n_bits': 12}),
+        (RandomProjectionLSH, {'n_tables': 32, 'n_bits': 12}),
+        (IvfLsaIndex, {'n_probe': 2}),
+        (IvfLsaIndex, {'n_probe': 8}),
+        (IvfLsaIndex, {'n_probe': 32}),
+    ]
+    for engine, params in settings:
+        start_time = time.perf_counter()
+        index = engine(matrix, **params)
+        build_seconds = time.perf_counter() - start_time
+        _, recall, latencies = run_engine(index, matrix, queries, k, truth)
+        print(f"{engine.name:<8} {str(index.params()):<52} {build_seconds:>7.2f} {recall:>6.3f} "
+              f"{_percentile_ms(latencies, 50):>6.2f} {_percentile_ms(latencies, 95):>6.2f}")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark recall@k ANN vs exact cosine")
+    parser.add_argument("--books", type=int, default=50000, help="Jumlah buku katalog sintetis")
+    parser.add_argument("--queries", type=int, default=200, help="Jumlah query sampel")
+    parser.add_argument("-k", type=int, default=10, help="Jumlah tetangga (recall@k)")
+    parser.add_argument("--from-db", action="store_true", help="Gunakan katalog dari MongoDB")
+
+    args = parser.parse_args()
+    matrix = catalog_from_db() if args.from_db else synthetic_catalog(args.books)
+    if matrix is None:
+        print("❌ Katalog kosong")
+        sys.exit(1)
+    run_benchmark(matrix, k=args.k, n_queries=args.queries)
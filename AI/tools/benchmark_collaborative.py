@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Script benchmark latency strategi collaborative: user_user (similarity per request) vs item_item
+(similarity buku yang sudah dihitung di snapshot)
+
+Data berasal dari ratings sintetis (default, butuh mongomock untuk stand-in database) atau
+snapshot katalog MongoDB (--from-db). Log INFO per request dimatikan agar yang diukur hanya scoring.
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Tambahkan direktori AI ke path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.catalog_snapshot import CatalogSnapshot, CatalogStore
+from services.item_similarity import build_item_similarity
+from services.model_artifact_store import ModelArtifactStore
+from services.recommendation_service import RecommendationService
+from services.user_item_matrix import UserItemMatrix
+
+def synthetic_ratings(n_users: int, n_books: int, ratings_per_user: int = 20, seed: int = 7) -> pd.DataFrame:
+    """Ratings sintetis: popularitas buku berdistribusi Zipf, setiap user condong ke satu 'selera'
+    (blok buku) sehingga co-rating dan nilai rating tidak acak"""
+    rng = np.random.default_rng(seed)
+    n_tastes = max(n_books // 200, 1)
+    popularity = 1.0 / np.arange(1, n_books + 1) ** 0.8
+    popularity /= popularity.sum()
+
+    users, books, values = [], [], []
+    for user in range(n_users):
+        taste = rng.integers(n_tastes)
+        local = taste * (n_books // n_tastes) + rng.integers(0, n_books // n_tastes, ratings_per_user // 2)
+        popular = rng.choice(n_books, size=ratings_per_user - len(local), p=popularity)
+        # Buku sesuai selera cenderung dirating tinggi, buku populer acak
+        picked, first = np.unique(np.concatenate([local, popular]), return_index=True)
+        liked = first < len(local)
+        users.extend([f"user-{user}"] * len(picked))
+        books.extend(f"book-{book}" for book in picked)
+        values.extend(np.where(liked, rng.integers(4, 6, len(picked)), rng.integers(1, 6, len(picked))))
+
+    return pd.DataFrame({
+        'user_id': users,
+        'book_id': books,
+        'rating_value': values
+    })
+
+def synthetic_store(n_users: int, n_books: int, tmp_dir: str) -> CatalogStore:
+    """CatalogStore di atas mongomock kosong yang snapshot-nya diganti katalog sintetis"""
+    import mongomock
+
+    ratings_df = synthetic_ratings(n_users, n_books)
+    books_df = pd.DataFrame({
+        '_id': [f"book-{book}" for book in range(n_books)],
+        'title': [f"Buku {book}" for book in range(n_books)],
+        'author': 'N/A', 'genre': 'N/A', 'description': ''
+    })
+
+    start_time = time.perf_counter()
+    user_item_matrix = UserItemMatrix.from_ratings(ratings_df)
+    item_similarity = build_item_similarity(user_item_matrix)
+    print(f"Model build: {time.perf_counter() - start_time:.2f}s "
+          f"(item similarity {item_similarity.nnz} pairs, top-{item_similarity.k})")
+
+    store = CatalogStore(db=mongomock.MongoClient()['benchmark'], artifact_store=ModelArtifactStore(root_dir=tmp_dir))
+    store.apply_update(lambda current, version: CatalogSnapshot(
+        version=version,
+        books_df=books_df,
+        ratings_df=ratings_df,
+        reading_history_df=pd.DataFrame(),
+        user_interactions_df=pd.DataFrame(),
+        tfidf_vectorizer=None,
+        tfidf_matrix=None,
+        user_item_matrix=user_item_matrix,
+        item_similarity=item_similarity
+    ))
+    return store
+
+def _percentile_ms(latencies, q):
+    return np.percentile(latencies, q) * 1000
+
+def run_benchmark(service: RecommendationService, n_queries: int = 200, n: int = 10, seed: int = 11):
+    """Bandingkan latency dan overlap hasil kedua strategi pada user yang sama"""
+    user_item_matrix = service.snapshot.user_item_matrix
+    rng = np.random.default_rng(seed)
+    users = rng.choice(user_item_matrix.user_ids, size=min(n_queries, len(user_item_matrix.user_ids)), replace=False)
+
+    print("👥 COLLABORATIVE LATENCY BENCHMARK")
+    print("=" * 60)
+    print(f"Matrix: {user_item_matrix.shape[0]} users x {user_item_matrix.shape[1]} books, "
+          f"{user_item_matrix.nnz} ratings, {len(users)} queries, n={n}")
+    print("-" * 60)
+    print(f"{'strategy':<10} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'avg recs':>9}")
+
+    results = {}
+    for strategy in ('user_user', 'item_item'):
+        latencies, found = [], []
+        for user_id in users:
+            start_time = time.perf_counter()
+            recommendations = service.get_collaborative_recommendations(user_id, n, strategy=strategy)
+            latencies.append(time.perf_counter() - start_time)
+            found.append({rec['book_id'] for rec in recommendations})
+        results[strategy] = found
+        print(f"{strategy:<10} {_percentile_ms(latencies, 50):>8.2f} {_percentile_ms(latencies, 95):>8.2f} "
+              f"{max(latencies) * 1000:>8.2f} {np.mean([len(books) for books in found]):>9.1f}")
+
+    overlap = np.mean([
+        len(a & b) / max(len(a | b), 1) for a, b in zip(results['user_user'], results['item_item'])
+    ])
+    print("-" * 60)
+    print(f"Rata-rata overlap (Jaccard) hasil user_user vs item_item: {overlap:.3f}")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark latency collaborative user_user vs item_item")
+    parser.add_argument("--users", type=int, default=20000, help="Jumlah user sintetis")
+    parser.add_argument("--books", type=int, default=20000, help="Jumlah buku sintetis")
+    parser.add_argument("--queries", type=int, default=200, help="Jumlah user yang di-query")
+    parser.add_argument("-n", type=int, default=10, help="Jumlah rekomendasi per query")
+    parser.add_argument("--from-db", action="store_true", help="Gunakan ratings dari MongoDB")
+
+    args = parser.parse_args()
+
+    from utils.logger import ai_logger
+    ai_logger.logger.logger.setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.from_db:
+            store = CatalogStore(artifact_store=ModelArtifactStore(root_dir=tmp_dir))
+        else:
+            store = synthetic_store(args.users, args.books, tmp_dir)
+        service = RecommendationService(store)
+        if service.snapshot.user_item_matrix.empty:
+            print("❌ Tidak ada ratings")
+            sys.exit(1)
+        run_benchmark(service, n_queries=args.queries, n=args.n)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Script benchmark throughput dan latency provider LLM pada beban paralel
+
+Default memakai provider stub (tanpa jaringan, latency dan kecepatan token dari LLM_STUB_*)
+sehingga kapasitas pool thread, retry dan circuit breaker bisa diukur di mesin terisolasi.
+--provider openai mengukur API sungguhan (memakan kuota).
+"""
+
+import os
+import sys
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Tambahkan direktori AI ke path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.llm_provider import LLMProvider, build_llm_provider
+
+PROMPTS = [
+    "Saya suka novel misteri dengan detektif yang cerdas",
+    "Berikan rekomendasi buku fantasi epik untuk remaja",
+    "Apa buku sejarah Indonesia yang bagus untuk pemula?",
+    "Saya mencari buku self-help tentang kebiasaan baik",
+]
+
+def _percentile_ms(latencies, q):
+    return np.percentile(latencies, q) * 1000 if latencies else float('nan')
+
+def _one_request(provider: LLMProvider, index: int, stream: bool):
+    """(latency total, latency token pertama, jumlah potongan, error) satu request"""
+    messages = [
+        {"role": "system", "content": "Anda adalah asisten perpustakaan."},
+        {"role": "user", "content": PROMPTS[index % len(PROMPTS)]}
+    ]
+    start_time = time.perf_counter()
+    first_token, chunks = None, 0
+    try:
+        if stream:
+            for _ in provider.stream(messages, max_tokens=200):
+                if first_token is None:
+                    first_token = time.perf_counter() - start_time
+                chunks += 1
+        else:
+            provider.complete(messages, max_tokens=200)
+            chunks = 1
+        return time.perf_counter() - start_time, first_token, chunks, None
+    except Exception as e:
+        return time.perf_counter() - start_time, first_token, chunks, type(e).__name__
+
+def run_benchmark(provider: LLMProvider, n_requests: int, concurrency: int, stream: bool):
+    """Jalankan n_requests dengan concurrency thread dan cetak ringkasan"""
+    print("🤖 LLM PROVIDER BENCHMARK")
+    print("=" * 60)
+    print(f"Provider: {provider.name} ({provider.model}), {n_requests} requests, "
+          f"concurrency {concurrency}, {'stream' if stream else 'complete'}")
+    print("-" * 60)
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda index: _one_request(provider, index, stream), range(n_requests)))
+    elapsed = time.perf_counter() - start_time
+
+    latencies = [latency for latency, _, _, error in results if error is None]
+    first_tokens = [first for _, first, _, error in results if error is None and first is not None]
+    errors = {}
+    for _, _, _, error in results:
+        if error is not None:
+            errors[error] = errors.get(error, 0) + 1
+
+    print(f"Throughput: {len(latencies) / elapsed:.1f} req/s ({elapsed:.2f}s total)")
+    print(f"Latency p50/p95/max: {_percentile_ms(latencies, 50):.0f} / {_percentile_ms(latencies, 95):.0f} / "
+          f"{max(latencies) * 1000 if latencies else float('nan'):.0f} ms")
+    if stream:
+        print(f"First token p50/p95: {_percentile_ms(first_tokens, 50):.0f} / {_percentile_ms(first_tokens, 95):.0f} ms")
+    print(f"Errors: {errors or '-'}")
+    status = provider.status()
+    print(f"Retries: {status['retries']}, rejected: {status['rejected']}, "
+          f"breaker: {status['circuit_breaker']['state']}")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark throughput provider LLM")
+    parser.add_argument("--provider", default="stub", help="Provider LLM (stub | openai)")
+    parser.add_argument("--requests", type=int, default=200, help="Jumlah request")
+    parser.add_argument("--concurrency", type=int, default=32, help="Jumlah request paralel")
+    parser.add_argument("--stream", action="store_true", help="Ukur jalur streaming (termasuk token pertama)")
+
+    args = parser.parse_args()
+    provider = build_llm_provider(args.provider)
+    if not provider.available():
+        print(f"❌ Provider {provider.name} tidak tersedia (OPENAI_API_KEY?)")
+        sys.exit(1)
+    run_benchmark(provider, args.requests, args.concurrency, args.stream)
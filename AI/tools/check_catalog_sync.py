@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Script untuk memverifikasi CatalogSyncEngine (sinkronisasi inkremental berbasis watermark)
+
+Jalankan terhadap mongod lokal (database terpisah `smartlibrary_sync_check`, dihapus setelah selesai)
+atau dengan --memory untuk memakai mongomock sebagai stand-in in-memory (pip install mongomock).
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Tambahkan direktori AI ke path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.catalog_snapshot import CatalogSnapshot, CatalogStore
+from services.catalog_sync import CatalogSyncEngine
+from services.model_artifact_store import ModelArtifactStore
+from services.user_item_matrix import UserItemMatrix
+
+CHECK_DATABASE = 'smartlibrary_sync_check'
+
+def _open_database(use_memory: bool):
+    """Membuka database check: mongomock atau mongod lokal"""
+    if use_memory:
+        import mongomock
+        return mongomock.MongoClient()[CHECK_DATABASE], None
+
+    from pymongo import MongoClient
+    client = MongoClient(os.getenv('MONGODB_URI', 'mongodb://localhost:27017'), serverSelectionTimeoutMS=3000)
+    client.drop_database(CHECK_DATABASE)
+    return client[CHECK_DATABASE], client
+
+def _seed(db, now: datetime):
+    """Isi data awal: 3 buku dan 3 ratings"""
+    db.books.insert_many([
+        {"_id": "book-1", "title": "Dune", "author": "Frank Herbert", "genre": "Fiksi Ilmiah",
+         "description": "Novel fiksi ilmiah tentang planet gurun Arrakis", "createdAt": now, "updatedAt": now},
+        {"_id": "book-2", "title": "The Martian", "author": "Andy Weir", "genre": "Fiksi Ilmiah",
+         "description": "Astronot terdampar di planet Mars", "createdAt": now, "updatedAt": now},
+        {"_id": "book-3", "title": "The Hobbit", "author": "J.R.R. Tolkien", "genre": "Fantasi",
+         "description": "Petualangan Bilbo Baggins bersama para kurcaci", "createdAt": now, "updatedAt": now},
+    ])
+    db.ratings.insert_many([
+        {"_id": "r-1", "user_id": "user-1", "book_id": "book-1", "rating_value": 5, "rating_date": now},
+        {"_id": "r-2", "user_id": "user-1", "book_id": "book-2", "rating_value": 4, "rating_date": now},
+        {"_id": "r-3", "user_id": "user-2", "book_id": "book-1", "rating_value": 3, "rating_date": now},
+    ])
+
+def _check(name: str, condition: bool, results: list):
+    print(f"{'✅' if condition else '❌'} {name}")
+    results.append(condition)
+
+def run_check(use_memory: bool) -> bool:
+    """Jalankan skenario sinkronisasi dan kembalikan True jika semua cek lolos"""
+    print("🔄 CATALOG SYNC CHECK")
+    print("=" * 50)
+
+    db, client = _open_database(use_memory)
+    results = []
+    now = datetime.now().replace(microsecond=0)
+
+    try:
+        _seed(db, now)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = CatalogStore(db=db, artifact_store=ModelArtifactStore(root_dir=tmp_dir))
+            engine = CatalogSyncEngine(
+                store,
+                watermark_path=os.path.join(tmp_dir, 'watermarks.json'),
+                full_rebuild_change_ratio=10.0
+            )
+            base = store.snapshot
+            _check("Snapshot awal berisi 3 buku", len(base.books_df) == 3, results)
+
+            result = engine.poll_once()
+            _check("Poll tanpa perubahan adalah noop", result['mode'] == 'noop', results)
+
+            later = now + timedelta(minutes=5)
+            db.books.update_one({"_id": "book-2"}, {"$set": {"description": "Botani dan kentang di Mars", "updatedAt": later}})
+            db.books.insert_one({"_id": "book-4", "title": "Neuromancer", "author": "William Gibson", "genre": "Cyberpunk",
+                                 "description": "Peretas dan kecerdasan buatan", "createdAt": later, "updatedAt": later})
+            db.ratings.insert_one({"_id": "r-4", "user_id": "user-3", "book_id": "book-4", "rating_value": 5, "rating_date": later})
+
+            start_time = time.time()
+            result = engine.poll_once()
+            elapsed = time.time() - start_time
+            snapshot = store.snapshot
+            _check(f"Delta diterapkan secara inkremental ({elapsed * 1000:.1f} ms)", result['mode'] == 'incremental', results)
+            _check("2 buku dan 1 rating berubah", (result['books_changed'], result['ratings_changed']) == (2, 1), results)
+            _check("Buku baru ditambahkan di akhir", snapshot.books_df['_id'].tolist() == ['book-1', 'book-2', 'book-3', 'book-4'], results)
+            _check("Baris TF-IDF sejajar dengan katalog", snapshot.tfidf_matrix.shape[0] == 4, results)
+            _check("Vocabulary tidak di-refit", snapshot.tfidf_vectorizer is base.tfidf_vectorizer, results)
+            _check("Konten buku yang diubah ikut diperbarui",
+                   'kentang' in snapshot.books_df.loc[snapshot.books_df['_id'] == 'book-2', 'content'].iloc[0], results)
+            _check("Sel user-item baru terisi", snapshot.user_item_matrix.get('user-3', 'book-4') == 5, results)
+            _check("Snapshot lama tidak berubah", len(base.books_df) == 3 and base.tfidf_matrix.shape[0] == 3, results)
+            _check("Artefak inkremental tersimpan", store.artifact_store.exists(snapshot.fingerprint), results)
+
+            result = engine.poll_once()
+            _check("Poll ulang setelah delta adalah noop", result['mode'] == 'noop', results)
+
+            edited = later + timedelta(days=1)
+            db.ratings.update_one({"_id": "r-3"}, {"$set": {"rating_value": 1, "rating_date": edited}})
+            result = engine.poll_once()
+            _check("Rating yang diedit diterapkan inkremental",
+                   (result['mode'], result['ratings_changed']) == ('incremental', 1), results)
+            _check("Sel user-item rating yang diedit diperbarui", store.snapshot.user_item_matrix.get('user-2', 'book-1') == 1, results)
+
+            moved = edited + timedelta(days=1)
+            db.ratings.update_one({"_id": "r-1"}, {"$set": {"book_id": "book-3", "rating_value": 4, "rating_date": moved}})
+            engine.poll_once()
+            matrix = store.snapshot.user_item_matrix
+            _check("Rating yang pindah buku membuang sel lama",
+                   matrix.get('user-1', 'book-1') == 0 and matrix.get('user-1', 'book-3') == 4
+                   and matrix.nnz == UserItemMatrix.from_ratings(store.snapshot.ratings_df).nnz, results)
+
+            resumed = CatalogSyncEngine(store, watermark_path=os.path.join(tmp_dir, 'watermarks.json'))
+            _check("Watermark dipulihkan dari disk", resumed.status()['watermarks']['books'] == later.isoformat(), results)
+
+            snapshot = engine.full_rebuild()
+            _check("Rebuild penuh melakukan refit vocabulary", snapshot.tfidf_vectorizer is not base.tfidf_vectorizer, results)
+
+            store.apply_update(lambda current, version: CatalogSnapshot.empty(version))
+            result = engine.poll_once()
+            _check("Snapshot kosong dipulihkan dengan rebuild penuh",
+                   result['mode'] == 'full' and len(store.snapshot.books_df) == 4, results)
+    finally:
+        if client is not None:
+            client.drop_database(CHECK_DATABASE)
+            client.close()
+
+    passed = sum(results)
+    print("-" * 50)
+    print(f"📊 {passed}/{len(results)} checks passed")
+    return passed == len(results)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check CatalogSyncEngine")
+    parser.add_argument("--memory", action="store_true", help="Gunakan mongomock (in-memory) alih-alih mongod lokal")
+
+    args = parser.parse_args()
+    sys.exit(0 if run_check(args.memory) else 1)
@@ -109,7 +109,7 @@ def debug_recommendation_service():
         
         if not recommendation_service.user_item_matrix.empty:
             # Get a sample user ID
-            sample_user_id = recommendation_service.user_item_matrix.index[0]
+            sample_user_id = recommendation_service.user_item_matrix.user_ids[0]
             print(f"Testing with user ID: {sample_user_id}")
             
             collab_recs = recommendation_service.get_collaborative_recommendations(
@@ -138,7 +138,7 @@ def debug_recommendation_service():
         
         if not recommendation_service.books_df.empty:
             sample_book_id = str(recommendation_service.books_df.iloc[0]['_id'])
-            sample_user_id = recommendation_service.user_item_matrix.index[0] if not recommendation_service.user_item_matrix.empty else None
+            sample_user_id = recommendation_service.user_item_matrix.user_ids[0] if not recommendation_service.user_item_matrix.empty else None
             
             hybrid_recs = recommendation_service.get_hybrid_recommendations(
                 user_id=sample_user_id,
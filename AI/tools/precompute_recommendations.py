@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Script job batch (mis. dijalankan nightly lewat cron) untuk menghitung rekomendasi content,
+collaborative dan fused semua user aktif ke koleksi precomputed_recommendations
+
+Endpoint online membaca koleksi ini lebih dulu dan menghitung live jika dokumen user tidak ada
+atau sudah basi. Ringkasan throughput (users/detik) dan waktu per shard dicetak di akhir.
+"""
+
+import logging
+import os
+import sys
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Tambahkan direktori AI ke path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.batch_precompute import RecommendationPrecomputeJob
+from services.recommendation_service import RecommendationService
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Precompute rekomendasi untuk semua user aktif")
+    parser.add_argument("--workers", type=int, default=0, help="Jumlah proses worker (0 = PRECOMPUTE_WORKERS/semua core)")
+    parser.add_argument("--shard-size", type=int, default=0, help="Jumlah user per shard (0 = PRECOMPUTE_SHARD_SIZE)")
+    parser.add_argument("-n", type=int, default=0, help="Jumlah rekomendasi per daftar (0 = PRECOMPUTE_TOP_N)")
+    parser.add_argument("--strategy", default=None, help="Strategi collaborative (default COLLABORATIVE_STRATEGY)")
+    parser.add_argument("--verbose", action="store_true", help="Tampilkan log INFO per user")
+
+    args = parser.parse_args()
+
+    if not args.verbose:
+        from utils.logger import ai_logger
+        ai_logger.logger.logger.setLevel(logging.WARNING)
+
+    job = RecommendationPrecomputeJob(
+        RecommendationService(), workers=args.workers or None, shard_size=args.shard_size or None,
+        top_n=args.n or None, strategy=args.strategy
+    )
+    summary = job.run()
+
+    print("🗂️  RECOMMENDATION PRECOMPUTE")
+    print("=" * 60)
+    print(f"Run {summary['run_id']}: {summary['users']} users, {summary['shards']} shards, {summary['workers']} workers")
+    print(f"Written {summary['written']}, removed stale {summary['removed_stale']}")
+    print(f"Total {summary['seconds']}s ({summary['users_per_second']} users/s)")
+    print("-" * 60)
+    print(f"{'shard':>5} {'users':>6} {'compute s':>10} {'write s':>8} {'users/s':>8}")
+    for shard in summary['shard_timings']:
+        rate = shard['users'] / shard['seconds'] if shard['seconds'] else 0
+        print(f"{shard['shard']:>5} {shard['users']:>6} {shard['compute_seconds']:>10.3f} {shard['write_seconds']:>8.3f} {rate:>8.1f}")
@@ -0,0 +1,41 @@
+import os
+import threading
+from pymongo import MongoClient
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+class DatabaseConnection:
+    """Koneksi MongoDB tunggal per proses (Singleton pattern)"""
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    instance = super().__new__(cls)
+                    instance._connect()
+                    cls._instance = instance
+        return cls._instance
+
+    def _connect(self):
+        """Membuka koneksi ke MongoDB"""
+        mongodb_uri = os.getenv('MONGODB_URI')
+        if not mongodb_uri:
+            raise ValueError("MONGODB_URI tidak ditemukan di environment variables")
+
+        self.client = MongoClient(mongodb_uri)
+        self.db = self.client['smartlibrary']
+
+    def close(self):
+        """Menutup koneksi dan mereset singleton"""
+        with DatabaseConnection._lock:
+            self.client.close()
+            DatabaseConnection._instance = None
+
+def get_database():
+    """Mendapatkan database smartlibrary dari koneksi bersama"""
+    return DatabaseConnection().db